@@ -0,0 +1,145 @@
+"""
+Latency of process_question on a cache miss: the old sequential pipeline
+(cache lookup -> retrieval -> LLM, each embedding the question) against the
+concurrent pipeline with a shared embedding, with and without SPECULATIVE_LLM.
+
+Stage latencies are simulated (local embeddings, NumPy index and a stub LLM
+with added sleeps) so the numbers only reflect how the stages are scheduled.
+
+Usage:
+  python benchmarks/bench_process_question.py [--embed-ms 120] [--store-ms 40] [--llm-ms 600] [--runs 10]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+_workdir = tempfile.mkdtemp(prefix="bench_pq_")
+os.environ.update({
+    "EMBEDDING_PROVIDER": "local",
+    "VECTOR_BACKEND": "numpy",
+    "NUMPY_INDEX_PATH": os.path.join(_workdir, "numpy_index"),
+    "LEXICAL_INDEX_PATH": os.path.join(_workdir, "lexical_index"),
+    "FEEDBACK_DB_PATH": os.path.join(_workdir, "feedback.sqlite"),
+    "HYBRID_FAST_PATH": "false",
+    "SHARED_CACHE": "false",  # measure the pipeline, not repeated-question caching
+    "PROMPT_CACHE": "false",  # each mode replays the same questions
+})
+
+from src.llm import factory
+from src.llm.local_embeddings import LocalHashEmbeddings
+from src.vector.numpy_index import NumpyVectorStore
+from src.vector.store import get_vector_store
+from src.vector.retriever import retrieve_context
+from src.db.feedback import get_cached_query
+from src.agents import sql_agent
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--embed-ms", type=float, default=120)
+    p.add_argument("--store-ms", type=float, default=40)
+    p.add_argument("--llm-ms", type=float, default=600)
+    p.add_argument("--runs", type=int, default=10)
+    return p.parse_args()
+
+
+class SlowEmbeddings(LocalHashEmbeddings):
+    """One simulated round trip per call, however many texts it carries."""
+
+    def __init__(self, delay: float, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+
+    def embed_documents(self, texts):
+        time.sleep(self.delay)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        time.sleep(self.delay)
+        return super().embed_query(text)
+
+
+class StubResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubLLM:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def invoke(self, prompt):
+        time.sleep(self.delay)
+        return StubResponse(json.dumps({"intent": "SQL_GENERATION", "sql_query": "SELECT COUNT(*) FROM canvas_course;"}))
+
+
+def install_stubs(args):
+    factory._local_embeddings = SlowEmbeddings(args.embed_ms / 1000)
+    factory._llm = StubLLM(args.llm_ms / 1000)
+    query = NumpyVectorStore.query
+
+    def slow_query(self, *a, **kw):
+        time.sleep(args.store_ms / 1000)
+        return query(self, *a, **kw)
+
+    NumpyVectorStore.query = slow_query
+
+
+def seed_stores():
+    embedder = LocalHashEmbeddings()
+    chunks = [f"canvas_table_{i}: id (INTEGER), name (TEXT), created (TEXT)" for i in range(50)]
+    get_vector_store("pmc_chunks").upsert(
+        ids=[str(i) for i in range(len(chunks))], vectors=embedder.embed_documents(chunks),
+        metadatas=[{"source": "schema"} for _ in chunks], documents=chunks,
+    )
+    question = "average gradebook score per assignment type"
+    get_vector_store("query_cache").upsert(
+        ids=["0"], vectors=[embedder.embed_query(question)],
+        metadatas=[{"sql": "SELECT 1;", "question": question, "template": "", "hits": 0}], documents=[question],
+    )
+
+
+def sequential(question):
+    """The pipeline before concurrent stages: every stage waits for the previous one."""
+    if get_cached_query(question):
+        return
+    context = retrieve_context(question)
+    factory.get_llm().invoke(context + question)
+
+
+def measure(label, fn, questions):
+    fn(questions[0])  # warm up
+    timings = []
+    for q in questions:
+        t0 = time.perf_counter()
+        fn(q)
+        timings.append((time.perf_counter() - t0) * 1000)
+    print(f"{label:<28} p50 {statistics.median(timings):8.1f} ms   max {max(timings):8.1f} ms")
+
+
+def main():
+    args = parse_args()
+    install_stubs(args)
+    seed_stores()
+    questions = [f"how many courses started after week {i} for client {i}" for i in range(args.runs + 1)]
+    print(f"simulated stages: embed {args.embed_ms} ms, vector query {args.store_ms} ms, LLM {args.llm_ms} ms")
+
+    measure("sequential", sequential, questions)
+    process_question = sql_agent.get_sql_agent("schema")
+    sql_agent.SPECULATIVE_LLM = False
+    measure("concurrent, shared embedding", process_question, questions)
+    sql_agent.SPECULATIVE_LLM = True
+    measure("concurrent + speculative LLM", process_question, questions)
+
+
+if __name__ == "__main__":
+    main()
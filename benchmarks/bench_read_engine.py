@@ -0,0 +1,151 @@
+"""
+Concurrent read throughput: the pooled read-write path against the read-only engine.
+
+Each mode runs the same mix of queries from N threads for --seconds and reports
+queries/s and p95 latency. The seconds are split into --rounds that alternate
+between the modes, so drift in machine load does not favour one of them. The
+result cache is bypassed, so every call reaches SQLite.
+
+  connect       get_connection() per query + execute_sql (sqlite3.Row, then dicts)
+  pool          ConnectionPool(get_connection) + execute_sql, i.e. execute_sql_query before READ_ENGINE
+  engine        ReadEngine + execute_read (tuples, dicts built once), what /query runs now
+  engine-tuples ReadEngine.execute (column names once, rows as tuples)
+
+Without --query, the mix is a COUNT(*), a 50-row page and a GROUP BY on the first
+column of each of the --tables largest tables.
+
+Usage:
+  python benchmarks/bench_read_engine.py --db ./data/db.sqlite [--threads 1 4 8 16] [--seconds 4] [--rounds 4]
+      [--tables 4] [--query "SELECT ..."]
+"""
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from src.db.connection import get_connection
+from src.db.pool import ConnectionPool
+from src.db.read_engine import ReadEngine
+from src.agents.sql_agent import execute_sql, execute_read
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", required=True)
+    p.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8, 16])
+    p.add_argument("--seconds", type=float, default=4)
+    p.add_argument("--rounds", type=int, default=4)
+    p.add_argument("--tables", type=int, default=4)
+    p.add_argument("--query", action="append", help="query to run (repeatable); default: generated from the schema")
+    return p.parse_args()
+
+
+def default_queries(db: str, tables: int) -> list[str]:
+    conn = sqlite3.connect(db)
+    names = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name NOT LIKE 'summary_%'"
+    )]
+    sized = sorted(((conn.execute(f'SELECT COUNT(*) FROM "{n}"').fetchone()[0], n) for n in names), reverse=True)
+    queries = []
+    for _, name in sized[:tables]:
+        column = conn.execute(f'SELECT name FROM pragma_table_info(?) ORDER BY cid LIMIT 1', (name,)).fetchone()[0]
+        queries += [
+            f'SELECT COUNT(*) AS n FROM "{name}"',
+            f'SELECT * FROM "{name}" LIMIT 50',
+            f'SELECT "{column}", COUNT(*) AS n FROM "{name}" GROUP BY "{column}" ORDER BY n DESC LIMIT 20',
+        ]
+    conn.close()
+    return queries
+
+
+def modes(db: str):
+    pool = ConnectionPool(lambda: get_connection(db), size=16, name="bench")
+    engine = ReadEngine(db)
+
+    def connect(sql):
+        conn = get_connection(db)
+        try:
+            return execute_sql(sql, conn=conn)
+        finally:
+            conn.close()
+
+    def pooled(sql):
+        with pool.connection() as conn:
+            return execute_sql(sql, conn=conn)
+
+    return [
+        ("connect", connect),
+        ("pool", pooled),
+        ("engine", lambda sql: execute_read(sql, reader=engine)),
+        ("engine-tuples", lambda sql: engine.execute(sql)),
+    ]
+
+
+def run(fn, queries: list[str], threads: int, seconds: float) -> tuple[list[float], float]:
+    """(latencies, elapsed seconds) of `fn(sql)` called in a loop by `threads` threads."""
+    stop = threading.Event()
+    latencies = [[] for _ in range(threads)]
+    start = threading.Barrier(threads + 1)
+
+    def worker(i):
+        start.wait()
+        n = i
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            fn(queries[n % len(queries)])
+            latencies[i].append(time.perf_counter() - t0)
+            n += 1
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    time.sleep(seconds)
+    stop.set()
+    for t in pool:
+        t.join()
+    return [x for per_thread in latencies for x in per_thread], time.perf_counter() - t0
+
+
+def main():
+    args = parse_args()
+    queries = args.query or default_queries(args.db, args.tables)
+    candidates = modes(args.db)
+
+    # every mode must return the same rows
+    reference = {sql: candidates[1][1](sql) for sql in queries}
+    for name, fn in candidates:
+        for sql in queries:
+            result = fn(sql)
+            rows = [tuple(r.values()) for r in reference[sql]] if name == "engine-tuples" else reference[sql]
+            assert (result[1] if name == "engine-tuples" else result) == rows, f"{name} differs on {sql}"
+
+    print(f"{len(queries)} queries, {args.seconds:g}s per mode in {args.rounds} rounds")
+    for threads in args.threads:
+        latencies = {name: [] for name, _ in candidates}
+        elapsed = dict.fromkeys(latencies, 0.0)
+        for _ in range(args.rounds):
+            for name, fn in candidates:
+                done, seconds = run(fn, queries, threads, args.seconds / args.rounds)
+                latencies[name] += done
+                elapsed[name] += seconds
+        baseline = len(latencies["pool"]) / elapsed["pool"]
+        for name, _ in candidates:
+            qps = len(latencies[name]) / elapsed[name]
+            p95 = float(np.percentile(latencies[name], 95)) * 1000
+            speedup = f"  x{qps / baseline:.2f} vs pool" if name.startswith("engine") else ""
+            print(f"threads={threads:<3} {name:<14} {qps:>9.0f} q/s  p95={p95:7.2f}ms{speedup}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare vector backends (Chromadb vs NumPy index) on synthetic vectors.
+
+Usage:
+  python benchmarks/bench_vector_backends.py [--sizes 1000 5000] [--dim 768] [--queries 200] [--k 4]
+
+Reports add time, single-query latency (p50/p95) and batch-query throughput.
+"""
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from src.vector.numpy_index import NumpyCollection
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    p.add_argument("--dim", type=int, default=768)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--k", type=int, default=4)
+    return p.parse_args()
+
+
+def make_chroma(directory: str):
+    from chromadb import PersistentClient
+    from chromadb.config import Settings
+
+    client = PersistentClient(path=directory, settings=Settings(allow_reset=True, anonymized_telemetry=False))
+    return client.get_or_create_collection(name="bench")
+
+
+def run_backend(label, collection, vectors, queries, k):
+    ids = [str(i) for i in range(len(vectors))]
+    metadatas = [{"n": i} for i in range(len(vectors))]
+
+    t0 = time.perf_counter()
+    for start in range(0, len(vectors), 1000):
+        end = start + 1000
+        collection.add(ids=ids[start:end], embeddings=vectors[start:end].tolist(), metadatas=metadatas[start:end])
+    add_s = time.perf_counter() - t0
+
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        collection.query(query_embeddings=[q.tolist()], n_results=k, include=["metadatas", "distances"])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    collection.query(query_embeddings=queries.tolist(), n_results=k, include=["metadatas", "distances"])
+    batch_s = time.perf_counter() - t0
+
+    p50, p95 = np.percentile(latencies, [50, 95])
+    print(
+        f"{label:<8} n={len(vectors):<7} add={add_s:7.2f}s  "
+        f"query p50={p50:7.3f}ms p95={p95:7.3f}ms  batch={len(queries) / batch_s:9.0f} q/s"
+    )
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(0)
+
+    for size in args.sizes:
+        vectors = rng.standard_normal((size, args.dim)).astype(np.float32)
+        queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            run_backend("numpy", NumpyCollection("bench", tmp), vectors, queries, args.k)
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                run_backend("chroma", make_chroma(tmp), vectors, queries, args.k)
+            except ImportError:
+                print("chroma   skipped (chromadb not installed)")
+
+
+if __name__ == "__main__":
+    main()
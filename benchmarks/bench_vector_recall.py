@@ -0,0 +1,158 @@
+"""
+Recall@k and query latency of the HNSW index settings against exact search.
+
+Question vectors are synthetic: unit vectors clustered around topic centres, like
+embeddings of questions about a few dozen tables. Queries are paraphrases
+(perturbed stored vectors) and new questions near the same topics. Exact top-k
+comes from a brute-force NumPy search.
+
+Each size is indexed with Chroma's defaults (l2, the settings collections had
+before VECTOR_DISTANCE / HNSW_*), then with cosine and every --m / --construction-ef
+/ --search-ef combination (one collection each: a loaded Chroma index keeps the
+search ef it was opened with). With QDRANT_URL set, a Qdrant server is measured
+too (embedded Qdrant always searches exactly).
+
+Usage:
+  python benchmarks/bench_vector_recall.py [--sizes 1000 10000 50000] [--dim 512] [--queries 200] [--k 4]
+      [--m 16 32] [--construction-ef 200] [--search-ef 16 64 128]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    p.add_argument("--dim", type=int, default=512)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--k", type=int, default=4)
+    p.add_argument("--topics", type=int, default=40)
+    p.add_argument("--m", type=int, nargs="+", default=[16, 32])
+    p.add_argument("--construction-ef", type=int, nargs="+", default=[200])
+    p.add_argument("--search-ef", type=int, nargs="+", default=[16, 64, 128])
+    return p.parse_args()
+
+
+def unit(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def make_vectors(rng, size: int, dim: int, topics: int, queries: int):
+    """(stored, queries): clustered unit vectors; half the queries paraphrase a stored one."""
+    centres = unit(rng.standard_normal((topics, dim)))
+    stored = unit(centres[rng.integers(0, topics, size)] + 1.5 * unit(rng.standard_normal((size, dim))))
+    paraphrases = unit(stored[rng.integers(0, size, queries // 2)] + 0.5 * unit(rng.standard_normal((queries // 2, dim))))
+    new = unit(centres[rng.integers(0, topics, queries - queries // 2)]
+               + 1.5 * unit(rng.standard_normal((queries - queries // 2, dim))))
+    return stored.astype(np.float32), np.vstack([paraphrases, new]).astype(np.float32)
+
+
+def exact_top_k(stored: np.ndarray, queries: np.ndarray, k: int) -> list[set[int]]:
+    sims = queries @ stored.T
+    return [set(row) for row in np.argsort(-sims, axis=1)[:, :k]]
+
+
+def measure(search, queries: np.ndarray, truth: list[set[int]], k: int) -> tuple[float, float, float]:
+    """(recall@k, p50 ms, p95 ms) of `search(vector, k) -> [int ids]`, one query at a time."""
+    latencies, found = [], 0
+    for vector, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        ids = search(vector, k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found += len(expected & set(ids))
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return found / (k * len(queries)), p50, p95
+
+
+def report(label: str, size: int, build_s: float | None, recall: float, p50: float, p95: float):
+    build = f"{build_s:7.1f}s" if build_s is not None else " " * 8
+    print(f"{label:<58} n={size:<7} build={build}  recall@k={recall:6.3f}  p50={p50:7.3f}ms  p95={p95:7.3f}ms")
+
+
+def bench_exact(stored, queries, truth, k):
+    def search(vector, k):
+        return np.argpartition(-(stored @ vector), k)[:k].tolist()
+    report("numpy exact", len(stored), None, *measure(search, queries, truth, k))
+
+
+def bench_chroma(stored, queries, truth, args):
+    from chromadb import PersistentClient
+    from chromadb.config import Settings
+
+    configs = [("chroma defaults (l2)", None)]
+    configs += [(f"chroma cosine M={m} construction_ef={ef} search_ef={search_ef}",
+                 {"hnsw:space": "cosine", "hnsw:M": m, "hnsw:construction_ef": ef, "hnsw:search_ef": search_ef})
+                for m in args.m for ef in args.construction_ef for search_ef in args.search_ef]
+    ids = [str(i) for i in range(len(stored))]
+    for label, metadata in configs:
+        with tempfile.TemporaryDirectory() as tmp:
+            client = PersistentClient(path=tmp, settings=Settings(anonymized_telemetry=False))
+            collection = client.create_collection(name="bench", metadata=metadata)
+            t0 = time.perf_counter()
+            for start in range(0, len(stored), 1000):
+                collection.add(ids=ids[start:start + 1000], embeddings=stored[start:start + 1000].tolist())
+            build_s = time.perf_counter() - t0
+
+            def search(vector, k):
+                return [int(i) for i in collection.query(query_embeddings=[vector.tolist()], n_results=k,
+                                                         include=[])["ids"][0]]
+
+            report(label, len(stored), build_s, *measure(search, queries, truth, args.k))
+
+
+def bench_qdrant(stored, queries, truth, args):
+    from qdrant_client import QdrantClient, models
+
+    client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
+    for m in args.m:
+        for ef in args.construction_ef:
+            name = f"bench_recall_{m}_{ef}"
+            if client.collection_exists(name):
+                client.delete_collection(name)
+            client.create_collection(
+                name, vectors_config=models.VectorParams(size=stored.shape[1], distance=models.Distance.COSINE),
+                hnsw_config=models.HnswConfigDiff(m=m, ef_construct=ef, full_scan_threshold=0),
+            )
+            t0 = time.perf_counter()
+            for start in range(0, len(stored), 1000):
+                client.upsert(name, points=models.Batch(ids=list(range(start, min(start + 1000, len(stored)))),
+                                                        vectors=stored[start:start + 1000].tolist()))
+            while client.get_collection(name).status != models.CollectionStatus.GREEN:
+                time.sleep(0.2)
+            build_s = time.perf_counter() - t0
+            for search_ef in args.search_ef:
+                def search(vector, k):
+                    points = client.query_points(name, query=vector.tolist(), limit=k,
+                                                 search_params=models.SearchParams(hnsw_ef=search_ef)).points
+                    return [int(p.id) for p in points]
+                report(f"qdrant M={m} ef_construct={ef} hnsw_ef={search_ef}", len(stored), build_s,
+                       *measure(search, queries, truth, args.k))
+                build_s = None
+            client.delete_collection(name)
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        stored, queries = make_vectors(rng, size, args.dim, args.topics, args.queries)
+        truth = exact_top_k(stored, queries, args.k)
+        bench_exact(stored, queries, truth, args.k)
+        bench_chroma(stored, queries, truth, args)
+        if os.getenv("QDRANT_URL"):
+            bench_qdrant(stored, queries, truth, args)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ Exports entire SQLite DB (schema + data + indexes + FKs + triggers + views) to M
 
 Usage:
   python sqlite_full_exporter.py --sqlite ./db.sqlite --host 127.0.0.1 --port 3306 --user root --password secret --database target_db [--dry-run] [--auto-increment]
+  python sqlite_full_exporter.py ... --jobs 8 [--load-data] [--batch-size 5000] [--commit-rows 100000]
 
 Requirements:
   pip install mariadb
@@ -13,16 +14,39 @@ Requirements:
 Notes:
 - This is best-effort conversion. Review generated SQL for complex constructs.
 - Run with --dry-run first to inspect SQL.
+- --jobs N copies N tables concurrently, each on its own SQLite and MariaDB connection
+  with foreign_key_checks/unique_checks disabled and one transaction per --commit-rows rows.
+  Indexes are created after the data load, N tables at a time.
+- --load-data streams each table into temporary TSV files and loads them with
+  LOAD DATA LOCAL INFILE (the server must allow local_infile).
+- Progress is checkpointed per table (last copied rowid) in `_sqlite2mariadb_checkpoint`,
+  committed in the same transaction as the data. --resume continues from there.
+  --incremental upserts rows with a newer rowid or a newer `row_modified` (maintained by the
+  LMS schema triggers); it relies on primary/unique keys and does not propagate deletes.
+  The newest `row_modified` is only recorded once a table completes, so an interrupted
+  incremental run starts over from the previous run's stamp.
+- A failing insert batch is bisected to isolate the bad rows; they are written with their
+  error to --reject-file (JSON lines) and the run aborts once --max-errors rows were rejected
+  (with --jobs, the other workers stop after their current batch).
+- To ship a snapshot without a live MariaDB connection, see sqlite_dump.py (zstd export/import).
 """
 
 import argparse
+import json
+import os
 import sqlite3
 import re
-import mariadb
+import tempfile
+import threading
+import time
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Tuple
 
 BATCH_SIZE = 500
+COMMIT_ROWS = 50000
+
+_print_lock = threading.Lock()
 
 
 def parse_args():
@@ -35,7 +59,56 @@ def parse_args():
     p.add_argument("--database", required=True, help="Target MariaDB database name")
     p.add_argument("--dry-run", action="store_true", help="Print SQL instead of executing")
     p.add_argument("--auto-increment", action="store_true", help="Convert INTEGER PRIMARY KEY to AUTO_INCREMENT")
-    return p.parse_args()
+    p.add_argument("--jobs", type=int, default=1, help="Number of tables copied / indexed concurrently")
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per executemany batch")
+    p.add_argument("--commit-rows", type=int, default=COMMIT_ROWS, help="Rows per MariaDB transaction")
+    p.add_argument("--load-data", action="store_true", help="Bulk load via LOAD DATA LOCAL INFILE from temp TSV files")
+    p.add_argument("--reject-file", default="sqlite2mariadb_rejects.jsonl",
+                   help="JSON-lines file receiving rows that failed to insert, with their error")
+    p.add_argument("--max-errors", type=int, default=None,
+                   help="Abort the run once this many rows were rejected (default: no limit)")
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument("--resume", action="store_true",
+                      help="Continue an interrupted run from the per-table rowid checkpoints")
+    mode.add_argument("--incremental", action="store_true",
+                      help="Upsert only rows added (rowid) or changed (row_modified) since the last sync")
+    args = p.parse_args()
+    args.mode = "incremental" if args.incremental else "resume" if args.resume else "full"
+    return args
+
+
+def log(msg: str, end: str = "\n"):
+    """Print without interleaving output from concurrent copy workers."""
+    with _print_lock:
+        print(msg, end=end, flush=True)
+
+
+def connect_mariadb(args, database: str | None = None):
+    """Open a MariaDB connection; LOCAL INFILE is enabled only when --load-data is used."""
+    import mariadb  # imported here so sqlite_dump's SQLite-only paths run without the connector
+
+    params = dict(user=args.user, password=args.password, host=args.host, port=args.port, autocommit=False)
+    if database:
+        params["database"] = database
+    if getattr(args, "load_data", False):
+        params["local_infile"] = True
+    return mariadb.connect(**params)
+
+
+def prepare_bulk_session(mariadb_conn):
+    """Session settings for bulk loading: skip FK and unique checks, explicit large transactions."""
+    cur = mariadb_conn.cursor()
+    cur.execute("SET SESSION foreign_key_checks = 0")
+    cur.execute("SET SESSION unique_checks = 0")
+    cur.execute("SET SESSION autocommit = 0")
+    cur.close()
+
+
+def table_columns(sqlite_conn, table_name) -> List[Tuple[str, str]]:
+    """Return [(column_name, declared_type)] for a SQLite table."""
+    s_cur = sqlite_conn.cursor()
+    s_cur.execute(f"PRAGMA table_info('{table_name}')")
+    return [(row[1], row[2] or "") for row in s_cur.fetchall()]
 
 
 def load_sqlite_schema(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
@@ -148,14 +221,19 @@ def convert_create_table(sql: str, auto_inc: bool) -> str:
 
 def convert_create_index(sql: str) -> str:
     # convert quotes to backticks; SQLite may have "CREATE INDEX name ON table(col)"
+    # IF NOT EXISTS keeps --resume / --incremental reruns idempotent
+    sql = re.sub(r"^\s*CREATE\s+(UNIQUE\s+)?INDEX\s+(?!IF\s+NOT\s+EXISTS)",
+                 lambda m: f"CREATE {m.group(1) or ''}INDEX IF NOT EXISTS ", sql, flags=re.I)
     return sql.replace('"', "`")
 
 
 def convert_create_trigger(sql: str) -> str:
-    return sql  # triggers syntax often compatible; minimal replace
+    # triggers syntax often compatible; minimal replace
+    return re.sub(r"^\s*CREATE\s+TRIGGER\s+(?!IF\s+NOT\s+EXISTS)", "CREATE TRIGGER IF NOT EXISTS ", sql, flags=re.I)
 
 
 def convert_create_view(sql: str) -> str:
+    sql = re.sub(r"^\s*CREATE\s+VIEW\s+", "CREATE OR REPLACE VIEW ", sql, flags=re.I)
     return sql.replace('"', "`")
 
 
@@ -171,42 +249,420 @@ def execute_or_print(cur, sql, dry_run):
         raise
 
 
-def copy_table_data(sqlite_conn, mariadb_conn, table_name, dry_run):
+class MaxErrorsExceeded(Exception):
+    """Raised when more rows were rejected than --max-errors allows."""
+
+
+class RejectLog:
+    """
+    Thread-safe JSON-lines sink for rejected rows: {"table", "error", "row": {col: value}}.
+    Bytes values are written as {"$hex": "..."}. The file is only created on the first reject.
+    Going over max_errors sets `stop`, which the other --jobs workers check between batches.
+    """
+
+    def __init__(self, path: str | None, max_errors: int | None = None):
+        self.path = path
+        self.max_errors = max_errors
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self.stop = threading.Event()
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return {"$hex": bytes(value).hex()}
+        return str(value)
+
+    def record(self, table_name, cols, row, error):
+        with self._lock:
+            self.count += 1
+            if self.path:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                entry = {"table": table_name, "error": str(error), "row": dict(zip(cols, row))}
+                self._file.write(json.dumps(entry, default=self._encode) + "\n")
+                self._file.flush()
+            if self.max_errors is not None and self.count > self.max_errors:
+                self.stop.set()
+                raise MaxErrorsExceeded(f"{self.count} rejected rows exceed --max-errors {self.max_errors}")
+
+    def check(self):
+        """Raise MaxErrorsExceeded if any worker went over max_errors."""
+        if self.stop.is_set():
+            raise MaxErrorsExceeded(f"{self.count} rejected rows exceed --max-errors {self.max_errors}")
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def insert_bisect(m_cur, insert_sql, rows, on_reject, depth=0) -> int:
+    """
+    executemany `rows` inside a savepoint; on failure roll back and retry each half,
+    down to single rows, which are passed to on_reject(row, error). Isolates k bad rows
+    in O(k log n) statements instead of one statement per row. Returns rows inserted.
+    """
+    savepoint = f"bisect_{depth}"
+    m_cur.execute(f"SAVEPOINT {savepoint}")
+    try:
+        if len(rows) == 1:
+            m_cur.execute(insert_sql, rows[0])
+        else:
+            m_cur.executemany(insert_sql, rows)
+        m_cur.execute(f"RELEASE SAVEPOINT {savepoint}")
+        return len(rows)
+    except MaxErrorsExceeded:
+        raise
+    except Exception as e:
+        m_cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+        if len(rows) == 1:
+            on_reject(rows[0], e)
+            return 0
+    mid = len(rows) // 2
+    return (insert_bisect(m_cur, insert_sql, rows[:mid], on_reject, depth + 1)
+            + insert_bisect(m_cur, insert_sql, rows[mid:], on_reject, depth + 1))
+
+
+CHECKPOINT_TABLE = "_sqlite2mariadb_checkpoint"
+
+
+def ensure_checkpoint_table(mariadb_conn):
+    cur = mariadb_conn.cursor()
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS `{CHECKPOINT_TABLE}` (
+            table_name VARCHAR(255) PRIMARY KEY,
+            last_rowid BIGINT NOT NULL DEFAULT 0,
+            last_modified VARCHAR(64) NULL,
+            rows_copied BIGINT NOT NULL DEFAULT 0,
+            completed TINYINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """
+    )
+    mariadb_conn.commit()
+
+
+def read_checkpoint(mariadb_conn, table_name) -> dict | None:
+    cur = mariadb_conn.cursor()
+    cur.execute(
+        f"SELECT last_rowid, last_modified, rows_copied, completed FROM `{CHECKPOINT_TABLE}` WHERE table_name = %s",
+        (table_name,),
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+    return {"last_rowid": row[0], "last_modified": row[1], "rows_copied": row[2], "completed": bool(row[3])}
+
+
+def write_checkpoint(m_cur, table_name, state, completed=False):
+    """Record progress in the caller's open transaction, so data and checkpoint commit together."""
+    last_modified = state["max_modified"] if completed else state["last_modified"]
+    m_cur.execute(
+        f"INSERT INTO `{CHECKPOINT_TABLE}` (table_name, last_rowid, last_modified, rows_copied, completed) "
+        "VALUES (%s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE last_rowid = VALUES(last_rowid), "
+        "last_modified = VALUES(last_modified), rows_copied = VALUES(rows_copied), completed = VALUES(completed)",
+        (table_name, state["last_rowid"], last_modified, state["rows_copied"], int(completed)),
+    )
+
+
+def has_rowid(sqlite_conn, table_name) -> bool:
+    """False for WITHOUT ROWID tables, which can only be copied in full."""
+    try:
+        sqlite_conn.execute(f'SELECT rowid FROM "{table_name}" LIMIT 0')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def open_sync_cursor(sqlite_conn, mariadb_conn, table_name, cols, mode, dry_run):
+    """
+    Build the source cursor and sync state for a table.
+    Selected rows are (rowid, *cols) when the table has a rowid, ordered by rowid and
+    starting after the checkpoint for --resume / --incremental. Returns (cursor, state),
+    or (None, state) when a --resume run finds the table already completed.
+    """
+    use_rowid = has_rowid(sqlite_conn, table_name)
+    # last_modified is what checkpoints record until the table completes; max_modified is the
+    # newest stamp copied so far. An incremental run keeps the previous run's stamp in its
+    # checkpoints: its rows arrive in rowid order, not stamp order, so a newer stamp saved
+    # mid-table would make the next run skip changed rows this one had not reached yet.
+    state = {"use_rowid": use_rowid, "last_rowid": 0, "last_modified": None, "max_modified": None,
+             "rows_copied": 0, "incremental": mode == "incremental",
+             "modified_idx": cols.index("row_modified") if "row_modified" in cols else None}
+    checkpoint = read_checkpoint(mariadb_conn, table_name) if (use_rowid and not dry_run and mode != "full") else None
+
+    where, params = [], []
+    if checkpoint and mode == "resume":
+        if checkpoint["completed"]:
+            return None, state
+        state.update(last_rowid=checkpoint["last_rowid"], last_modified=checkpoint["last_modified"],
+                     max_modified=checkpoint["last_modified"], rows_copied=checkpoint["rows_copied"])
+        where.append("rowid > ?")
+        params.append(checkpoint["last_rowid"])
+    elif checkpoint and mode == "incremental":
+        state.update(last_rowid=checkpoint["last_rowid"], last_modified=checkpoint["last_modified"],
+                     max_modified=checkpoint["last_modified"])
+        if state["modified_idx"] is not None and checkpoint["last_modified"]:
+            where.append("(rowid > ? OR row_modified > ?)")
+            params.extend([checkpoint["last_rowid"], checkpoint["last_modified"]])
+        else:
+            where.append("rowid > ?")
+            params.append(checkpoint["last_rowid"])
+
+    select_cols = ", ".join('"' + c + '"' for c in cols)
+    sql = f'SELECT {"rowid, " if use_rowid else ""}{select_cols} FROM "{table_name}"'
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if use_rowid:
+        sql += " ORDER BY rowid"
     s_cur = sqlite_conn.cursor()
-    s_cur.execute(f"PRAGMA table_info('{table_name}')")
-    cols = [row[1] for row in s_cur.fetchall()]
+    s_cur.execute(sql, params)
+    return s_cur, state
+
+
+def _split_batch(batch, state):
+    """Strip the leading rowid from source rows and advance the sync state."""
+    if not state["use_rowid"]:
+        return [tuple(row) for row in batch]
+    params = [tuple(row)[1:] for row in batch]
+    state["last_rowid"] = max(state["last_rowid"], max(row[0] for row in batch))
+    idx = state["modified_idx"]
+    if idx is not None:
+        stamps = [row[idx] for row in params if row[idx] is not None]
+        if stamps:
+            state["max_modified"] = max(stamps + ([state["max_modified"]] if state["max_modified"] else []))
+            if not state["incremental"]:
+                state["last_modified"] = state["max_modified"]
+    return params
+
+
+def copy_table_data(sqlite_conn, mariadb_conn, table_name, dry_run,
+                    batch_size=BATCH_SIZE, commit_rows=COMMIT_ROWS, verbose=True, mode="full", rejects=None):
+    """
+    Copy rows of a table with executemany batches inside large transactions, checkpointing
+    the last rowid with every commit. mode: "full", "resume" or "incremental" (upserts).
+    Failed batches are bisected and bad rows go to `rejects` (a RejectLog).
+    Returns the number of rows copied in this run.
+    """
+    cols = [c for c, _ in table_columns(sqlite_conn, table_name)]
     if not cols:
-        return
+        return 0
     col_list = ", ".join([f"`{c}`" for c in cols])
     placeholders = ", ".join(["%s"] * len(cols))
     insert_sql = f"INSERT INTO `{table_name}` ({col_list}) VALUES ({placeholders})"
-    s_cur.execute(f"SELECT {', '.join('\"'+c+'\"' for c in cols)} FROM \"{table_name}\"")
-    batch = s_cur.fetchmany(BATCH_SIZE)
+    if mode == "incremental":
+        insert_sql += " ON DUPLICATE KEY UPDATE " + ", ".join(f"`{c}` = VALUES(`{c}`)" for c in cols)
+
+    s_cur, state = open_sync_cursor(sqlite_conn, mariadb_conn, table_name, cols, mode, dry_run)
+    if s_cur is None:
+        if verbose:
+            log(f"  {table_name} already completed, skipping (--resume)")
+        return 0
+
+    batch = s_cur.fetchmany(batch_size)
     total = 0
-    m_cur = mariadb_conn.cursor()
+    uncommitted = 0
+    m_cur = mariadb_conn.cursor() if not dry_run else None
+
+    def on_reject(row, error):
+        if rejects is not None:
+            rejects.record(table_name, cols, row, error)
+        else:
+            log(f"Failed inserting row: {row} error: {error}")
+
     while batch:
-        params = [tuple(row) for row in batch]
+        if rejects is not None:
+            rejects.check()  # another table's worker may have gone over --max-errors
+        params = _split_batch(batch, state)
         if dry_run:
             for p in params[:5]:
                 print("-- DRY RUN INSERT:", insert_sql, p)
             # don't print all rows in dry-run
         else:
-            try:
-                m_cur.executemany(insert_sql, params)
-                mariadb_conn.commit()
-            except Exception as e:
-                mariadb_conn.rollback()
-                # try row-by-row to surface bad rows
-                for r in params:
-                    try:
-                        m_cur.execute(insert_sql, r)
-                    except Exception as ex:
-                        print("Failed inserting row:", r, "error:", ex)
+            # Savepoints keep earlier batches of the transaction when a batch fails
+            inserted = insert_bisect(m_cur, insert_sql, params, on_reject)
+            uncommitted += len(params)
+            state["rows_copied"] += inserted
+            if uncommitted >= commit_rows:
+                write_checkpoint(m_cur, table_name, state)
                 mariadb_conn.commit()
+                uncommitted = 0
         total += len(batch)
-        print(f"  Inserted {total} rows into {table_name}...", end="\r")
-        batch = s_cur.fetchmany(BATCH_SIZE)
-    print(f"\n  Finished copying data for {table_name}: {total} rows")
+        if verbose:
+            log(f"  Inserted {total} rows into {table_name}...", end="\r")
+        batch = s_cur.fetchmany(batch_size)
+    if not dry_run:
+        write_checkpoint(m_cur, table_name, state, completed=True)
+        mariadb_conn.commit()
+    if verbose:
+        log(f"\n  Finished copying data for {table_name}: {total} rows")
+    return total
+
+
+def _tsv_field(value, is_blob: bool) -> str:
+    """Encode one value for LOAD DATA's default escaping (\\N = NULL, backslash escapes)."""
+    if value is None:
+        return "\\N"
+    if is_blob:
+        return value.encode("utf-8").hex() if isinstance(value, str) else bytes(value).hex()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        text = bytes(value).decode("utf-8", "replace")
+    else:
+        text = repr(value) if isinstance(value, float) else str(value)
+    return (
+        text.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+        .replace("\0", "\\0")
+    )
+
+
+def load_data_table(sqlite_conn, mariadb_conn, table_name, commit_rows=COMMIT_ROWS, verbose=True, mode="full"):
+    """
+    Stream a table into temporary TSV files of `commit_rows` rows each and load every
+    file with LOAD DATA LOCAL INFILE (one transaction per file, checkpointed like
+    copy_table_data). BLOB columns travel hex-encoded and are decoded with UNHEX().
+    In incremental mode rows are loaded with REPLACE. Returns the number of rows loaded.
+    """
+    columns = table_columns(sqlite_conn, table_name)
+    if not columns:
+        return 0
+    cols = [c for c, _ in columns]
+    blob_flags = ["BLOB" in ctype.upper() for _, ctype in columns]
+    targets = []
+    assignments = []
+    for i, (col, _) in enumerate(columns):
+        if blob_flags[i]:
+            targets.append(f"@v{i}")
+            assignments.append(f"`{col}` = UNHEX(@v{i})")
+        else:
+            targets.append(f"`{col}`")
+
+    s_cur, state = open_sync_cursor(sqlite_conn, mariadb_conn, table_name, cols, mode, False)
+    if s_cur is None:
+        if verbose:
+            log(f"  {table_name} already completed, skipping (--resume)")
+        return 0
+    m_cur = mariadb_conn.cursor()
+    total = 0
+    while True:
+        rows = s_cur.fetchmany(commit_rows)
+        if not rows:
+            break
+        rows = _split_batch(rows, state)
+        fd, path = tempfile.mkstemp(prefix=f"{table_name}_", suffix=".tsv")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                for row in rows:
+                    f.write("\t".join(_tsv_field(v, blob_flags[i]) for i, v in enumerate(row)) + "\n")
+            load_sql = (
+                f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' "
+                f"{'REPLACE ' if mode == 'incremental' else ''}INTO TABLE `{table_name}` "
+                "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(targets)})"
+                + (f" SET {', '.join(assignments)}" if assignments else "")
+            )
+            m_cur.execute(load_sql)
+            state["rows_copied"] += len(rows)
+            write_checkpoint(m_cur, table_name, state)
+            mariadb_conn.commit()
+        finally:
+            os.remove(path)
+        total += len(rows)
+        if verbose:
+            log(f"  Loaded {total} rows into {table_name}...", end="\r")
+    write_checkpoint(m_cur, table_name, state, completed=True)
+    mariadb_conn.commit()
+    if verbose:
+        log(f"\n  Finished loading data for {table_name}: {total} rows")
+    return total
+
+
+def _copy_table_worker(args, table_name, rejects=None):
+    """Copy one table on dedicated connections; returns (table, rows, seconds)."""
+    start = time.perf_counter()
+    sqlite_conn = sqlite3.connect(args.sqlite)
+    m_conn = connect_mariadb(args, args.database)
+    try:
+        prepare_bulk_session(m_conn)
+        if args.load_data:
+            rows = load_data_table(sqlite_conn, m_conn, table_name, args.commit_rows,
+                                   verbose=False, mode=args.mode)
+        else:
+            rows = copy_table_data(sqlite_conn, m_conn, table_name, False, args.batch_size,
+                                   args.commit_rows, verbose=False, mode=args.mode, rejects=rejects)
+    finally:
+        m_conn.close()
+        sqlite_conn.close()
+    return table_name, rows, time.perf_counter() - start
+
+
+def copy_tables_parallel(args, table_names, rejects=None) -> List[Tuple[str, int, float]]:
+    """
+    Copy tables concurrently with --jobs workers, logging per-table throughput. Once a worker
+    goes over --max-errors, queued tables are cancelled and running ones stop after their
+    current batch (the rejects' shared stop event), before MaxErrorsExceeded is re-raised.
+    """
+    stats = []
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(_copy_table_worker, args, name, rejects): name for name in table_names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                table, rows, seconds = future.result()
+            except MaxErrorsExceeded:
+                for pending in futures:
+                    pending.cancel()
+                raise
+            except Exception as e:
+                log(f"Error copying data for {name}: {e}")
+                continue
+            stats.append((table, rows, seconds))
+            log(f"  {table}: {rows} rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+    return stats
+
+
+def _create_indexes_worker(args, table_indexes):
+    """Create all indexes of one table on a dedicated connection (same-table DDL serialises anyway)."""
+    m_conn = connect_mariadb(args, args.database)
+    try:
+        m_cur = m_conn.cursor()
+        for name, tbl_name, sql in table_indexes:
+            start = time.perf_counter()
+            try:
+                m_cur.execute(convert_create_index(sql))
+                m_conn.commit()
+                log(f"Created index {name} on {tbl_name} in {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                log(f"Error creating index {name}: {e}")
+    finally:
+        m_conn.close()
+
+
+def create_indexes_parallel(args, indexes):
+    """Create secondary indexes after the load, one table per worker."""
+    by_table = {}
+    for entry in indexes:
+        if entry[2]:
+            by_table.setdefault(entry[1], []).append(entry)
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        list(pool.map(lambda group: _create_indexes_worker(args, group), by_table.values()))
+
+
+def print_throughput(stats):
+    """Per-table and overall rows/s summary."""
+    if not stats:
+        return
+    print("\nThroughput:")
+    for table, rows, seconds in sorted(stats, key=lambda s: s[2], reverse=True):
+        print(f"  {table:<40} {rows:>12,} rows {seconds:>9.1f}s {rows / max(seconds, 1e-9):>12,.0f} rows/s")
+    total_rows = sum(s[1] for s in stats)
+    print(f"  {'TOTAL':<40} {total_rows:>12,} rows")
 
 
 def main():
@@ -221,6 +677,8 @@ def main():
 
     # connect to MariaDB
     if not args.dry_run:
+        import mariadb
+
         try:
             m_conn = mariadb.connect(
                 user=args.user, password=args.password, host=args.host, port=args.port, autocommit=False
@@ -232,6 +690,7 @@ def main():
             )
             m_cur.execute(f"USE `{args.database}`;")
             m_conn.commit()
+            ensure_checkpoint_table(m_conn)
         except Exception as e:
             print("MariaDB connection error:", e)
             sys.exit(1)
@@ -278,14 +737,47 @@ def main():
             print(f"Failed converting/creating table {tbl_name}: {e}")
 
     # COPY data for each table
-    for name, tbl_name, sql in tables:
-        print(f"Copying data for {tbl_name}...")
-        try:
-            copy_table_data(sqlite_conn, m_conn, tbl_name, args.dry_run)
-        except Exception as e:
-            print(f"Error copying data for {tbl_name}: {e}")
-
-    # CREATE indexes (non-unique or unique)
+    rejects = RejectLog(None if args.dry_run else args.reject_file, args.max_errors)
+    stats = []
+    try:
+        if args.jobs > 1 and not args.dry_run:
+            print(f"Copying data for {len(tables)} tables with {args.jobs} jobs...")
+            stats = copy_tables_parallel(args, [tbl_name for _, tbl_name, _ in tables], rejects)
+        else:
+            if not args.dry_run:
+                prepare_bulk_session(m_conn)
+            for name, tbl_name, sql in tables:
+                print(f"Copying data for {tbl_name}...")
+                start = time.perf_counter()
+                try:
+                    if args.load_data and not args.dry_run:
+                        rows = load_data_table(sqlite_conn, m_conn, tbl_name, args.commit_rows, mode=args.mode)
+                    else:
+                        rows = copy_table_data(sqlite_conn, m_conn, tbl_name, args.dry_run, args.batch_size,
+                                               args.commit_rows, mode=args.mode, rejects=rejects)
+                    stats.append((tbl_name, rows, time.perf_counter() - start))
+                except MaxErrorsExceeded:
+                    raise
+                except Exception as e:
+                    print(f"Error copying data for {tbl_name}: {e}")
+    except MaxErrorsExceeded as e:
+        print(f"Aborting: {e}. Rejected rows are in {args.reject_file}")
+        if m_conn:
+            m_conn.rollback()
+            m_conn.close()
+        sys.exit(1)
+    finally:
+        rejects.close()
+    if not args.dry_run:
+        print_throughput(stats)
+        if rejects.count:
+            print(f"{rejects.count} rows rejected, see {args.reject_file}")
+
+    # CREATE indexes (non-unique or unique) after the data load
+    if args.jobs > 1 and not args.dry_run:
+        print(f"Creating {len(indexes)} indexes with {args.jobs} jobs...")
+        create_indexes_parallel(args, indexes)
+        indexes = []
     for name, tbl_name, sql in indexes:
         print(f"Creating index {name} on {tbl_name}...")
         try:
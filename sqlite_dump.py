@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+sqlite_dump.py
+
+Streams a SQLite database (schema + data) into a chunked, zstd-compressed dump file and
+restores it, in parallel, into MariaDB or a new SQLite file. Used to ship snapshots between
+hosts without a live MariaDB connection.
+
+Usage:
+  python sqlite_dump.py export --sqlite ./db.sqlite --out snapshot.sqlz [--chunk-rows 50000] [--level 3]
+  python sqlite_dump.py import --dump snapshot.sqlz --sqlite-out ./restored.sqlite [--jobs 4]
+  python sqlite_dump.py import --dump snapshot.sqlz --host 127.0.0.1 --user root --password secret \
+      --database target_db [--jobs 8] [--batch-size 5000] [--auto-increment]
+
+File layout:
+  MAGIC | schema frame | data frames ... | index frame | footer
+- Every frame is an independent zstd frame (with checksum), so chunks can be read with a
+  seek and decompressed in any order.
+- Schema frame: JSON list of sqlite_master entries {type, name, tbl_name, sql}.
+- Data frame: up to --chunk-rows rows of one table, one JSON array per line. BLOB values are
+  tagged as {"$b": "<base64>"}.
+- Index frame: JSON {"schema": [offset, size], "tables": {name: {"columns", "rows",
+  "chunks": [[offset, size, rows], ...]}}}.
+- Footer: index offset and size (2 x uint64 little-endian) followed by MAGIC.
+Export and import hold at most one chunk per worker in memory.
+"""
+
+import argparse
+import base64
+import json
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import zstandard
+
+from sqlite2mariadb import (
+    BATCH_SIZE,
+    RejectLog,
+    connect_mariadb,
+    convert_create_index,
+    convert_create_table,
+    convert_create_trigger,
+    convert_create_view,
+    insert_bisect,
+    log,
+    prepare_bulk_session,
+    table_columns,
+)
+
+MAGIC = b"SQLZDMP1"
+FOOTER = struct.Struct("<QQ")
+CHUNK_ROWS = 50000
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="zstd dump/restore for SQLite databases")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="Dump a SQLite database to a compressed file")
+    exp.add_argument("--sqlite", required=True, help="Path to SQLite file")
+    exp.add_argument("--out", required=True, help="Dump file to write")
+    exp.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows per compressed chunk")
+    exp.add_argument("--level", type=int, default=3, help="zstd compression level")
+
+    imp = sub.add_parser("import", help="Restore a dump into MariaDB or a new SQLite file")
+    imp.add_argument("--dump", required=True, help="Dump file to read")
+    imp.add_argument("--sqlite-out", help="Restore into this new SQLite file instead of MariaDB")
+    imp.add_argument("--host", default="127.0.0.1")
+    imp.add_argument("--port", type=int, default=3306)
+    imp.add_argument("--user", default="root")
+    imp.add_argument("--password")
+    imp.add_argument("--database", help="Target MariaDB database name")
+    imp.add_argument("--auto-increment", action="store_true", help="Convert INTEGER PRIMARY KEY to AUTO_INCREMENT")
+    imp.add_argument("--jobs", type=int, default=4, help="Chunks decompressed / loaded concurrently")
+    imp.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per executemany batch")
+    imp.add_argument("--reject-file", default="sqlite_dump_rejects.jsonl",
+                     help="JSON-lines file receiving rows that failed to insert")
+    imp.add_argument("--max-errors", type=int, default=None, help="Abort once this many rows were rejected")
+
+    args = p.parse_args()
+    if args.command == "import" and not args.sqlite_out and not (args.password is not None and args.database):
+        p.error("import needs --sqlite-out, or --password and --database for MariaDB")
+    return args
+
+
+def _encode_value(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"$b": base64.b64encode(bytes(value)).decode("ascii")}
+    raise TypeError(f"Unsupported value type {type(value).__name__}")
+
+
+def _decode_row(row: list) -> tuple:
+    return tuple(
+        base64.b64decode(v["$b"]) if isinstance(v, dict) else v
+        for v in row
+    )
+
+
+class DumpWriter:
+    """Appends independently compressed frames to the dump and records their offsets."""
+
+    def __init__(self, path: str, level: int = 3):
+        self.f = open(path, "wb")
+        self.f.write(MAGIC)
+        self.compressor = zstandard.ZstdCompressor(level=level, write_checksum=True)
+        self.raw_bytes = 0
+
+    def write_frame(self, payload: bytes) -> list:
+        """Write one frame; returns [offset, size]."""
+        offset = self.f.tell()
+        data = self.compressor.compress(payload)
+        self.f.write(data)
+        self.raw_bytes += len(payload)
+        return [offset, len(data)]
+
+    def close(self, index: dict):
+        offset, size = self.write_frame(json.dumps(index).encode("utf-8"))
+        self.f.write(FOOTER.pack(offset, size) + MAGIC)
+        self.f.close()
+
+
+class DumpReader:
+    """Random access to the frames of a dump; safe to share between threads (uses pread)."""
+
+    def __init__(self, path: str):
+        self.fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        self._local = threading.local()
+        file_size = os.fstat(self.fd).st_size
+        tail = os.pread(self.fd, FOOTER.size + len(MAGIC), file_size - FOOTER.size - len(MAGIC))
+        if os.pread(self.fd, len(MAGIC), 0) != MAGIC or tail[FOOTER.size:] != MAGIC:
+            raise ValueError(f"{path} is not a sqlite_dump file")
+        self.index = json.loads(self.read_frame(*FOOTER.unpack(tail[:FOOTER.size])))
+        self.schema = json.loads(self.read_frame(*self.index["schema"]))
+
+    def read_frame(self, offset: int, size: int) -> bytes:
+        # ZstdDecompressor instances are not thread-safe; keep one per thread
+        if not hasattr(self._local, "decompressor"):
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.decompressor.decompress(os.pread(self.fd, size, offset))
+
+    def read_chunk(self, offset: int, size: int) -> list[tuple]:
+        return [_decode_row(json.loads(line)) for line in self.read_frame(offset, size).splitlines()]
+
+    def chunks(self):
+        """Yield (table, offset, size, rows) for every data chunk."""
+        for table, info in self.index["tables"].items():
+            for offset, size, rows in info["chunks"]:
+                yield table, offset, size, rows
+
+    def close(self):
+        os.close(self.fd)
+
+
+def export_dump(args):
+    sqlite_conn = sqlite3.connect(args.sqlite)
+    start = time.perf_counter()
+    schema = [
+        {"type": t, "name": n, "tbl_name": tn, "sql": sql}
+        for t, n, tn, sql in sqlite_conn.execute(
+            "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE sql NOT NULL ORDER BY type DESC, name"
+        )
+    ]
+    writer = DumpWriter(args.out, args.level)
+    index = {"version": 1, "schema": writer.write_frame(json.dumps(schema).encode("utf-8")), "tables": {}}
+
+    total = 0
+    for entry in schema:
+        if entry["type"] != "table" or entry["name"].startswith("sqlite_"):
+            continue
+        table = entry["name"]
+        cols = [c for c, _ in table_columns(sqlite_conn, table)]
+        info = {"columns": cols, "rows": 0, "chunks": []}
+        select_cols = ", ".join('"' + c + '"' for c in cols)
+        s_cur = sqlite_conn.execute(f'SELECT {select_cols} FROM "{table}"')
+        while True:
+            rows = s_cur.fetchmany(args.chunk_rows)
+            if not rows:
+                break
+            payload = "\n".join(json.dumps(row, default=_encode_value) for row in rows).encode("utf-8")
+            info["chunks"].append(writer.write_frame(payload) + [len(rows)])
+            info["rows"] += len(rows)
+        index["tables"][table] = info
+        total += info["rows"]
+        log(f"  Exported {table}: {info['rows']} rows in {len(info['chunks'])} chunks")
+
+    writer.close(index)
+    sqlite_conn.close()
+    seconds = time.perf_counter() - start
+    packed = os.path.getsize(args.out)
+    log(f"Wrote {args.out}: {total:,} rows, {writer.raw_bytes / 1e6:.2f} MB raw -> {packed / 1e6:.2f} MB "
+        f"in {seconds:.1f}s ({total / max(seconds, 1e-9):,.0f} rows/s)")
+
+
+def _schema_of(reader: DumpReader, type_: str) -> list[dict]:
+    return [e for e in reader.schema if e["type"] == type_ and not e["name"].startswith("sqlite_")]
+
+
+def _insert_sql(table: str, cols: list[str], quote: str, placeholder: str) -> str:
+    col_list = ", ".join(f"{quote}{c}{quote}" for c in cols)
+    return f"INSERT INTO {quote}{table}{quote} ({col_list}) VALUES ({', '.join([placeholder] * len(cols))})"
+
+
+def _iter_decoded(reader: DumpReader, jobs: int):
+    """Decompress chunks on `jobs` threads, yielding (table, rows) in file order with a bounded window."""
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for table, offset, size, _ in reader.chunks():
+            pending.append((table, pool.submit(reader.read_chunk, offset, size)))
+            if len(pending) >= jobs * 2:
+                table_, future = pending.popleft()
+                yield table_, future.result()
+        while pending:
+            table_, future = pending.popleft()
+            yield table_, future.result()
+
+
+def import_sqlite(reader: DumpReader, args):
+    """Restore into a new SQLite file: tables, data in one transaction, then indexes, views, triggers."""
+    if os.path.exists(args.sqlite_out):
+        sys.exit(f"{args.sqlite_out} already exists; refusing to overwrite")
+    conn = sqlite3.connect(args.sqlite_out, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA synchronous = OFF")
+    for entry in _schema_of(reader, "table"):
+        conn.execute(entry["sql"])
+
+    columns = {table: info["columns"] for table, info in reader.index["tables"].items()}
+    total = 0
+    conn.execute("BEGIN")
+    for table, rows in _iter_decoded(reader, args.jobs):
+        conn.executemany(_insert_sql(table, columns[table], '"', "?"), rows)
+        total += len(rows)
+        log(f"  Loaded {total:,} rows...", end="\r")
+    conn.execute("COMMIT")
+    log("")
+
+    # triggers last so they don't fire on the restored rows
+    for type_ in ("index", "view", "trigger"):
+        for entry in _schema_of(reader, type_):
+            conn.execute(entry["sql"])
+    conn.execute("PRAGMA synchronous = FULL")
+    conn.close()
+    return total
+
+
+def _load_chunk_mariadb(reader: DumpReader, args, table, cols, offset, size, rejects):
+    """Load one chunk on a dedicated MariaDB connection, bisecting failed batches."""
+    rows = reader.read_chunk(offset, size)
+    insert_sql = _insert_sql(table, cols, "`", "%s")
+    m_conn = connect_mariadb(args, args.database)
+    try:
+        prepare_bulk_session(m_conn)
+        m_cur = m_conn.cursor()
+        inserted = 0
+        for i in range(0, len(rows), args.batch_size):
+            inserted += insert_bisect(
+                m_cur, insert_sql, rows[i:i + args.batch_size],
+                lambda row, error: rejects.record(table, cols, row, error),
+            )
+        m_conn.commit()
+    finally:
+        m_conn.close()
+    return table, inserted
+
+
+def import_mariadb(reader: DumpReader, args):
+    """Restore into MariaDB: tables, chunks in parallel (one connection each), then indexes, views, triggers."""
+    m_conn = connect_mariadb(args)
+    m_cur = m_conn.cursor()
+    m_cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+    m_cur.execute(f"USE `{args.database}`")
+    for entry in _schema_of(reader, "table"):
+        try:
+            m_cur.execute(convert_create_table(entry["sql"], args.auto_increment))
+            m_conn.commit()
+        except Exception as e:
+            log(f"Error creating table {entry['name']}: {e}")
+
+    rejects = RejectLog(args.reject_file, args.max_errors)
+    total = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [
+                pool.submit(_load_chunk_mariadb, reader, args, table,
+                            reader.index["tables"][table]["columns"], offset, size, rejects)
+                for table, offset, size, _ in reader.chunks()
+            ]
+            for future in as_completed(futures):
+                try:
+                    _, inserted = future.result()
+                except Exception:
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                total += inserted
+                log(f"  Loaded {total:,} rows...", end="\r")
+    finally:
+        rejects.close()
+    log("")
+    if rejects.count:
+        log(f"{rejects.count} rows rejected, see {args.reject_file}")
+
+    converters = {"index": convert_create_index, "view": convert_create_view, "trigger": convert_create_trigger}
+    for type_, convert in converters.items():
+        for entry in _schema_of(reader, type_):
+            try:
+                m_cur.execute(convert(entry["sql"]))
+                m_conn.commit()
+            except Exception as e:
+                log(f"Error creating {type_} {entry['name']}: {e}")
+    m_conn.close()
+    return total
+
+
+def main():
+    args = parse_args()
+    if args.command == "export":
+        export_dump(args)
+        return
+
+    reader = DumpReader(args.dump)
+    start = time.perf_counter()
+    try:
+        if args.sqlite_out:
+            total = import_sqlite(reader, args)
+        else:
+            total = import_mariadb(reader, args)
+    finally:
+        reader.close()
+    seconds = time.perf_counter() - start
+    log(f"Imported {total:,} rows in {seconds:.1f}s ({total / max(seconds, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
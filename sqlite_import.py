@@ -1,11 +1,261 @@
+#!/usr/bin/env python3
+"""
+sqlite_import.py
+
+Streaming bulk loader for SQL seed files into SQLite.
+
+Usage:
+  python sqlite_import.py                                    # loads sqlite_lms_dml_schema.sql into db.sqlite
+  python sqlite_import.py --db new.sqlite sqlite_lms_ddl_schema.sql sqlite_lms_dml_schema.sql
+  python sqlite_import.py ... [--commit-rows 500000] [--cache-mb 256] [--journal-mode MEMORY] [--no-defer]
+
+Notes:
+- Files are read statement by statement (sqlite3.complete_statement), never whole.
+- Load-time pragmas (journal_mode, synchronous=OFF, cache_size) are applied for the load
+  and restored afterwards; rows are committed in transactions of --commit-rows rows.
+- Non-unique indexes (from the files, and existing ones in the target) are created after
+  the data, except that a table's indexes are built before a statement that reads it
+  (INSERT ... SELECT), so its query plan, row order and rowids match executescript.
+- Triggers that only check rows (e.g. the FK-check triggers of sqlite_lms_ddl_schema.sql)
+  are created after the data; triggers that write (the row_modified triggers) or skip rows
+  with RAISE(IGNORE) are created where they appear, since the loaded rows depend on them.
+- Existing objects dropped for the load are recorded in _sqlite_import_deferred in the same
+  transaction, so a load that crashes after a commit restores them on the next run.
+- ANALYZE runs at the end; progress is printed in rows/s.
+"""
+
+import argparse
+import re
 import sqlite3
+import sys
+import time
+
+COMMIT_ROWS = 500000
+PROGRESS_SECONDS = 2.0
+
+_IDENT = r'(?:"[^"]+"|`[^`]+`|\[[^\]]+\]|[\w$]+)'
+_CREATE_INDEX_RE = re.compile(
+    rf"^CREATE\s+(UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?({_IDENT}(?:\.{_IDENT})?)\s+ON\s+({_IDENT})", re.I
+)
+_CREATE_TRIGGER_RE = re.compile(
+    rf"^CREATE\s+(?:TEMP\w*\s+)?TRIGGER\s+(?:IF\s+NOT\s+EXISTS\s+)?({_IDENT})\s+"
+    rf"(?:BEFORE\s+|AFTER\s+|INSTEAD\s+OF\s+)?(INSERT|UPDATE|DELETE)\b.*?\bON\s+({_IDENT})",
+    re.I | re.S,
+)
+_DROP_RE = re.compile(rf"^DROP\s+(INDEX|TRIGGER)\s+(?:IF\s+EXISTS\s+)?({_IDENT})", re.I)
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_CREATE_TABLE_RE = re.compile(r"^CREATE\s+(?:TEMP\w*\s+)?TABLE\b", re.I)
+_READS_RE = re.compile(rf"\b(?:FROM|JOIN)\s+({_IDENT})", re.I)
+_WRITES_RE = re.compile(r"\b(?:INSERT|REPLACE|UPDATE|DELETE)\b|\bRAISE\s*\(\s*IGNORE\b", re.I)
+RECORD_TABLE = "_sqlite_import_deferred"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Stream SQL files into a SQLite database")
+    p.add_argument("files", nargs="*", default=["sqlite_lms_dml_schema.sql"], help="SQL files, loaded in order")
+    p.add_argument("--db", default="db.sqlite", help="Target SQLite file")
+    p.add_argument("--commit-rows", type=int, default=COMMIT_ROWS, help="Rows per transaction")
+    p.add_argument("--cache-mb", type=int, default=256, help="Page cache size during the load")
+    p.add_argument("--journal-mode", default="MEMORY", help="journal_mode during the load (e.g. MEMORY, OFF, WAL)")
+    p.add_argument("--no-defer", action="store_true", help="Create indexes and triggers where they appear")
+    return p.parse_args()
+
+
+def _name(ident: str) -> str:
+    return ident.strip('"`[]').lower()
+
+
+def iter_statements(path: str):
+    """Yield complete SQL statements from a file, reading it line by line."""
+    buffer = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            buffer.append(line)
+            # cheap check first: only a line with ';' can complete a statement
+            if ";" in line and sqlite3.complete_statement("".join(buffer)):
+                statement = "".join(buffer).strip()
+                buffer = []
+                if _COMMENT_RE.sub("", statement).strip(" \t\r\n;"):
+                    yield statement
+    rest = "".join(buffer)
+    if _COMMENT_RE.sub("", rest).strip():
+        yield rest.strip()
+
+
+def _trigger_writes(sql: str) -> bool:
+    """True if a trigger's body changes or skips rows, rather than only checking them."""
+    body = re.split(r"\bBEGIN\b", _COMMENT_RE.sub("", sql), maxsplit=1, flags=re.I)[-1]
+    return bool(_WRITES_RE.search(body))
+
+
+class DeferredDDL:
+    """
+    Non-unique indexes and check-only triggers held until finish(). A table's indexes are
+    created early, before the first statement that reads the table.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.indexes = {}   # name -> (table, sql)
+        self.triggers = {}  # name -> sql
+
+    def add_index(self, name, table, sql):
+        self.indexes[name] = (table, sql)
+
+    def add_trigger(self, name, sql):
+        self.triggers[name] = sql
+
+    def drop(self, kind, name) -> bool:
+        """Forget a deferred object that a DROP statement removes; True if it was deferred."""
+        pending = self.indexes if kind == "INDEX" else self.triggers
+        return pending.pop(name, None) is not None
+
+    def before_read(self, statement: str):
+        """Create the deferred indexes of every table a statement's SELECT reads."""
+        select = re.search(r"\bSELECT\b", _COMMENT_RE.sub("", statement), re.I)
+        if not select:
+            return
+        tables = {_name(t) for t in _READS_RE.findall(select.string, select.start())}
+        for name, (table, sql) in list(self.indexes.items()):
+            if table in tables:
+                del self.indexes[name]
+                self._create(sql)
+
+    def _create(self, sql):
+        try:
+            self.conn.execute(sql)
+        except sqlite3.OperationalError as e:
+            # a rolled-back load can leave the original object in place
+            if "already exists" not in str(e):
+                raise
+
+    def restore_interrupted(self):
+        """Recreate objects a crashed load dropped from the target (see defer_existing)."""
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                 (RECORD_TABLE,)).fetchone():
+            return
+        for name, sql in self.conn.execute(f"SELECT name, sql FROM {RECORD_TABLE}").fetchall():
+            self._create(sql)
+            print(f"Restored {name} dropped by an interrupted load")
+        self.conn.execute(f"DROP TABLE {RECORD_TABLE}")
+
+    def defer_existing(self):
+        """
+        Drop the target's existing non-unique indexes and check-only triggers so they are
+        rebuilt after the load; each is recorded in RECORD_TABLE in the same transaction.
+        """
+        rows = self.conn.execute(
+            "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL"
+        ).fetchall()
+        dropped = []
+        for type_, name, tbl_name, sql in rows:
+            if type_ == "index":
+                match = _CREATE_INDEX_RE.match(sql)
+                if match and not match.group(1):
+                    self.add_index(name.lower(), tbl_name.lower(), sql)
+                    dropped.append((type_, name, sql))
+            elif _CREATE_TRIGGER_RE.match(sql) and not _trigger_writes(sql):
+                self.add_trigger(name.lower(), sql)
+                dropped.append((type_, name, sql))
+        if not dropped:
+            return
+        self.conn.execute(f"CREATE TABLE {RECORD_TABLE} (name TEXT, sql TEXT)")
+        for type_, name, sql in dropped:
+            self.conn.execute(f"INSERT INTO {RECORD_TABLE} VALUES (?, ?)", (name, sql))
+            self.conn.execute(f'DROP {type_.upper()} "{name}"')
+
+    def finish(self):
+        """Create all remaining indexes, then triggers, and forget the record of dropped objects."""
+        for name, (_, sql) in list(self.indexes.items()):
+            start = time.perf_counter()
+            self._create(sql)
+            del self.indexes[name]
+            print(f"Created index {name} in {time.perf_counter() - start:.2f}s")
+        for name, sql in list(self.triggers.items()):
+            self._create(sql)
+            del self.triggers[name]
+        self.conn.execute(f"DROP TABLE IF EXISTS {RECORD_TABLE}")
+
+
+def load(conn: sqlite3.Connection, files, commit_rows=COMMIT_ROWS, defer=True) -> int:
+    """Execute every statement of `files` in large transactions; returns rows changed."""
+    deferred = DeferredDDL(conn)
+    total = uncommitted = 0
+    start = last_report = time.perf_counter()
+    conn.execute("BEGIN")
+    try:
+        deferred.restore_interrupted()
+        if defer:
+            deferred.defer_existing()
+        for path in files:
+            print(f"Loading {path}...")
+            for statement in iter_statements(path):
+                head = _COMMENT_RE.sub("", statement).lstrip()
+                keyword = head.split(None, 1)[0].upper() if head else ""
+                if keyword in ("BEGIN", "COMMIT", "END") and not head.upper().startswith("BEGIN TRIGGER"):
+                    continue  # transactions are managed here
+                if defer:
+                    index = _CREATE_INDEX_RE.match(head)
+                    trigger = _CREATE_TRIGGER_RE.match(head)
+                    drop = _DROP_RE.match(head)
+                    if index and not index.group(1):
+                        deferred.add_index(_name(index.group(2)), _name(index.group(3)), statement)
+                        continue
+                    if trigger and not _trigger_writes(statement):
+                        deferred.add_trigger(_name(trigger.group(1)), statement)
+                        continue
+                    if drop and deferred.drop(drop.group(1).upper(), _name(drop.group(2))):
+                        continue
+                    if keyword not in ("CREATE", "DROP", "PRAGMA") or _CREATE_TABLE_RE.match(head):
+                        deferred.before_read(head)  # CREATE TABLE ... AS SELECT reads too
+
+                cur = conn.execute(statement)
+                changed = max(cur.rowcount, 0)
+                total += changed
+                uncommitted += changed
+                if uncommitted >= commit_rows:
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN")
+                    uncommitted = 0
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_SECONDS:
+                    print(f"  {total:,} rows, {total / (now - start):,.0f} rows/s", flush=True)
+                    last_report = now
+        print(f"Data loaded: {total:,} rows in {time.perf_counter() - start:.1f}s "
+              f"({total / max(time.perf_counter() - start, 1e-9):,.0f} rows/s)")
+    except Exception:
+        conn.execute("ROLLBACK")
+        conn.execute("BEGIN")
+        raise
+    finally:
+        # recreate deferred objects even when the load fails, so the schema is never left without them
+        deferred.finish()
+        conn.execute("COMMIT")
+    return total
+
+
+def main():
+    args = parse_args()
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+
+    conn.execute(f"PRAGMA journal_mode = {args.journal_mode}")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(f"PRAGMA cache_size = {-args.cache_mb * 1024}")
+    try:
+        load(conn, args.files, args.commit_rows, defer=not args.no_defer)
+        start = time.perf_counter()
+        conn.execute("ANALYZE")
+        print(f"ANALYZE in {time.perf_counter() - start:.2f}s")
+    except sqlite3.Error as e:
+        print(f"Load failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        conn.close()
 
-conn = sqlite3.connect("db.sqlite")
-cursor = conn.cursor()
 
-with open("sqlite_lms_dml_schema.sql", "r", encoding="utf-8") as f:
-    sql_script = f.read()
-    
-cursor.executescript(sql_script)
-conn.commit()
-conn.close()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Tiered routing in front of the SQL generation call.
+
+  local - greetings and obvious off-topic questions, answered without any LLM call
+  fast  - questions naming a single known table without complex cues, sent to FAST_LLM_MODEL
+  main  - everything else (including questions naming no known table), sent to the main model
+
+The local tier uses rules first, then the question embedding process_question
+already computed: its similarity to a few greeting / off-topic examples must
+clearly beat its similarity to questions built from the schema, and the question
+must not mention any table or column.
+
+Usage (per-tier latency and ratings from query_history):
+  python -m src.agents.router report
+"""
+import re
+import sys
+import logging
+
+import numpy as np
+
+from src.db.summaries import is_summary_table
+from src.utils.env_loader import load_env
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+ROUTER = config.get("ROUTER", "true") == "true"
+ROUTER_LOCAL_MIN_SIMILARITY = float(config.get("ROUTER_LOCAL_MIN_SIMILARITY", 0.55))
+ROUTER_LOCAL_MARGIN = float(config.get("ROUTER_LOCAL_MARGIN", 0.1))
+ROUTER_FAST_MAX_TABLES = int(config.get("ROUTER_FAST_MAX_TABLES", 1))
+
+LOCAL, FAST, MAIN = "local", "fast", "main"
+
+# A whole message made of greetings / thanks, optionally with filler words and punctuation;
+# anything else after "hi," (e.g. "hi, list all records") is a question for the LLM tiers
+_GREETING = (r"(hi|hello|hey|hiya|yo|greetings|good (morning|afternoon|evening|day)|thanks|thank you|thx|cheers|"
+             r"bye|goodbye|see you( later| soon)?|how are you( doing)?|how's it going)")
+_GREETING_FILLER = (r"(there|all|everyone|everybody|folks|team|again|so much|a lot|very much|you|buddy|friend|mate|"
+                    r"bot|then|for (your|the) help|for that)")
+_GREETING_RE = re.compile(
+    rf"^[\s,.!?']*{_GREETING}([\s,.!?']+({_GREETING}|{_GREETING_FILLER}))*[\s,.!?']*$",
+    re.I,
+)
+_GREETING_MAX_WORDS = 6
+# Asking for data, so never a local reply even when the embedding looks like small talk
+_DATA_CUES = re.compile(
+    r"\b(list|show|display|count|how many|how much|records?|rows?|entries|everything|data|tables?|report|"
+    r"export|give me|fetch|get me|find)\b",
+    re.I,
+)
+
+_EXAMPLES = {
+    "GREETING": [
+        "hello", "hi there", "good morning", "hey, how are you?", "thanks a lot",
+        "thank you for your help", "bye", "see you later",
+    ],
+    "OFF_TOPIC": [
+        "what's the weather like today", "tell me a joke", "who won the football match yesterday",
+        "write me a poem", "what is the capital of france", "how do I cook pasta",
+        "what is the meaning of life", "recommend a good movie",
+    ],
+}
+
+# Phrases that usually need joins, grouping over several entities or subqueries
+_COMPLEX_CUES = re.compile(
+    r"\b(per|for each|each|by (each|every)|compare|compared|versus|vs|ratio|percentage|share|trend|"
+    r"over time|rank|top \d+|without|never|not|both|more than|less than|at least|across|between|"
+    r"together with|along with|and their|with their)\b",
+    re.I,
+)
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9]+")
+
+
+def _words(text: str) -> set[str]:
+    """Lower-case words of `text`, with a naive singular form of each plural."""
+    words = set(_WORD_RE.findall(text.lower()))
+    return words | {w[:-1] for w in words if w.endswith("s") and len(w) > 3}
+
+
+def parse_schema(schema: str) -> dict[str, list[str]]:
+    """{table: [columns]} from either schema description format (SQLite or MariaDB)."""
+    tables, current = {}, None
+    for line in schema.splitlines():
+        if line.startswith("TABLE:"):
+            current = line.split(":", 1)[1].strip()
+            tables[current] = []
+        elif current and (m := re.match(r"^\s*-\s*(\w+)\s*\(", line)):
+            tables[current].append(m.group(1))
+        elif m := re.match(r"^(\w+):\s*(\S.*)$", line):
+            current = None
+            tables[m.group(1)] = [c.split(" (")[0].strip() for c in m.group(2).split(", ")]
+    return tables
+
+
+class Router:
+    """Picks the tier for a question against one database's schema."""
+
+    def __init__(self, schema: str, has_fast_model: bool):
+        self.has_fast_model = has_fast_model
+        # summary tables are an implementation detail, not something users ask about
+        tables = {t: c for t, c in parse_schema(schema).items() if not is_summary_table(t)}
+
+        # words identifying a table: parts of its name shared by at most a third of the
+        # tables (so a common prefix like `canvas_` does not count), and unique columns
+        name_counts = {}
+        for table in tables:
+            for word in _words(table.replace("_", " ")):
+                name_counts[word] = name_counts.get(word, 0) + 1
+        column_counts = {}
+        for columns in tables.values():
+            for column in set(columns):
+                column_counts[column.lower()] = column_counts.get(column.lower(), 0) + 1
+        limit = max(1, len(tables) // 3)
+        self.table_words = {
+            table: {w for w in _words(table.replace("_", " ")) if name_counts[w] <= limit}
+                   | {c.lower() for c in columns if column_counts[c.lower()] == 1}
+            for table, columns in tables.items()
+        }
+        self.vocabulary = set().union(*self.table_words.values()) if tables else set()
+        self.vocabulary |= {c.lower() for columns in tables.values() for c in columns}
+        self.vocabulary |= {w for c in self.vocabulary for w in _words(c.replace("_", " ")) if len(w) > 3}
+        self._data_examples = [f"how many {' '.join(sorted(words)[:3])} are there" for words in self.table_words.values()
+                               if words] or ["how many records are there"]
+        self._example_vectors = None
+
+    def _examples(self):
+        """Example vectors per label, embedded on first use (kept in the shared cache)."""
+        if self._example_vectors is None:
+            from src.llm.factory import embed_queries
+
+            labelled = [(label, text) for label, texts in _EXAMPLES.items() for text in texts]
+            labelled += [("DATA", text) for text in self._data_examples]
+            vectors = np.asarray(embed_queries([text for _, text in labelled]), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+            self._example_vectors = ([label for label, _ in labelled], vectors)
+        return self._example_vectors
+
+    def mentioned_tables(self, question: str) -> set[str]:
+        words = _words(question.replace("_", " ")) | set(re.findall(r"\w+", question.lower()))
+        return {table for table, table_words in self.table_words.items() if words & table_words}
+
+    def classify_text(self, question: str) -> dict:
+        """Tier from the question text alone: the greeting rule, then fast vs main."""
+        words = _words(question)
+        if not words & self.vocabulary and len(question.split()) <= _GREETING_MAX_WORDS \
+                and _GREETING_RE.match(question):
+            return {"tier": LOCAL, "intent": "GREETING", "reason": "greeting rule"}
+        tables = self.mentioned_tables(question)
+        # a question naming no known table may still need joins the fast model would miss
+        if (self.has_fast_model and 1 <= len(tables) <= ROUTER_FAST_MAX_TABLES
+                and not _COMPLEX_CUES.search(question)):
+            return {"tier": FAST, "reason": f"{len(tables)} table(s), no complex cues"}
+        if not self.has_fast_model:
+            reason = "no fast model configured"
+        elif _COMPLEX_CUES.search(question):
+            reason = "complex cues"
+        else:
+            reason = f"{len(tables)} tables" if tables else "no table matched"
+        return {"tier": MAIN, "reason": reason}
+
+    def classify_vector(self, question: str, vector) -> dict | None:
+        """
+        Local GREETING / OFF_TOPIC decision from the question embedding, or None when
+        the question mentions the schema or is not clearly closer to those examples.
+        """
+        if vector is None or _words(question) & self.vocabulary or _DATA_CUES.search(question):
+            return None
+        try:
+            labels, examples = self._examples()
+        except Exception as e:
+            logger.warning(f"Router examples could not be embedded: {e}")
+            return None
+        v = np.asarray(vector, dtype=np.float32)
+        similarities = examples @ (v / (np.linalg.norm(v) + 1e-12))
+        best = {}
+        for label, similarity in zip(labels, similarities):
+            best[label] = max(best.get(label, -1.0), float(similarity))
+        intent = max(("GREETING", "OFF_TOPIC"), key=lambda label: best[label])
+        if best[intent] >= ROUTER_LOCAL_MIN_SIMILARITY and best[intent] - best["DATA"] >= ROUTER_LOCAL_MARGIN:
+            return {"tier": LOCAL, "intent": intent,
+                    "reason": f"similarity {best[intent]:.2f} vs data {best['DATA']:.2f}"}
+        return None
+
+
+def local_reply(decision: dict) -> dict:
+    """process_question's answer for a local-tier decision (the same shape the LLM path returns)."""
+    return {
+        "error": "I can only answer questions about the database.",
+        "intent": decision["intent"],
+        "analysis": f"Answered locally ({decision['reason']})",
+        "tier": LOCAL,
+    }
+
+
+def tier_report():
+    """Per-tier request count, latency and ratings from query_history."""
+    from src.db.feedback import get_feedback_connection
+
+    conn = get_feedback_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT COALESCE(tier, 'unknown'), latency_ms, user_rating, status
+        FROM query_history
+    """)
+    rows = cur.fetchall()
+    conn.close()
+
+    by_tier = {}
+    for tier, latency, rating, status in rows:
+        stats = by_tier.setdefault(tier, {"latencies": [], "ratings": [], "verified": 0, "rejected": 0})
+        if latency is not None:
+            stats["latencies"].append(float(latency))
+        if rating is not None:
+            stats["ratings"].append(int(rating))
+        stats["verified"] += status == "verified"
+        stats["rejected"] += status == "rejected"
+
+    print(f"{'tier':<8} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'rated':>6} {'avg rating':>10} {'verified':>8} {'rejected':>8}")
+    for tier, stats in sorted(by_tier.items()):
+        latencies = sorted(stats["latencies"])
+        p50 = latencies[len(latencies) // 2] if latencies else float("nan")
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else float("nan")
+        ratings = stats["ratings"]
+        avg = sum(ratings) / len(ratings) if ratings else float("nan")
+        count = sum(1 for r in rows if (r[0] or "unknown") == tier)
+        print(f"{tier:<8} {count:>8} {p50:>8.0f} {p95:>8.0f} {len(ratings):>6} {avg:>10.1f} "
+              f"{stats['verified']:>8} {stats['rejected']:>8}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["report"]:
+        sys.exit("usage: python -m src.agents.router report")
+    tier_report()
@@ -1,14 +1,34 @@
-from src.llm.factory import get_llm
-from src.chains.query_chain import get_unified_prompt
+from src.llm.factory import get_llm, get_fast_llm, embed_queries
+from src.chains.query_chain import get_unified_prompt, UNIFIED_PROMPT_TEMPLATE
+from src.llm.prompt_cache import get_prompt_cache
+from src.agents.router import Router, ROUTER, LOCAL, FAST, MAIN, local_reply
 from src.db.connection import get_connection, get_maria_connection
+from src.db.registry import get_target, collection_for
+from src.db.sql_template import mask_question
+from src.db.summaries import rewrite_query, mark_written
 from src.utils.env_loader import load_env
 from src.vector.retriever import retrieve_context
 from src.db.feedback import get_cached_query
+from src.utils.admission import Overloaded
 
 import re
+import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
 
+logger = logging.getLogger(__name__)
 config = load_env()
 
+SPECULATIVE_LLM = config.get("SPECULATIVE_LLM", "false") == "true"
+SPECULATIVE_WORKERS = int(config.get("SPECULATIVE_WORKERS", 2))
+# Runs retrieval next to the cache lookup
+_pipeline = ThreadPoolExecutor(max_workers=int(config.get("PIPELINE_WORKERS", 8)), thread_name_prefix="pipeline")
+# Speculative LLM calls get their own threads, so slow ones never hold up retrieval. A call
+# only starts when one of the SPECULATIVE_WORKERS slots is free; it never queues.
+_speculative = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative")
+_speculative_slots = threading.BoundedSemaphore(SPECULATIVE_WORKERS)
+
 
 def clean_sql_output(raw_sql: str) -> str:
     """
@@ -26,29 +46,130 @@ def is_sql_like(text: str) -> bool:
     return any(k in text.lower() for k in ["select", "from", "where"])
 
 
-def get_sql_agent(schema_description: str):
-    llm = get_llm()
-    unified_prompt = get_unified_prompt()
+def embed_question(question: str) -> tuple[list[float], list[float]]:
+    """
+    (masked, raw) vectors of a question from a single embedding call: the masked
+    form keys the semantic cache, the raw form drives retrieval.
+    """
+    masked = mask_question(question)
+    if masked == question:
+        vector = embed_queries([question])[0]
+        return vector, vector
+    masked_vector, raw_vector = embed_queries([masked, question])
+    return masked_vector, raw_vector
 
-    def process_question(question: str):
-        # STEP 0 – Check semantic cache
-        cached_sql = get_cached_query(question)
-        if cached_sql:
-            return {"sql": cached_sql, "cached": True}
 
-        # STEP 1 – Retrieve semantic RAG context
-        rag_context = retrieve_context(question)
+def get_sql_agent(schema_description: str, database: str | None = None):
+    """Build process_question for one database; semantic cache and RAG chunks are namespaced by `database`."""
+    llm = get_llm()
+    fast_llm = get_fast_llm()
+    router = Router(schema_description, has_fast_model=fast_llm is not None) if ROUTER else None
+    unified_prompt = get_unified_prompt()
+    rag_collection = collection_for("pmc_chunks", database)
+    prompt_cache = get_prompt_cache()
+    prompt_cache.sync(database, schema_description, UNIFIED_PROMPT_TEMPLATE)
 
-        # STEP 2 – Build unified prompt
-        full_prompt = unified_prompt.format(
+    def build_prompt(question: str, rag_context: str) -> str:
+        return unified_prompt.format(
             schema=schema_description,
             rag_context=rag_context,
             question=question
         )
 
-        # STEP 3 – LLM Call
-        response = llm.invoke(full_prompt)
-        content = response.content.strip()
+    def generate(prompt: str, bypass_cache: bool, tier: str, admit=None, wait: bool = True) -> tuple[str, bool]:
+        """
+        (reply text, whether it came from the prompt cache) from the tier's model.
+        The LLM call runs under `admit(tier, wait)` (see src.utils.admission) when given.
+        """
+        fast = tier == FAST
+        if not bypass_cache:
+            reply = prompt_cache.get(database, prompt, fast)
+            if reply is not None:
+                return reply, True
+        with admit(tier, wait) if admit else nullcontext():
+            return (fast_llm if fast else llm).invoke(prompt).content, False
+
+    def process_question(question: str, bypass_cache: bool = False, admit=None):
+        """
+        The semantic cache lookup and RAG retrieval run concurrently from one shared
+        embedding, so a miss costs max(cache, retrieval) + LLM instead of their sum.
+        With SPECULATIVE_LLM the LLM call starts as soon as retrieval finishes, if one
+        of the SPECULATIVE_WORKERS slots is free; a cache hit then abandons it (its
+        result is discarded, its tokens are spent).
+        Replies to an identical prompt come from the prompt cache unless
+        `bypass_cache` is set (the fresh reply then replaces the cached one).
+
+        The router (src.agents.router) answers greetings and off-topic questions
+        locally and sends simple single-table questions to FAST_LLM_MODEL; the
+        result's "tier" says which path answered.
+
+        `admit(tier, wait=True)` returns the context LLM calls run under; it may raise
+        (e.g. admission.Overloaded) to shed the request. Cache hits never reach it.
+        """
+        route = router.classify_text(question) if router else {"tier": MAIN}
+        if route["tier"] == LOCAL:
+            return local_reply(route)
+        tier = route["tier"]
+
+        embedded = Future()
+        abandoned = threading.Event()
+
+        def speculate(rag_context: str):
+            try:
+                if abandoned.is_set():
+                    return None
+                reply = generate(build_prompt(question, rag_context), bypass_cache, tier, admit, wait=False)
+            except Overloaded:
+                return None
+            finally:
+                _speculative_slots.release()
+            if abandoned.is_set():
+                logger.info("Discarded speculative LLM response after a cache hit")
+            return reply
+
+        def retrieve():
+            # STEP 1 – Retrieve semantic RAG context (the lexical fast path never waits for the embedding)
+            rag_context = retrieve_context(question, collection=rag_collection,
+                                           embed_query=lambda: embedded.result()[1])
+            # STEP 2/3 – Speculative LLM call, before the cache verdict is known (only into a free slot)
+            if not SPECULATIVE_LLM or abandoned.is_set() or not _speculative_slots.acquire(blocking=False):
+                return rag_context, None
+            return rag_context, _speculative.submit(speculate, rag_context)
+
+        retrieval = _pipeline.submit(retrieve)
+
+        # STEP 0 – Embed once, then check the semantic cache while retrieval runs
+        try:
+            embedded.set_result(embed_question(question))
+            cached = get_cached_query(question, database=database, vector=embedded.result()[0])
+        except Exception as e:
+            if not embedded.done():
+                embedded.set_exception(e)
+            logger.error(f"Question embedding failed: {e}")
+            cached = None
+        if cached:
+            abandoned.set()
+            retrieval.cancel()
+            return {"sql": cached["sql"], "params": cached["params"], "cached": True, "tier": "cache"}
+
+        # STEP 1b – Off-topic questions the rules missed, from the embedding we already have
+        local = None
+        if router and embedded.exception() is None:
+            local = router.classify_vector(question, embedded.result()[1])
+        if local:
+            abandoned.set()
+            retrieval.cancel()
+            return local_reply(local)
+
+        rag_context, speculative = retrieval.result()
+        reply = speculative.result() if speculative else None
+
+        # STEP 2/3 – Build unified prompt and call the LLM (unless done speculatively)
+        prompt = build_prompt(question, rag_context)
+        if reply is None:
+            reply = generate(prompt, bypass_cache, tier, admit)
+        raw_content, llm_cached = reply
+        content = raw_content.strip()
 
         # STEP 4 – Parse JSON
         try:
@@ -61,9 +182,12 @@ def get_sql_agent(schema_description: str):
             import json
             data = json.loads(content)
         except Exception as e:
-            return {"error": f"Failed to parse LLM response: {content}", "details": str(e)}
+            return {"error": f"Failed to parse LLM response: {content}", "details": str(e), "tier": tier}
 
         intent = data.get("intent", "OFF_TOPIC")
+        # only replies that parsed are worth replaying
+        if not llm_cached:
+            prompt_cache.set(database, prompt, raw_content, tier == FAST)
 
         if intent == "SQL_GENERATION":
             sql = data.get("sql_query")
@@ -78,13 +202,18 @@ def get_sql_agent(schema_description: str):
                 "sql": sql,
                 "intent": intent,
                 "analysis": data.get("analysis"),
-                "context_used": rag_context
+                "context_used": rag_context,
+                "llm_cached": llm_cached,
+                # lets a rejected rating drop the cached reply (feedback.update_rating)
+                "prompt_key": prompt_cache.key(prompt, tier == FAST),
+                "tier": tier
             }
 
         elif intent == "CLARIFICATION_NEEDED":
             return {
                 "error": data.get("clarification_needed", "Please clarify your question."),
-                "intent": intent
+                "intent": intent,
+                "tier": tier
             }
 
         else:
@@ -92,41 +221,92 @@ def get_sql_agent(schema_description: str):
             return {
                 "error": "I can only answer questions about the database.",
                 "intent": intent,
-                "analysis": data.get("analysis")
+                "analysis": data.get("analysis"),
+                "tier": tier
             }
 
     return process_question
 
 
-def execute_sql(query: str):
-    conn = get_connection()
+def execute_sql(query: str, params=None, conn=None):
+    """Run a query on SQLite; a passed (pooled) `conn` is left open."""
+    own_conn = conn is None
+    conn = conn or get_connection()
     cursor = conn.cursor()
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    try:
+        cursor.execute(query, params or ())
+        if not cursor.description:  # a write: commit it, like execute_mariadb_sql
+            conn.commit()
+            return {"affected": cursor.rowcount}
+        # pooled connections may have another row_factory; build dicts from the description
+        cols = [d[0] for d in cursor.description]
+        return [dict(zip(cols, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        if own_conn:
+            conn.close()
+
+
+def execute_read(query: str, params=None, reader=None):
+    """Run a read query on a target's ReadEngine; rows arrive as tuples, so dicts are built once here."""
+    columns, rows = reader.execute(query, params)
+    return [dict(zip(columns, row)) for row in rows]
 
 
-def execute_mariadb_sql(query: str):
-    conn = get_maria_connection()
+def execute_mariadb_sql(query: str, params=None, conn=None):
+    """Run a query on MariaDB; a passed (pooled) `conn` is left open."""
+    own_conn = conn is None
+    conn = conn or get_maria_connection()
     cur = conn.cursor()
-    cur.execute(query)
-    if cur.description:  # SELECT-like
-        cols = [d[0] for d in cur.description]
-        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-        conn.close()
-        return rows
-    else:
-        conn.commit()
-        affected = cur.rowcount
-        conn.close()
-        return {"affected": affected}
+    try:
+        cur.execute(query, params or ())
+        if cur.description:  # SELECT-like
+            cols = [d[0] for d in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+        else:
+            conn.commit()
+            return {"affected": cur.rowcount}
+    finally:
+        cur.close()
+        if own_conn:
+            conn.close()
 
 
-def execute_sql_query(query: str):
-    """Execute SQL query based on DB_TYPE from config."""
-    db_type = config.get("DB_TYPE", "sqlite").lower()
-    if db_type == "mariadb" or db_type == "mysql":
-        return execute_mariadb_sql(query)
+def execute_sql_query(query: str, params=None, database: str | None = None):
+    """
+    Execute SQL on `database` (DEFAULT_DATABASE, i.e. DB_TYPE/DB_* settings, when None)
+    using its connection pool. `params` bind `?` placeholders. SELECT results are served
+    from the database's result cache for RESULT_CACHE_TTL seconds; writes clear it.
+    Aggregations matching a fresh summary table (src.db.summaries) are answered from it.
+    SQLite targets run on their read-only engine (READ_ENGINE), where writes raise
+    ReadOnlyQueryError.
+    """
+    target = get_target(database)
+    key = (query, tuple(params or ()))
+    cached = target.results.get(key)
+    if cached is not None:
+        return cached
+
+    reader = target.reader
+    if reader is not None:
+        run, connection = execute_read, nullcontext(reader)
+    else:
+        run = execute_mariadb_sql if target.is_mariadb else execute_sql
+        connection = target.pool.connection()
+    rewritten = rewrite_query(target, query, params)
+    with connection as conn:
+        result = None
+        if rewritten:
+            try:
+                result = run(rewritten[0], rewritten[1], conn)
+            except Exception as e:
+                logger.warning(f"Summary rewrite failed, running the original query: {e}")
+        if result is None:
+            result = run(query, params, conn)
+
+    if isinstance(result, list):
+        target.results.set(key, result)
     else:
-        return execute_sql(query)
+        target.results.clear()
+        mark_written(target)
+    return result
@@ -0,0 +1,239 @@
+"""
+Background indexer for the semantic cache.
+
+Verified queries are queued in query_history (cache_state 'pending') by
+update_rating. A worker thread claims them in batches of CACHE_INDEX_BATCH,
+embeds each database's batch with one call and upserts it in bulk
+(feedback.add_to_semantic_cache). A failed batch is retried with exponential
+backoff (CACHE_INDEX_BACKOFF doubling up to CACHE_INDEX_MAX_BACKOFF seconds) and
+marked 'failed' after CACHE_INDEX_MAX_ATTEMPTS attempts. Rows are claimed with a
+compare-and-set, so every uvicorn worker can run an indexer on the same table.
+
+Usage:
+  python -m src.db.cache_indexer run                     # index what is pending, then exit
+  python -m src.db.cache_indexer reindex [database ...]  # rebuild query_cache from query_history
+  python -m src.db.cache_indexer status
+"""
+import sys
+import time
+import random
+import logging
+import argparse
+import threading
+
+from src.utils.env_loader import load_env
+from src.db.feedback import get_feedback_connection, add_to_semantic_cache, FEEDBACK_DB_TYPE
+from src.db.registry import collection_for, DEFAULT_DATABASE
+from src.vector.store import get_vector_store
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+CACHE_INDEXER = config.get("CACHE_INDEXER", "true") == "true"
+CACHE_INDEX_BATCH = int(config.get("CACHE_INDEX_BATCH", 64))
+CACHE_INDEX_INTERVAL = float(config.get("CACHE_INDEX_INTERVAL", 10))
+CACHE_INDEX_MAX_ATTEMPTS = int(config.get("CACHE_INDEX_MAX_ATTEMPTS", 8))
+CACHE_INDEX_BACKOFF = float(config.get("CACHE_INDEX_BACKOFF", 2))
+CACHE_INDEX_MAX_BACKOFF = float(config.get("CACHE_INDEX_MAX_BACKOFF", 900))
+_LEASE_SECONDS = 300  # a claimed batch whose worker died is picked up again after this
+
+PENDING, INDEXING, INDEXED, FAILED = "pending", "indexing", "indexed", "failed"
+
+_DB_COL = "`database`" if FEEDBACK_DB_TYPE == "mariadb" else "database"
+_wake = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _sql(statement: str) -> str:
+    """`?` placeholders in the feedback database's paramstyle."""
+    return statement.replace("?", "%s") if FEEDBACK_DB_TYPE == "mariadb" else statement
+
+
+def _claim(limit: int) -> list[tuple]:
+    """Claim up to `limit` due rows as (id, question, sql, database, attempts)."""
+    conn = get_feedback_connection()
+    cur = conn.cursor()
+    now = time.time()
+    cur.execute(_sql(
+        f"SELECT id, natural_language_query, generated_sql, {_DB_COL}, COALESCE(cache_attempts, 0), "
+        f"cache_state, COALESCE(cache_next_attempt, 0) FROM query_history "
+        f"WHERE cache_state IN ('{PENDING}', '{INDEXING}') AND status = 'verified' "
+        f"AND generated_sql IS NOT NULL AND COALESCE(cache_next_attempt, 0) <= ? "
+        f"ORDER BY cache_next_attempt LIMIT {int(limit)}"
+    ), (now,))
+    candidates = [tuple(row) for row in cur.fetchall()]
+
+    claimed = []
+    for query_id, question, sql, database, attempts, state, next_attempt in candidates:
+        # compare-and-set: another worker may have claimed the row since the SELECT
+        cur.execute(_sql(
+            f"UPDATE query_history SET cache_state = '{INDEXING}', cache_next_attempt = ? "
+            f"WHERE id = ? AND cache_state = ? AND COALESCE(cache_next_attempt, 0) = ?"
+        ), (now + _LEASE_SECONDS, query_id, state, next_attempt))
+        if cur.rowcount == 1:
+            claimed.append((query_id, question, sql, database or DEFAULT_DATABASE, attempts))
+    conn.commit()
+    conn.close()
+    return claimed
+
+
+def _mark_indexed(ids: list[str]):
+    conn = get_feedback_connection()
+    cur = conn.cursor()
+    for query_id in ids:
+        # only rows still claimed: a re-rating in the meantime wins
+        cur.execute(_sql(
+            f"UPDATE query_history SET cache_state = '{INDEXED}', cache_next_attempt = NULL, cache_error = NULL "
+            f"WHERE id = ? AND cache_state = '{INDEXING}'"
+        ), (query_id,))
+    conn.commit()
+    conn.close()
+
+
+def _backoff(attempts: int) -> float:
+    """Seconds before retry number `attempts`, with up to 10% jitter so workers spread out."""
+    delay = min(CACHE_INDEX_MAX_BACKOFF, CACHE_INDEX_BACKOFF * 2 ** (attempts - 1))
+    return delay * random.uniform(1.0, 1.1)
+
+
+def _mark_failed(rows: list[tuple], error: str):
+    conn = get_feedback_connection()
+    cur = conn.cursor()
+    now = time.time()
+    for query_id, _, _, _, attempts in rows:
+        attempts += 1
+        state = FAILED if attempts >= CACHE_INDEX_MAX_ATTEMPTS else PENDING
+        cur.execute(_sql(
+            "UPDATE query_history SET cache_state = ?, cache_attempts = ?, cache_next_attempt = ?, cache_error = ? "
+            f"WHERE id = ? AND cache_state = '{INDEXING}'"
+        ), (state, attempts, now + _backoff(attempts), error[:1000], query_id))
+    conn.commit()
+    conn.close()
+
+
+def run_once(limit: int = CACHE_INDEX_BATCH) -> tuple[int, int, int]:
+    """Claim and index one batch; returns (claimed, indexed, failed)."""
+    rows = _claim(limit)
+    by_database = {}
+    for row in rows:
+        by_database.setdefault(row[3], []).append(row)
+
+    indexed = failed = 0
+    for database, group in by_database.items():
+        try:
+            add_to_semantic_cache([(query_id, question, sql) for query_id, question, sql, _, _ in group], database)
+            _mark_indexed([row[0] for row in group])
+            indexed += len(group)
+        except Exception as e:
+            logger.warning(f"Indexing {len(group)} verified queries for '{database}' failed: {e}")
+            _mark_failed(group, str(e))
+            failed += len(group)
+    return len(rows), indexed, failed
+
+
+def drain() -> tuple[int, int]:
+    """Index until nothing is due; returns (indexed, failed)."""
+    indexed = failed = 0
+    while True:
+        claimed, ok, bad = run_once()
+        indexed, failed = indexed + ok, failed + bad
+        if claimed < CACHE_INDEX_BATCH or bad:
+            return indexed, failed
+
+
+def notify_indexer():
+    """Wake the worker thread (new rows were queued)."""
+    _wake.set()
+
+
+def _loop():
+    while True:
+        _wake.clear()
+        try:
+            indexed, failed = drain()
+            if indexed or failed:
+                logger.info(f"Semantic cache indexer: {indexed} indexed, {failed} failed")
+        except Exception as e:
+            logger.error(f"Semantic cache indexer failed: {e}")
+        _wake.wait(CACHE_INDEX_INTERVAL)
+
+
+def start_indexer() -> bool:
+    """Start the worker thread (once per process); False when disabled or already started."""
+    global _thread
+    if not CACHE_INDEXER:
+        return False
+    with _thread_lock:
+        if _thread is not None:
+            return False
+        _thread = threading.Thread(target=_loop, name="cache-indexer", daemon=True)
+    _thread.start()
+    return True
+
+
+def reindex(databases: list[str] | None = None) -> tuple[int, int]:
+    """
+    Rebuild the query_cache collections of `databases` (every database with
+    verified queries when None) in the current embedding space: empty them, queue
+    every verified query again and index them. Use after changing the embedding model.
+    """
+    conn = get_feedback_connection()
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT DISTINCT COALESCE({_DB_COL}, '{DEFAULT_DATABASE}') FROM query_history WHERE status = 'verified'"
+    )
+    known = [row[0] for row in cur.fetchall()]
+    databases = databases or known
+
+    for database in databases:
+        store = get_vector_store(collection_for("query_cache", database))
+        existing = [hit.id for hit in store.get()]
+        if existing:
+            store.delete(ids=existing)
+        cur.execute(_sql(
+            f"UPDATE query_history SET cache_state = '{PENDING}', cache_attempts = 0, cache_next_attempt = 0, "
+            f"cache_error = NULL WHERE status = 'verified' AND generated_sql IS NOT NULL "
+            f"AND COALESCE({_DB_COL}, '{DEFAULT_DATABASE}') = ?"
+        ), (database,))
+        logger.info(f"Cleared {len(existing)} entries of {store.name}; queued {cur.rowcount} verified queries")
+    conn.commit()
+    conn.close()
+    return drain()
+
+
+def status() -> dict:
+    """Verified queries per cache_state."""
+    conn = get_feedback_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT COALESCE(cache_state, 'unqueued'), COUNT(*) FROM query_history "
+        "WHERE status = 'verified' GROUP BY COALESCE(cache_state, 'unqueued')"
+    )
+    counts = {row[0]: row[1] for row in cur.fetchall()}
+    conn.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.db.cache_indexer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("run", help="index pending verified queries, then exit")
+    rebuild = sub.add_parser("reindex", help="rebuild query_cache from query_history")
+    rebuild.add_argument("databases", nargs="*")
+    sub.add_parser("status", help="verified queries per cache state")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        for state, count in sorted(status().items()):
+            print(f"{state:<10} {count:>6}")
+        return
+    indexed, failed = reindex(args.databases) if args.command == "reindex" else drain()
+    print(f"{indexed} indexed, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    main()
@@ -3,22 +3,24 @@ import mariadb
 import os
 import logging
 from src.utils.env_loader import load_env
+from src.db.summaries import is_summary_table
 
 logger = logging.getLogger(__name__)
 config = load_env()
 
 
-def get_connection():
-    """Return a SQLite connection to db.sqlite"""
-    db_path = config.get("DB_PATH", "./db.sqlite")
-    conn = sqlite3.connect(db_path)
+def get_connection(db_path: str | None = None):
+    """Return a SQLite connection to db.sqlite (or `db_path`)."""
+    db_path = db_path or config.get("DB_PATH") or "./db.sqlite"
+    # pooled connections are used by one thread at a time, but not always the one that opened them
+    conn = sqlite3.connect(db_path, check_same_thread=False)
     conn.row_factory = sqlite3.Row  # optional: makes rows dict-like
     logger.info(f"✅ Successfully connected to SQLite database at: {db_path}")
     return conn
 
 
-def get_maria_connection():
-    """Return a MariaDB connection."""
+def get_maria_connection(overrides: dict | None = None):
+    """Return a MariaDB connection; `overrides` replaces the DB_* settings (user, password, host, port, database)."""
     params = {
         "user": config.get("DB_USER", "root"),
         "password": config.get("DB_PASSWORD", ""),
@@ -26,6 +28,8 @@ def get_maria_connection():
         "port": int(config.get("DB_PORT", 3306)),
         "database": config.get("DB_NAME", "test"),
     }
+    params.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    params["port"] = int(params["port"])
     conn = mariadb.connect(**params)
     logger.info(
         f"✅ Successfully connected to MariaDB database '{params['database']}' at {params['host']}:{params['port']} as user '{params['user']}'"
@@ -33,9 +37,10 @@ def get_maria_connection():
     return conn
 
 
-def get_schema_description():
-    """Fetch table + column info for SQLite (for Gemini schema context)."""
-    conn = get_connection()
+def get_schema_description(conn=None):
+    """Fetch table + column info for SQLite (for Gemini schema context). A passed `conn` is left open."""
+    own_conn = conn is None
+    conn = conn or get_connection()
     cursor = conn.cursor()
 
     query = """
@@ -50,19 +55,22 @@ def get_schema_description():
 
     cursor.execute(query)
     rows = cursor.fetchall()
-    conn.close()
+    if own_conn:
+        conn.close()
 
     schema = {}
     for table, col, dtype in rows:
-        schema.setdefault(table, []).append(f"{col} ({dtype})")
+        if not is_summary_table(table):
+            schema.setdefault(table, []).append(f"{col} ({dtype})")
 
     schema_description = "\n".join([f"{table}: {', '.join(cols)}" for table, cols in schema.items()])
     return schema_description
 
 
-def get_mariadb_schema_description():
-    """Fetch table, column info, PKs, and FKs for Gemini + RAG context."""
-    conn = get_maria_connection()
+def get_mariadb_schema_description(conn=None):
+    """Fetch table, column info, PKs, and FKs for Gemini + RAG context. A passed `conn` is left open."""
+    own_conn = conn is None
+    conn = conn or get_maria_connection()
     cur = conn.cursor()
 
     # 1. Get tables
@@ -74,7 +82,7 @@ def get_mariadb_schema_description():
         ORDER BY TABLE_NAME;
     """
     )
-    tables = [r[0] for r in cur.fetchall()]
+    tables = [r[0] for r in cur.fetchall() if not is_summary_table(r[0])]
 
     schema_blocks = []
 
@@ -124,14 +132,16 @@ def get_mariadb_schema_description():
 
         schema_blocks.append("\n".join(block))
 
-    conn.close()
+    if own_conn:
+        conn.close()
     return "\n\n".join(schema_blocks)
 
 
-def fetch_sample_rows(limit=5):
-    """Fetches sample records for each table based on DB_TYPE."""
-    db_type = config.get("DB_TYPE", "sqlite").lower()
-    conn = get_db_connection()
+def fetch_sample_rows(limit=5, conn=None, db_type: str | None = None):
+    """Fetches sample records for each table based on DB_TYPE (or `db_type` for a passed `conn`, left open)."""
+    db_type = (db_type or config.get("DB_TYPE", "sqlite")).lower()
+    own_conn = conn is None
+    conn = conn or get_db_connection()
     cur = conn.cursor()
 
     text_blocks = []
@@ -139,10 +149,9 @@ def fetch_sample_rows(limit=5):
     # Get tables based on database type
     if db_type == "mariadb" or db_type == "mysql":
         cur.execute("SHOW TABLES;")
-        tables = [row[0] for row in cur.fetchall()]
     else:  # SQLite
         cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
-        tables = [row[0] for row in cur.fetchall()]
+    tables = [row[0] for row in cur.fetchall() if not is_summary_table(row[0])]
 
     for table in tables:
         try:
@@ -162,7 +171,8 @@ def fetch_sample_rows(limit=5):
             continue
 
     cur.close()
-    conn.close()
+    if own_conn:
+        conn.close()
 
     return "\n".join(text_blocks)
 
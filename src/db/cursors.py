@@ -0,0 +1,320 @@
+import hmac
+import json
+import time
+import base64
+import hashlib
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+
+from src.utils.env_loader import load_env
+from src.db.sql_template import sql_tokens
+from src.db.summaries import rewrite_query, mark_written
+from src.db.read_engine import ReadOnlyQueryError
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+PAGE_SIZE = int(config.get("PAGE_SIZE", 200))
+MAX_PAGE_SIZE = int(config.get("MAX_PAGE_SIZE", 5000))
+CURSOR_IDLE_SECONDS = float(config.get("CURSOR_IDLE_SECONDS", 300))
+MAX_OPEN_CURSORS = int(config.get("MAX_OPEN_CURSORS", 32))
+_MARIADB_READ_ONLY_TRANSACTION = 1792  # ER_CANT_EXECUTE_IN_READ_ONLY_TRANSACTION
+# Without a configured secret, tokens are only valid for the lifetime of the process
+_SECRET = (config.get("PAGINATION_SECRET") or secrets.token_hex(32)).encode("utf-8")
+
+
+class InvalidTokenError(ValueError):
+    """Raised for a continuation token that is malformed, forged or for another query."""
+
+
+def encode_token(query_id: str, offset: int) -> str:
+    """Opaque, signed continuation token for the page of `query_id` starting at `offset`."""
+    payload = base64.urlsafe_b64encode(json.dumps({"q": query_id, "o": offset}).encode("utf-8")).rstrip(b"=")
+    signature = hmac.new(_SECRET, payload, hashlib.sha256).digest()[:16]
+    return payload.decode("ascii") + "." + base64.urlsafe_b64encode(signature).rstrip(b"=").decode("ascii")
+
+
+def decode_token(token: str) -> tuple[str, int]:
+    """Return (query_id, offset) from a token made by encode_token."""
+    try:
+        payload, signature = token.split(".", 1)
+        expected = hmac.new(_SECRET, payload.encode("ascii"), hashlib.sha256).digest()[:16]
+        if not hmac.compare_digest(base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4)), expected):
+            raise InvalidTokenError("Invalid continuation token")
+        data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return data["q"], int(data["o"])
+    except InvalidTokenError:
+        raise
+    except Exception:
+        raise InvalidTokenError("Malformed continuation token")
+
+
+def page_size_or_default(page_size: int | None) -> int:
+    return max(1, min(page_size or PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+class HeldCursor:
+    """
+    An open cursor on a connection detached from its pool or read engine, positioned
+    at `offset`. One extra row is read ahead so a page knows whether more rows follow.
+    """
+
+    def __init__(self, query_id, target, conn, cursor, pool=None):
+        self.query_id = query_id
+        self.target = target
+        self.conn = conn
+        self.pool = pool  # the pool `conn` was acquired from, if any
+        self.cursor = cursor
+        self.columns = [d[0] for d in cursor.description]
+        self.offset = 0
+        self.lookahead = []
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def fetch(self, page_size: int) -> tuple[list[dict], bool]:
+        """Next page as dicts, and whether more rows follow."""
+        rows = self.lookahead + list(self.cursor.fetchmany(page_size + 1 - len(self.lookahead)))
+        self.lookahead = rows[page_size:]
+        page = [dict(zip(self.columns, row)) for row in rows[:page_size]]
+        self.offset += len(page)
+        self.last_used = time.monotonic()
+        return page, bool(self.lookahead)
+
+    def close(self):
+        try:
+            self.cursor.close()
+        except Exception:
+            pass
+        if self.pool is not None:
+            self.pool.discard(self.conn)
+            return
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+_cursors: "OrderedDict[str, HeldCursor]" = OrderedDict()
+_cursors_lock = threading.Lock()
+_reaper = None
+
+
+def _close_idle(keep: str | None = None):
+    """Close cursors idle for CURSOR_IDLE_SECONDS, and the least recently used beyond MAX_OPEN_CURSORS."""
+    now = time.monotonic()
+    with _cursors_lock:
+        victims = []
+        for query_id, held in list(_cursors.items()):
+            if query_id == keep:
+                continue
+            if len(_cursors) - len(victims) > MAX_OPEN_CURSORS or now - held.last_used > CURSOR_IDLE_SECONDS:
+                victims.append(_cursors.pop(query_id))
+    for held in victims:
+        held.close()
+        logger.info(f"Closed idle cursor for query {held.query_id} at row {held.offset}")
+
+
+def _start_reaper():
+    """Close idle cursors on a timer too, so their connections are freed while traffic is idle."""
+    global _reaper
+    with _cursors_lock:
+        if _reaper is not None:
+            return
+        _reaper = threading.Thread(target=_reap, name="cursor-reaper", daemon=True)
+    _reaper.start()
+
+
+def _reap():
+    interval = max(1.0, CURSOR_IDLE_SECONDS / 4)
+    while True:
+        time.sleep(interval)
+        try:
+            _close_idle()
+        except Exception as e:
+            logger.warning(f"Closing idle cursors failed: {e}")
+
+
+def _release(query_id: str):
+    with _cursors_lock:
+        held = _cursors.pop(query_id, None)
+    if held:
+        held.close()
+
+
+def open_result(query_id: str, target, sql: str, params=None, page_size: int | None = None) -> dict:
+    """
+    Execute `sql` on `target` (a registry DatabaseTarget) and return the first page:
+    {"result": [...], "next_token": str | None}. The statement runs on a connection of
+    the target's read engine or read pool; when more rows follow, that connection is
+    detached and kept with the open cursor for CURSOR_IDLE_SECONDS so later pages continue it.
+    Results that fit one page go to the target's result cache. Generated SQL only
+    reads: SQLite targets run it on their read-only engine (src.db.read_engine) and
+    MariaDB on a READ ONLY session, so writes raise ReadOnlyQueryError. With
+    READ_ENGINE=false, statements without a result set are committed and return
+    {"result": {"affected": n}, "next_token": None}.
+    """
+    _close_idle()
+    page_size = page_size_or_default(page_size)
+    key = (sql, tuple(params or ()))
+    cached = target.results.get(key)
+    if cached is not None and len(cached) <= page_size:
+        return {"result": cached, "next_token": None}
+
+    # this thread's read-engine connection or a pooled one; detached below only if the cursor has to stay open
+    reader, pool = target.reader, None
+    if reader is not None:
+        conn, run = reader.connection(), reader.run
+    else:
+        pool = target.read_pool
+        conn, run = pool.acquire(), lambda cur, *statement: cur.execute(*statement)
+    cursor = None
+    try:
+        # unbuffered on MariaDB so rows stream from the server as pages are read
+        cursor = conn.cursor(buffered=False) if target.is_mariadb else conn.cursor()
+        rewritten = rewrite_query(target, sql, params)
+        executed = False
+        if rewritten:
+            try:
+                run(cursor, *rewritten)
+                executed = True
+            except Exception as e:
+                logger.warning(f"Summary rewrite failed, running the original query: {e}")
+        if not executed:
+            run(cursor, sql, params or ())
+        if not cursor.description:
+            conn.commit()
+            affected = cursor.rowcount
+            cursor.close()
+            if pool is not None:
+                pool.release(conn)
+            target.results.clear()
+            mark_written(target)
+            return {"result": {"affected": affected}, "next_token": None}
+    except Exception as e:
+        if cursor is not None:
+            cursor.close()
+        if pool is not None:
+            pool.release(conn)  # a broken connection fails its ping and is dropped on the next checkout
+        if getattr(e, "errno", None) == _MARIADB_READ_ONLY_TRANSACTION:
+            raise ReadOnlyQueryError("Only read queries are allowed") from e
+        raise
+
+    held = HeldCursor(query_id, target, conn, cursor, pool)
+    page, more = held.fetch(page_size)
+    if not more:
+        cursor.close()  # the connection stays with this thread / goes back to the pool
+        if pool is not None:
+            pool.release(conn)
+        target.results.set(key, page)
+        return {"result": page, "next_token": None}
+
+    if reader is not None:
+        reader.detach()  # now owned by the held cursor
+    with _cursors_lock:
+        _cursors[query_id] = held
+    _start_reaper()
+    return {"result": page, "next_token": encode_token(query_id, held.offset)}
+
+
+def _paged(sql: str, limit: int, offset: int) -> str:
+    """
+    `sql` limited to `limit` rows from `offset`. A top-level LIMIT of the statement
+    itself is narrowed to that window; otherwise one is appended. The statement is not
+    wrapped in a subquery, which MariaDB refuses when result columns share a name.
+    """
+    tokens = sql_tokens(sql)
+    while tokens and tokens[-1]["text"] == ";":
+        tokens.pop()
+    if not tokens:
+        return sql
+    depth, start = 0, None
+    for i, tok in enumerate(tokens):
+        if tok["text"] == "(":
+            depth += 1
+        elif tok["text"] == ")":
+            depth -= 1
+        elif depth == 0 and tok["kind"] == "word" and tok["text"].lower() == "limit":
+            start = i
+    end = tokens[-1]["end"]
+    if start is None:
+        return f"{sql[:end]} LIMIT {limit} OFFSET {offset}"
+
+    # LIMIT n | LIMIT n OFFSET m | LIMIT m, n with literal numbers; other forms (bound
+    # parameters, expressions) keep the subquery, whose columns SQLite renames as needed
+    clause = [tok["text"] for tok in tokens[start + 1:]]
+    numbers = [int(text) for text in clause[::2] if text.isdigit()]
+    if len(clause) == 1 and len(numbers) == 1:
+        base_limit, base_offset = numbers[0], 0
+    elif len(clause) == 3 and len(numbers) == 2 and clause[1].lower() == "offset":
+        base_limit, base_offset = numbers
+    elif len(clause) == 3 and len(numbers) == 2 and clause[1] == ",":
+        base_offset, base_limit = numbers
+    else:
+        return f"SELECT * FROM ({sql[:end]}) AS _page LIMIT {limit} OFFSET {offset}"
+    window = max(0, min(limit, base_limit - offset))
+    return f"{sql[:tokens[start]['start']]}LIMIT {window} OFFSET {base_offset + offset}"
+
+
+def fetch_page(query_id: str, token: str, page_size: int | None = None, load_query=None) -> dict:
+    """
+    Next page for a token returned by open_result / fetch_page. Continues the held
+    cursor when it is still open at the token's offset; otherwise re-executes the
+    statement with LIMIT/OFFSET on the target's read engine or read pool.
+    `load_query(query_id)` must return the (sql, params, database) open_result
+    executed, as logged by feedback.log_query, for that fallback.
+    """
+    token_query_id, offset = decode_token(token)
+    if token_query_id != query_id:
+        raise InvalidTokenError("Token belongs to another query")
+    page_size = page_size_or_default(page_size)
+    _close_idle(keep=query_id)
+
+    with _cursors_lock:
+        held = _cursors.get(query_id)
+        if held:
+            _cursors.move_to_end(query_id)
+    if held:
+        with held.lock:
+            if held.offset == offset:
+                page, more = held.fetch(page_size)
+                if not more:
+                    _release(query_id)
+                return {"result": page, "offset": offset,
+                        "next_token": encode_token(query_id, held.offset) if more else None}
+
+    # Cursor expired (or an earlier page was requested again): re-run with LIMIT/OFFSET
+    from src.db.registry import get_target
+
+    sql, params, database = load_query(query_id)
+    if sql is None:
+        raise InvalidTokenError("This query can no longer be paged; run it again")
+    target = get_target(database)
+    # answer from the same summary table as the first page did, so row order matches
+    rewritten = rewrite_query(target, sql, params)
+    if rewritten:
+        sql, params = rewritten
+    page_sql = _paged(sql, page_size + 1, offset)
+    logger.info(f"Cursor for query {query_id} not open at row {offset}; re-executing with LIMIT/OFFSET")
+    if target.reader is not None:
+        columns, rows = target.reader.execute(page_sql, params)
+    else:
+        with target.read_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(page_sql, params or ())
+            columns = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+            cursor.close()
+    page = [dict(zip(columns, row)) for row in rows[:page_size]]
+    more = len(rows) > page_size
+    return {"result": page, "offset": offset,
+            "next_token": encode_token(query_id, offset + len(page)) if more else None}
+
+
+def close_all():
+    with _cursors_lock:
+        held = list(_cursors.values())
+        _cursors.clear()
+    for h in held:
+        h.close()
@@ -1,13 +1,20 @@
 import sqlite3
 import os
 import uuid
+import time
+import json
+import atexit
 import logging
+import threading
 from datetime import datetime
+import numpy as np
 from src.utils.env_loader import load_env
-from src.vector.chroma_con import get_chroma_client
-from src.llm.factory import get_embeddings
+from src.vector.store import get_vector_store
+from src.llm.factory import embed_queries
+from src.db.sql_template import templatize, bind, mask_question, same_literals
 
 from src.db.connection import get_maria_connection
+from src.db.registry import collection_for, DEFAULT_DATABASE
 
 logger = logging.getLogger(__name__)
 config = load_env()
@@ -15,6 +22,26 @@ config = load_env()
 FEEDBACK_DB_TYPE = config.get("FEEDBACK_DB_TYPE", "sqlite").lower()
 FEEDBACK_DB_PATH = config.get("FEEDBACK_DB_PATH", "./feedback.sqlite")
 
+SEMANTIC_CACHE_MAX_SIZE = int(config.get("SEMANTIC_CACHE_MAX_SIZE", 1000))
+SEMANTIC_CACHE_EVICTION = config.get("SEMANTIC_CACHE_EVICTION", "lfu").lower()
+SEMANTIC_CACHE_MERGE_DISTANCE = float(config.get("SEMANTIC_CACHE_MERGE_DISTANCE", 0.05))
+CACHE_HIT_FLUSH_INTERVAL = float(config.get("CACHE_HIT_FLUSH_INTERVAL", 30))
+# evict once the cache passes SEMANTIC_CACHE_MAX_SIZE * HIGH_WATER, then trim it back to the max
+SEMANTIC_CACHE_HIGH_WATER = max(1.0, float(config.get("SEMANTIC_CACHE_HIGH_WATER", 1.1)))
+SEMANTIC_CACHE_HIT_HALF_LIFE = float(config.get("SEMANTIC_CACHE_HIT_HALF_LIFE", 604800))
+SEMANTIC_CACHE_ADMISSION_WINDOW = float(config.get("SEMANTIC_CACHE_ADMISSION_WINDOW", 86400))
+
+# query_history columns added after the table was first released, per backend
+_COLUMNS_ADDED = {
+    "sqlite": [("database", "TEXT"), ("tier", "TEXT"), ("latency_ms", "REAL"), ("cache_state", "TEXT"),
+               ("cache_attempts", "INTEGER DEFAULT 0"), ("cache_next_attempt", "REAL"), ("cache_error", "TEXT"),
+               ("prompt_key", "TEXT"), ("query_sql", "TEXT"), ("query_params", "TEXT")],
+    "mariadb": [("`database`", "VARCHAR(64)"), ("tier", "VARCHAR(16)"), ("latency_ms", "DOUBLE"),
+                ("cache_state", "VARCHAR(16)"), ("cache_attempts", "INTEGER DEFAULT 0"),
+                ("cache_next_attempt", "DOUBLE"), ("cache_error", "TEXT"), ("prompt_key", "VARCHAR(64)"),
+                ("query_sql", "TEXT"), ("query_params", "TEXT")],
+}
+
 def get_feedback_connection():
     """Return a connection to the feedback database."""
     if FEEDBACK_DB_TYPE == "mariadb":
@@ -38,9 +65,23 @@ def init_feedback_db():
                 generated_sql TEXT,
                 user_rating INTEGER,
                 status VARCHAR(20) DEFAULT 'new',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                `database` VARCHAR(64),
+                tier VARCHAR(16),
+                latency_ms DOUBLE,
+                cache_state VARCHAR(16),
+                cache_attempts INTEGER DEFAULT 0,
+                cache_next_attempt DOUBLE,
+                cache_error TEXT,
+                prompt_key VARCHAR(64),
+                query_sql TEXT,
+                query_params TEXT
             );
         """)
+        # tables created before multi-database routing / tiered routing / the cache indexer
+        for column, column_type in _COLUMNS_ADDED["mariadb"]:
+            cur.execute(f"ALTER TABLE query_history ADD COLUMN IF NOT EXISTS {column} {column_type}")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_query_history_cache_state ON query_history (cache_state)")
     else:
         # SQLite Schema
         cur.execute("""
@@ -50,43 +91,93 @@ def init_feedback_db():
                 generated_sql TEXT,
                 user_rating INTEGER,
                 status TEXT DEFAULT 'new',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                database TEXT,
+                tier TEXT,
+                latency_ms REAL,
+                cache_state TEXT,
+                cache_attempts INTEGER DEFAULT 0,
+                cache_next_attempt REAL,
+                cache_error TEXT,
+                prompt_key TEXT,
+                query_sql TEXT,
+                query_params TEXT
             );
         """)
+        # tables created before multi-database routing / tiered routing / the cache indexer
+        columns = [row[1] for row in cur.execute("PRAGMA table_info(query_history)").fetchall()]
+        for column, column_type in _COLUMNS_ADDED["sqlite"]:
+            if column not in columns:
+                cur.execute(f"ALTER TABLE query_history ADD COLUMN {column} {column_type}")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_query_history_cache_state ON query_history (cache_state)")
 
     conn.commit()
     conn.close()
 
-    # Also initialize Chromadb collection for semantic cache
+    # Also initialize the vector collection for semantic cache
     try:
-        client = get_chroma_client()
-        client.get_or_create_collection(name="query_cache")
+        get_vector_store("query_cache").count()
     except Exception as e:
-        logger.warning(f"Could not initialize Chromadb query_cache: {e}")
+        logger.warning(f"Could not initialize query_cache collection: {e}")
 
-def log_query(question: str, generated_sql: str) -> str:
-    """Log a new query and return its ID."""
+def log_query(question: str, generated_sql: str | None, database: str | None = None,
+              tier: str | None = None, latency_ms: float | None = None, prompt_key: str | None = None,
+              query_sql: str | None = None, query_params: list | None = None) -> str:
+    """
+    Log a new query against `database` (the default one when None) and return its ID.
+    `generated_sql` is the statement as displayed (parameters inlined); `query_sql` and
+    `query_params` are what was executed, kept so later pages can re-run it.
+    `tier` and `latency_ms` record which routing tier answered and how long it took;
+    `prompt_key` the prompt-cache entry of the reply, dropped if the query is rejected.
+    """
+    params_json = json.dumps(query_params) if query_params else None
     query_id = str(uuid.uuid4())
+    database = database or DEFAULT_DATABASE
     conn = get_feedback_connection()
     cur = conn.cursor()
 
     if FEEDBACK_DB_TYPE == "mariadb":
         cur.execute(
-            "INSERT INTO query_history (id, natural_language_query, generated_sql, status) VALUES (%s, %s, %s, %s)",
-            (query_id, question, generated_sql, 'new')
+            "INSERT INTO query_history (id, natural_language_query, generated_sql, status, `database`, tier, latency_ms, "
+            "prompt_key, query_sql, query_params) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            (query_id, question, generated_sql, 'new', database, tier, latency_ms, prompt_key, query_sql, params_json)
         )
     else:
         cur.execute(
-            "INSERT INTO query_history (id, natural_language_query, generated_sql, status) VALUES (?, ?, ?, ?)",
-            (query_id, question, generated_sql, 'new')
+            "INSERT INTO query_history (id, natural_language_query, generated_sql, status, database, tier, latency_ms, "
+            "prompt_key, query_sql, query_params) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (query_id, question, generated_sql, 'new', database, tier, latency_ms, prompt_key, query_sql, params_json)
         )
 
     conn.commit()
     conn.close()
     return query_id
 
+def get_logged_query(query_id: str) -> tuple[str | None, list | None, str] | None:
+    """
+    Return (query_sql, query_params, database) executed for `query_id`, or None for an
+    unknown id. query_sql is None for rows logged before it was recorded.
+    """
+    conn = get_feedback_connection()
+    cur = conn.cursor()
+    if FEEDBACK_DB_TYPE == "mariadb":
+        cur.execute("SELECT query_sql, query_params, `database` FROM query_history WHERE id = %s", (query_id,))
+    else:
+        cur.execute("SELECT query_sql, query_params, database FROM query_history WHERE id = ?", (query_id,))
+    row = cur.fetchone()
+    conn.close()
+    if not row:
+        return None
+    return row[0], json.loads(row[1]) if row[1] else None, row[2] or DEFAULT_DATABASE
+
 def update_rating(query_id: str, rating: int):
-    """Update the rating and status of a query."""
+    """
+    Update the rating and status of a query. A verified query is queued for the
+    semantic cache (cache_state 'pending'); the background indexer in
+    src.db.cache_indexer embeds and stores it, so this never waits on either.
+    A rejected query's LLM reply is dropped from the prompt cache, so the same
+    prompt is sent to the model again instead of replaying it.
+    """
     status = 'rejected'
     if rating >= 9:
         status = 'verified'
@@ -95,87 +186,227 @@ def update_rating(query_id: str, rating: int):
 
     conn = get_feedback_connection()
     cur = conn.cursor()
+    p = "%s" if FEEDBACK_DB_TYPE == "mariadb" else "?"
 
-    # Get the query details first
-    if FEEDBACK_DB_TYPE == "mariadb":
-        cur.execute("SELECT natural_language_query, generated_sql FROM query_history WHERE id = %s", (query_id,))
+    if status == 'verified':
+        cur.execute(
+            f"UPDATE query_history SET user_rating = {p}, status = {p}, "
+            f"cache_state = CASE WHEN generated_sql IS NOT NULL THEN 'pending' ELSE cache_state END, "
+            f"cache_attempts = 0, cache_next_attempt = 0, cache_error = NULL "
+            f"WHERE id = {p}",
+            (rating, status, query_id)
+        )
+        queued = cur.rowcount > 0
     else:
-        cur.execute("SELECT natural_language_query, generated_sql FROM query_history WHERE id = ?", (query_id,))
+        # a query re-rated before it was indexed leaves the queue
+        cur.execute(
+            f"UPDATE query_history SET user_rating = {p}, status = {p}, "
+            f"cache_state = CASE WHEN cache_state IN ('pending', 'failed') THEN NULL ELSE cache_state END "
+            f"WHERE id = {p}",
+            (rating, status, query_id)
+        )
+        queued = False
+    rejected = None
+    if status == 'rejected':
+        column = "`database`" if FEEDBACK_DB_TYPE == "mariadb" else "database"
+        cur.execute(f"SELECT {column}, prompt_key FROM query_history WHERE id = {p}", (query_id,))
+        rejected = cur.fetchone()
+    conn.commit()
+    conn.close()
 
-    row = cur.fetchone()
+    if rejected and rejected[1]:
+        from src.llm.prompt_cache import get_prompt_cache
 
-    if row:
-        # Handle tuple vs dict-like row
-        if isinstance(row, tuple):
-             question, sql = row[0], row[1]
-        else:
-             question, sql = row['natural_language_query'], row['generated_sql']
-
-        # Update DB
-        if FEEDBACK_DB_TYPE == "mariadb":
-            cur.execute(
-                "UPDATE query_history SET user_rating = %s, status = %s WHERE id = %s",
-                (rating, status, query_id)
-            )
-        else:
-            cur.execute(
-                "UPDATE query_history SET user_rating = ?, status = ? WHERE id = ?",
-                (rating, status, query_id)
-            )
-        conn.commit()
-
-        # If verified, add to semantic cache
-        if status == 'verified':
-            _add_to_semantic_cache(question, sql)
+        get_prompt_cache().discard(rejected[0], rejected[1])
+    if queued:
+        from src.db.cache_indexer import notify_indexer
 
-    conn.close()
+        notify_indexer()
 
-def _add_to_semantic_cache(question: str, sql: str):
-    """Add a verified query to the Chromadb cache."""
-    try:
-        client = get_chroma_client()
-        collection = client.get_or_create_collection(name="query_cache")
-        embedder = get_embeddings()
-        vector = embedder.embed_query(question)
-
-        collection.add(
-            ids=[str(uuid.uuid4())],
-            embeddings=[vector],
-            metadatas={"sql": sql, "question": question},
-            documents=[question]
+def add_to_semantic_cache(entries: list[tuple[str, str, str]], database: str | None = None) -> int:
+    """
+    Add verified (query_id, question, sql) rows to the semantic cache collection of
+    `database` with one embedding call and one bulk upsert; returns the number of rows.
+    Literals shared by the question and the SQL are turned into a template
+    (see src.db.sql_template) and the question is embedded with its literals
+    masked, so "orders for client 12" and "... client 47" share one entry.
+    A question within SEMANTIC_CACHE_MERGE_DISTANCE of an existing entry (or of an
+    earlier one in the batch) is merged into it (latest verified SQL wins) instead
+    of creating a duplicate. New entries use the query_id, so a retried batch
+    replaces its own entries. Errors propagate; the indexer retries the batch.
+    """
+    if not entries:
+        return 0
+    store = get_vector_store(collection_for("query_cache", database))
+    vectors = embed_queries([mask_question(question) for _, question, _ in entries])
+    nearest = store.query(vectors, k=1) if store.count() > 0 else [[] for _ in entries]
+    now = time.time()
+
+    unit = np.asarray(vectors, dtype=np.float32)
+    unit /= np.linalg.norm(unit, axis=1, keepdims=True) + 1e-12
+    merged = {}  # existing entry id -> new metadata
+    added = {}   # batch position -> (id, metadata)
+    for i, ((query_id, question, sql), hits) in enumerate(zip(entries, nearest)):
+        template = templatize(question, sql)
+        fields = {"sql": sql, "question": question, "template": json.dumps(template) if template else ""}
+
+        if hits and hits[0].distance <= SEMANTIC_CACHE_MERGE_DISTANCE:
+            entry_id = hits[0].id
+            meta = merged.get(entry_id, hits[0].metadata)
+            count = int(meta.get("merged", 0)) + (entry_id != query_id)
+            merged[entry_id] = {**meta, **fields, "merged": count, "last_hit": now}
+            continue
+
+        twin = next((j for j in added if 1 - float(unit[i] @ unit[j]) <= SEMANTIC_CACHE_MERGE_DISTANCE), None)
+        if twin is not None:
+            entry_id, meta = added[twin]
+            added[twin] = (entry_id, {**meta, **fields, "merged": int(meta["merged"]) + 1})
+            continue
+
+        added[i] = (query_id, {**fields, "status": "verified", "hits": 0, "merged": 0,
+                               "created_at": now, "last_hit": now})
+
+    if merged:
+        store.update_metadata(list(merged), list(merged.values()))
+        logger.info(f"Merged {len(merged)} queries into existing semantic cache entries")
+    if added:
+        store.upsert(
+            ids=[entry_id for entry_id, _ in added.values()],
+            vectors=[vectors[i] for i in added],
+            metadatas=[meta for _, meta in added.values()],
+            documents=[meta["question"] for _, meta in added.values()]
         )
-        logger.info(f"Added query to semantic cache: {question}")
-    except Exception as e:
-        logger.error(f"Failed to add to semantic cache: {e}")
+        logger.info(f"Added {len(added)} queries to semantic cache")
+        _evict_semantic_cache(store)
+    return len(entries)
+
+def _evict_semantic_cache(store, max_size: int | None = None) -> int:
+    """
+    Once the cache holds more than max_size * SEMANTIC_CACHE_HIGH_WATER entries, trim
+    it back to max_size in one batch using SEMANTIC_CACHE_EVICTION. 'lfu' drops the
+    lowest hit count first, halved every SEMANTIC_CACHE_HIT_HALF_LIFE seconds since the
+    last hit so old favourites age out; entries younger than
+    SEMANTIC_CACHE_ADMISSION_WINDOW go last, so new ones get a chance to collect hits.
+    'lru' drops the least recently hit. Returns the number of evicted entries.
+    """
+    max_size = SEMANTIC_CACHE_MAX_SIZE if max_size is None else max_size
+    count = store.count()
+    if count <= max_size * SEMANTIC_CACHE_HIGH_WATER:
+        return 0
+    flush_cache_hits()  # rank by up-to-date hit counts
+    excess = count - max_size
+
+    now = time.time()
+    if SEMANTIC_CACHE_EVICTION == "lru":
+        rank = lambda hit: float(hit.metadata.get("last_hit", 0))
+    else:
+        def rank(hit):
+            meta = hit.metadata
+            last_hit = float(meta.get("last_hit", 0))
+            age = max(0.0, now - last_hit) / SEMANTIC_CACHE_HIT_HALF_LIFE
+            admitted = now - float(meta.get("created_at", 0)) >= SEMANTIC_CACHE_ADMISSION_WINDOW
+            return not admitted, int(meta.get("hits", 0)) * 0.5 ** age, last_hit
 
-def get_cached_query(question: str, threshold: float = 0.9) -> str | None:
-    """Check if a similar query exists in the cache."""
+    victims = [hit.id for hit in sorted(store.get(), key=rank)[:excess]]
+    store.delete(ids=victims)
+    logger.info(f"Evicted {len(victims)} entries from semantic cache ({SEMANTIC_CACHE_EVICTION})")
+    return len(victims)
+
+# store name -> (store, {entry id: [hits, last hit time]}) not yet written to the store
+_pending_hits: dict[str, tuple] = {}
+_hits_lock = threading.Lock()
+_hits_thread = None
+
+
+def _record_cache_hit(store, entry_id: str):
+    """
+    Count a hit for eviction bookkeeping. Counts are buffered in memory and written
+    by flush_cache_hits every CACHE_HIT_FLUSH_INTERVAL seconds, off the request path.
+    """
+    global _hits_thread
+    with _hits_lock:
+        counts = _pending_hits.setdefault(store.name, (store, {}))[1]
+        pending = counts.setdefault(entry_id, [0, 0.0])
+        pending[0] += 1
+        pending[1] = time.time()
+        if _hits_thread is None:
+            _hits_thread = threading.Thread(target=_flush_loop, name="cache-hits", daemon=True)
+            _hits_thread.start()
+            atexit.register(flush_cache_hits)
+
+
+def flush_cache_hits() -> int:
+    """
+    Add the buffered hit counts to the stored metadata: one get and one update per
+    collection, applied to the current metadata so entries merged since the hit keep
+    their new SQL. Returns the number of entries updated.
+    """
+    with _hits_lock:
+        pending = list(_pending_hits.values())
+        _pending_hits.clear()
+    updated = 0
+    for store, counts in pending:
+        try:
+            current = store.get(list(counts))
+            store.update_metadata([hit.id for hit in current], [
+                {**hit.metadata, "hits": int(hit.metadata.get("hits", 0)) + counts[hit.id][0],
+                 "last_hit": max(float(hit.metadata.get("last_hit", 0)), counts[hit.id][1])}
+                for hit in current
+            ])
+            updated += len(current)
+        except Exception as e:
+            logger.warning(f"Could not record {len(counts)} cache hits in {store.name}: {e}")
+    return updated
+
+
+def _flush_loop():
+    while True:
+        time.sleep(CACHE_HIT_FLUSH_INTERVAL)
+        flush_cache_hits()
+
+def get_cached_query(question: str, threshold: float = 0.9, database: str | None = None,
+                     vector: list[float] | None = None) -> dict | None:
+    """
+    Check if a similar query exists in the cache of `database`.
+    Returns {"sql": ..., "params": [...] | None}; templated entries return
+    `?`-parameterised SQL with the new question's values bound as params.
+    Entries without a template are only served to questions with their literals.
+    `vector` is the embedding of mask_question(question) when the caller already has it.
+    """
     try:
-        client = get_chroma_client()
-        collection = client.get_or_create_collection(name="query_cache")
+        store = get_vector_store(collection_for("query_cache", database))
 
-        if collection.count() == 0:
+        if store.count() == 0:
             return None
 
-        embedder = get_embeddings()
-        vector = embedder.embed_query(question)
+        if vector is None:
+            vector = embed_queries([mask_question(question)])[0]
 
-        results = collection.query(
-            query_embeddings=[vector],
-            n_results=1,
-            include=["metadatas", "distances"]
-        )
+        hits = store.query([vector], k=1)[0]
 
-        if results['distances'] and results['distances'][0]:
+        if hits:
             # Chromadb returns distance (lower is better).
             # Cosine distance: 0 = identical, 2 = opposite.
             # We want similarity > threshold.
             # Approx: similarity = 1 - distance (for normalized vectors)
-            distance = results['distances'][0][0]
+            distance = hits[0].distance
             if distance < (1 - threshold):
-                cached_sql = results['metadatas'][0][0]['sql']
+                meta = hits[0].metadata
+                cached = {"sql": meta['sql'], "params": None}
+                if meta.get("template"):
+                    template = json.loads(meta["template"])
+                    params = bind(template, question)
+                    if params is None:
+                        logger.info(f"Cache hit rejected: question does not fit template. Distance: {distance}")
+                        return None
+                    cached = {"sql": template["sql"], "params": params}
+                elif not same_literals(question, meta.get("question", "")):
+                    # the masked key matches any literals; untemplated SQL only fits the stored ones
+                    logger.info(f"Cache hit rejected: untemplated entry has other literals. Distance: {distance}")
+                    return None
                 logger.info(f"Cache hit! Distance: {distance}")
-                return cached_sql
+                _record_cache_hit(store, hits[0].id)
+                return cached
             else:
                 logger.info(f"Non Cache hit! Distance: {distance}")
 
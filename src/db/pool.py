@@ -0,0 +1,129 @@
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Small keep-alive pool: connections are created on demand by `factory` and
+    up to `size` idle ones are kept for reuse. A connection is handed to one
+    caller at a time, so SQLite connections may be opened with
+    check_same_thread=False.
+    """
+
+    def __init__(self, factory, size: int = 5, name: str = "db"):
+        self.factory = factory
+        self.size = size
+        self.name = name
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._closed = False
+        self._lock = threading.Lock()
+        self._borrowed = 0
+
+    @property
+    def borrowed(self) -> int:
+        """Connections currently checked out (including ones kept with acquire())."""
+        return self._borrowed
+
+    def _checkout(self):
+        conn = self._live_connection()
+        with self._lock:
+            self._borrowed += 1
+        return conn
+
+    def _live_connection(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self.factory()
+            # MariaDB connections can time out server-side while idle
+            ping = getattr(conn, "ping", None)
+            if ping is None:
+                return conn
+            try:
+                ping()
+                return conn
+            except Exception:
+                self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the block. Whether or not the block raised, any open
+        transaction is rolled back and the connection returns to the pool (it is closed
+        instead if the pool was closed meanwhile or the rollback fails).
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def acquire(self):
+        """Borrow a connection outside a with-block; give it back with release(), or keep it and discard() it."""
+        return self._checkout()
+
+    def release(self, conn):
+        """Return a connection taken with acquire()."""
+        self._release(conn)
+
+    def discard(self, conn):
+        """Close a connection taken with acquire() instead of returning it."""
+        with self._lock:
+            self._borrowed -= 1
+        self._discard(conn)
+
+    def _release(self, conn):
+        with self._lock:
+            self._borrowed -= 1
+        # end any open transaction, so the next borrower does not read from its snapshot
+        # (MariaDB's REPEATABLE READ) or inherit its uncommitted writes
+        if getattr(conn, "in_transaction", True):
+            try:
+                conn.rollback()
+            except Exception:
+                self._discard(conn)
+                return
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._idle.put_nowait(conn)
+                    return
+                except queue.Full:
+                    pass
+        self._discard(conn)
+
+    def prefill(self, n: int | None = None) -> int:
+        """Open connections until `n` (default: size) are idle; returns how many were opened."""
+        n = self.size if n is None else min(n, self.size)
+        opened = 0
+        while not self._closed and self._idle.qsize() < n:
+            conn = self.factory()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                self._discard(conn)
+                break
+            opened += 1
+        return opened
+
+    def close(self):
+        """Close idle connections; borrowed ones are closed when returned."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        logger.info(f"Closed connection pool for '{self.name}'")
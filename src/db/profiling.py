@@ -0,0 +1,183 @@
+import os
+import re
+import json
+import logging
+from collections import Counter
+
+from src.utils.env_loader import load_env
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+PROFILE_SAMPLE_ROWS = int(config.get("PROFILE_SAMPLE_ROWS", 20000))
+PROFILE_TOP_K = int(config.get("PROFILE_TOP_K", 5))
+PROFILE_LOW_CARDINALITY = int(config.get("PROFILE_LOW_CARDINALITY", 20))
+PROFILE_CACHE_PATH = config.get("PROFILE_CACHE_PATH", "./profile_cache")
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?")
+_MAX_VALUE_CHARS = 40
+
+
+def _is_mariadb(db_type: str) -> bool:
+    return db_type.lower() in ("mariadb", "mysql")
+
+
+def _quote(name: str, db_type: str) -> str:
+    return f"`{name}`" if _is_mariadb(db_type) else f'"{name}"'
+
+
+def _tables(cur, db_type: str) -> list[str]:
+    from src.db.summaries import is_summary_table  # summaries imports this module
+
+    if _is_mariadb(db_type):
+        cur.execute("SHOW TABLES;")
+    else:
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;")
+    return [row[0] for row in cur.fetchall() if not is_summary_table(row[0])]
+
+
+def table_columns(cur, db_type: str, table: str) -> list[tuple[str, str]]:
+    """[(column, declared type)]"""
+    if _is_mariadb(db_type):
+        cur.execute(
+            """
+            SELECT COLUMN_NAME, COLUMN_TYPE FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION
+            """,
+            (table,),
+        )
+        return [(row[0], row[1] or "") for row in cur.fetchall()]
+    cur.execute(f"PRAGMA table_info('{table}')")
+    return [(row[1], row[2] or "") for row in cur.fetchall()]
+
+
+def change_marker(cur, db_type: str, table: str, columns) -> list:
+    """
+    Cheap fingerprint of a table's contents: row count, max(row_modified) where the
+    LMS triggers maintain it, max(rowid) on SQLite, and the column signature.
+    """
+    q = lambda name: _quote(name, db_type)
+    names = [c for c, _ in columns]
+    parts = ["COUNT(*)"]
+    if "row_modified" in names:
+        parts.append(f"MAX({q('row_modified')})")
+    if not _is_mariadb(db_type):
+        parts.append("MAX(rowid)")
+    try:
+        cur.execute(f"SELECT {', '.join(parts)} FROM {q(table)}")
+    except Exception:
+        # WITHOUT ROWID tables
+        cur.execute(f"SELECT {', '.join(parts[:-1])} FROM {q(table)}")
+    return [str(v) for v in cur.fetchone()] + [",".join(f"{c}:{t}" for c, t in columns)]
+
+
+def _fetch_rows(cur, db_type: str, table: str, row_count: int, sample_rows: int):
+    """All rows of small tables; a random sample of about `sample_rows` rows otherwise."""
+    q = lambda name: _quote(name, db_type)
+    if row_count <= sample_rows:
+        cur.execute(f"SELECT * FROM {q(table)}")
+    elif _is_mariadb(db_type):
+        fraction = min(1.0, 1.5 * sample_rows / row_count)
+        cur.execute(f"SELECT * FROM {q(table)} WHERE RAND() < {fraction:.8f} LIMIT {sample_rows}")
+    else:
+        # sampling rowids only touches the rowid b-tree
+        cur.execute(
+            f"SELECT * FROM {q(table)} WHERE rowid IN "
+            f"(SELECT rowid FROM {q(table)} ORDER BY RANDOM() LIMIT {sample_rows})"
+        )
+    return cur.fetchall()
+
+
+def _short(value) -> str:
+    text = value.hex() if isinstance(value, (bytes, bytearray)) else str(value)
+    return text if len(text) <= _MAX_VALUE_CHARS else text[:_MAX_VALUE_CHARS - 3] + "..."
+
+
+def profile_column(name: str, ctype: str, values: list, sampled: bool = False,
+                   top_k: int = PROFILE_TOP_K, low_cardinality: int = PROFILE_LOW_CARDINALITY) -> str:
+    """One line of statistics for a column from its (possibly sampled) values."""
+    total = len(values)
+    present = [v for v in values if v is not None]
+    approx = "~" if sampled else ""
+    stats = []
+    if not present:
+        return f"  {name} {ctype}: all null"
+
+    counts = Counter(present)
+    nulls = f", nulls={(total - len(present)) / total:.0%}" if total != len(present) else ""
+    if len(counts) == 1:
+        return f"  {name} {ctype}: constant={_short(present[0])!r}{nulls}"
+    stats.append(f"distinct={approx}{len(counts)}{nulls}")
+
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        stats.append(f"range={min(present)}..{max(present)}")
+    elif all(isinstance(v, str) and _DATE_RE.match(v) for v in present) or (
+        re.search(r"DATE|TIME", ctype, re.I) and all(hasattr(v, "isoformat") for v in present)
+    ):
+        as_text = [v if isinstance(v, str) else v.isoformat(sep=" ") for v in present]
+        stats.append(f"dates={min(as_text)[:19]}..{max(as_text)[:19]}")
+
+    if len(counts) <= low_cardinality:
+        top = ", ".join(f"{_short(v)}({n / len(present):.0%})" for v, n in counts.most_common(top_k))
+        stats.append(f"top={top}")
+    elif not any(s.startswith(("range=", "dates=")) for s in stats):
+        stats.append(f"e.g. {_short(present[0])!r}")
+    return f"  {name} {ctype}: " + ", ".join(stats)
+
+
+def profile_table(cur, db_type: str, table: str, columns, row_count: int,
+                  sample_rows: int = PROFILE_SAMPLE_ROWS) -> str:
+    rows = _fetch_rows(cur, db_type, table, row_count, sample_rows)
+    sampled = row_count > len(rows)
+    header = f"PROFILE: {table} ({row_count} rows" + (f", sampled {len(rows)})" if sampled else ")")
+    if not rows:
+        return f"{header}: " + ", ".join(f"{name} {ctype}" for name, ctype in columns)
+    lines = [header]
+    for i, (name, ctype) in enumerate(columns):
+        lines.append(profile_column(name, ctype or "?", [row[i] for row in rows], sampled))
+    return "\n".join(lines)
+
+
+def _cache_file(name: str) -> str:
+    return os.path.join(PROFILE_CACHE_PATH, f"{name}.json")
+
+
+def profile_tables(conn, db_type: str = "sqlite", cache_name: str | None = None,
+                   sample_rows: int = PROFILE_SAMPLE_ROWS) -> dict[str, str]:
+    """
+    {table: profile}: compact per-column statistics for every table (distinct count,
+    null fraction, min/max, date range, top values of low-cardinality columns).
+    With `cache_name`, profiles are kept in PROFILE_CACHE_PATH/<name>.json and a
+    table is only re-profiled when its change marker moved.
+    """
+    cache = {}
+    if cache_name and os.path.exists(_cache_file(cache_name)):
+        with open(_cache_file(cache_name), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+
+    cur = conn.cursor()
+    profiles, fresh, reused = {}, {}, 0
+    for table in _tables(cur, db_type):
+        try:
+            columns = table_columns(cur, db_type, table)
+            marker = change_marker(cur, db_type, table, columns)
+            cached = cache.get(table)
+            if cached and cached["marker"] == marker:
+                profile = cached["profile"]
+                reused += 1
+            else:
+                profile = profile_table(cur, db_type, table, columns, int(marker[0]), sample_rows)
+            fresh[table] = {"marker": marker, "profile": profile}
+            profiles[table] = profile
+        except Exception as e:
+            logger.warning(f"Could not profile table {table}: {e}")
+    cur.close()
+
+    if cache_name:
+        os.makedirs(PROFILE_CACHE_PATH, exist_ok=True)
+        tmp = _cache_file(cache_name) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(fresh, f)
+        os.replace(tmp, _cache_file(cache_name))
+    logger.info(f"Profiled {len(fresh) - reused} tables, reused {reused} unchanged profiles")
+    return profiles
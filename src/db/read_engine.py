@@ -0,0 +1,141 @@
+"""
+Read-only execution engine for SQLite targets.
+
+Generated SQL only ever needs to read, so it does not go through the pooled
+read-write connections. Each thread keeps its own connection, opened as a
+`mode=ro` URI with `query_only`, a large `mmap_size` / `cache_size` and a
+statement cache of READ_STATEMENT_CACHE prepared statements. An authorizer lets
+SQLite compile nothing but reads (SELECT, table reads, functions, recursive CTEs
+and a few introspection pragmas), so INSERT / UPDATE / DELETE, DDL, ATTACH and
+transaction statements are refused when they are prepared, whatever their text.
+
+Rows come back as plain tuples with the column names once; callers that need
+dicts zip them with the columns.
+"""
+import os
+import sqlite3
+import logging
+import weakref
+import threading
+from urllib.parse import quote
+from contextlib import contextmanager
+
+from src.utils.env_loader import load_env
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+READ_ENGINE = config.get("READ_ENGINE", "true") == "true"
+READ_MMAP_MB = int(config.get("READ_MMAP_MB", 256))
+READ_CACHE_MB = int(config.get("READ_CACHE_MB", 16))
+READ_STATEMENT_CACHE = int(config.get("READ_STATEMENT_CACHE", 256))
+
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+# pragmas that only describe the schema, as PRAGMA statements (the pragma_x(...) table
+# functions are refused: SQLite authorizes them as an UPDATE of sqlite_master)
+_ALLOWED_PRAGMAS = {
+    "table_info", "table_xinfo", "table_list", "index_list", "index_info", "index_xinfo",
+    "foreign_key_list", "database_list", "collation_list", "function_list",
+}
+
+_ACTION_NAMES = {getattr(sqlite3, f"SQLITE_{name}"): name for name in (
+    "CREATE_INDEX", "CREATE_TABLE", "CREATE_TEMP_INDEX", "CREATE_TEMP_TABLE", "CREATE_TEMP_TRIGGER",
+    "CREATE_TEMP_VIEW", "CREATE_TRIGGER", "CREATE_VIEW", "DELETE", "DROP_INDEX", "DROP_TABLE", "DROP_TEMP_INDEX",
+    "DROP_TEMP_TABLE", "DROP_TEMP_TRIGGER", "DROP_TEMP_VIEW", "DROP_TRIGGER", "DROP_VIEW", "INSERT", "PRAGMA",
+    "TRANSACTION", "UPDATE", "ATTACH", "DETACH", "ALTER_TABLE", "REINDEX", "ANALYZE", "CREATE_VTABLE",
+    "DROP_VTABLE", "SAVEPOINT",
+)}
+
+
+class ReadOnlyQueryError(ValueError):
+    """Raised for a statement that would do more than read."""
+
+
+class _ReadConnection(sqlite3.Connection):
+    # the first action the authorizer refused, to tell a refused statement from other errors
+    denied = None
+
+
+def _authorize(conn: _ReadConnection):
+    conn = weakref.proxy(conn)  # no reference cycle, so a dropped connection closes at once
+
+    def authorizer(action, arg1, arg2, db_name, trigger):
+        if action in _ALLOWED_ACTIONS:
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_PRAGMA and arg1 and arg1.lower() in _ALLOWED_PRAGMAS:
+            return sqlite3.SQLITE_OK
+        if conn.denied is None:
+            conn.denied = _ACTION_NAMES.get(action, str(action))
+        return sqlite3.SQLITE_DENY
+
+    return authorizer
+
+
+class ReadEngine:
+    """Per-thread read-only connections to one SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.uri = f"file:{quote(self.path)}?mode=ro"
+        self._local = threading.local()
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new read-only connection (not bound to the calling thread)."""
+        # used by one thread at a time, but a detached one moves to whichever thread serves the next page
+        conn = sqlite3.connect(self.uri, uri=True, factory=_ReadConnection,
+                               cached_statements=READ_STATEMENT_CACHE, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {READ_MMAP_MB * 1024 * 1024}")
+        conn.execute(f"PRAGMA cache_size = {-READ_CACHE_MB * 1024}")
+        conn.set_authorizer(_authorize(conn))
+        logger.info(f"Opened read-only connection to {self.path}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is None or local.pid != os.getpid():
+            conn = local.conn = self.connect()
+            local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def cursor(self):
+        """A cursor on this thread's connection, closed after the block."""
+        cursor = self.connection().cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    def detach(self) -> sqlite3.Connection:
+        """
+        Hand this thread's connection to the caller, who must close it; the thread opens
+        a fresh one next time. Lets a cursor started here stay open across requests.
+        """
+        conn = self.connection()
+        self._local.conn = None
+        return conn
+
+    def run(self, cursor: sqlite3.Cursor, sql: str, params=None) -> sqlite3.Cursor:
+        """Execute on a cursor of this engine, turning a refused statement into ReadOnlyQueryError."""
+        conn = cursor.connection
+        conn.denied = None
+        try:
+            return cursor.execute(sql, params or ())
+        except sqlite3.DatabaseError as e:
+            if conn.denied:
+                raise ReadOnlyQueryError(f"Only read queries are allowed (refused: {conn.denied})") from e
+            raise
+
+    def execute(self, sql: str, params=None) -> tuple[list[str], list[tuple]]:
+        """(column names, rows as tuples) of a read query."""
+        with self.cursor() as cursor:
+            self.run(cursor, sql, params)
+            columns = [d[0] for d in cursor.description] if cursor.description else []
+            return columns, cursor.fetchall()
+
+    def close(self):
+        """Forget every thread's connection; each closes once its current query (if any) is done."""
+        self._local = threading.local()
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from src.utils.env_loader import load_env
+from src.utils.shared_cache import SharedTTLCache, get_shared_cache, make_key
+from src.db.pool import ConnectionPool
+from src.db.read_engine import ReadEngine, READ_ENGINE
+from src.db.connection import (
+    get_connection,
+    get_maria_connection,
+    get_schema_description,
+    get_mariadb_schema_description,
+)
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+DEFAULT_DATABASE = config.get("DEFAULT_DATABASE", "default")
+MAX_LOADED_DATABASES = int(config.get("MAX_LOADED_DATABASES", 8))
+DATABASE_IDLE_SECONDS = float(config.get("DATABASE_IDLE_SECONDS", 1800))
+DB_POOL_SIZE = int(config.get("DB_POOL_SIZE", 5))
+RESULT_CACHE_SIZE = int(config.get("RESULT_CACHE_SIZE", 256))
+RESULT_CACHE_TTL = float(config.get("RESULT_CACHE_TTL", 60))
+
+
+class UnknownDatabaseError(ValueError):
+    """Raised for a `database` name that is not configured."""
+
+
+def collection_for(base: str, database: str | None = None) -> str:
+    """
+    Per-database vector collection name. The default database keeps the
+    original names (query_cache, pmc_chunks) so existing caches stay valid.
+    """
+    if not database or database == DEFAULT_DATABASE:
+        return base
+    return f"{base}__{database}"
+
+
+def _load_definitions() -> dict:
+    """
+    Named targets from DATABASES, a JSON object or the path of a JSON file:
+      {"crm": {"type": "sqlite", "path": "./crm.sqlite"},
+       "lms": {"type": "mariadb", "host": "...", "port": 3306, "user": "...", "password": "...", "database": "lms"}}
+    The default target (DEFAULT_DATABASE) is built from the DB_* settings unless defined there.
+    """
+    raw = config.get("DATABASES") or ""
+    definitions = {}
+    if raw:
+        if os.path.isfile(raw):
+            with open(raw, "r", encoding="utf-8") as f:
+                raw = f.read()
+        definitions = json.loads(raw)
+    definitions.setdefault(DEFAULT_DATABASE, {
+        "type": config.get("DB_TYPE", "sqlite"),
+        "path": config.get("DB_PATH"),
+        "host": config.get("DB_HOST"),
+        "port": config.get("DB_PORT"),
+        "user": config.get("DB_USER"),
+        "password": config.get("DB_PASSWORD"),
+        "database": config.get("DB_NAME"),
+    })
+    return definitions
+
+
+class DatabaseTarget:
+    """
+    One named database: its connection pool, result cache, and the lazily
+    loaded schema description and SQL agent built from it.
+    """
+
+    def __init__(self, name: str, settings: dict):
+        self.name = name
+        self.settings = settings
+        self.type = (settings.get("type") or "sqlite").lower()
+        self.is_mariadb = self.type in ("mariadb", "mysql")
+        self.pool = ConnectionPool(self.connect, size=int(settings.get("pool_size", DB_POOL_SIZE)), name=name)
+        # READ ONLY MariaDB sessions for generated SQL; elsewhere the read-write pool
+        self.read_pool = self.pool
+        if self.is_mariadb and READ_ENGINE:
+            self.read_pool = ConnectionPool(lambda: self.connect(read_only=True), size=self.pool.size,
+                                            name=f"{name} (read only)")
+        self.results = SharedTTLCache(f"results:{name}", RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+        self.last_used = time.monotonic()
+        self._schema = None
+        self._agent = None
+        self._reader = None
+        self._lock = threading.RLock()
+
+    def connect(self, read_only: bool = False):
+        """
+        Open a new, unpooled connection (the pool's factory; also used for held cursors).
+        `read_only` MariaDB sessions refuse DML; SQLite reads go through `reader`.
+        """
+        if self.is_mariadb:
+            conn = get_maria_connection({k: self.settings.get(k) for k in ("user", "password", "host", "port", "database")})
+            # each read sees the latest commits instead of the snapshot of a transaction left open
+            conn.autocommit = True
+            if read_only:
+                cur = conn.cursor()
+                cur.execute("SET SESSION TRANSACTION READ ONLY")
+                cur.close()
+            return conn
+        return get_connection(self.settings.get("path"))
+
+    @property
+    def reader(self) -> ReadEngine | None:
+        """Read-only engine for generated SQL (SQLite targets with READ_ENGINE on), else None."""
+        if self.is_mariadb or not READ_ENGINE:
+            return None
+        if self._reader is not None:
+            return self._reader
+        with self._lock:
+            if self._reader is None:
+                self._reader = ReadEngine(self.settings.get("path") or config.get("DB_PATH") or "./db.sqlite")
+            return self._reader
+
+    @property
+    def cache_collection(self) -> str:
+        return collection_for("query_cache", self.name)
+
+    @property
+    def rag_collection(self) -> str:
+        return collection_for("pmc_chunks", self.name)
+
+    def _load_schema(self) -> str:
+        with self.pool.connection() as conn:
+            if self.is_mariadb:
+                schema = get_mariadb_schema_description(conn)
+            else:
+                schema = get_schema_description(conn)
+        logger.info(f"Loaded schema for database '{self.name}'")
+        return schema
+
+    def schema_description(self) -> str:
+        """Schema text for prompts, loaded on first use (introspected by one worker, shared with the rest)."""
+        with self._lock:
+            if self._schema is None:
+                key = make_key(self.name, *(str(self.settings.get(k)) for k in ("type", "path", "host", "port", "database")))
+                self._schema = get_shared_cache().get_or_compute("schema", key, self._load_schema)
+            return self._schema
+
+    def agent(self):
+        """The generate_sql callable for this database, built on first use (the LLM client is shared)."""
+        with self._lock:
+            if self._agent is None:
+                from src.agents.sql_agent import get_sql_agent
+
+                self._agent = get_sql_agent(self.schema_description(), database=self.name)
+            return self._agent
+
+    def busy(self) -> bool:
+        """True while any connection of its pools is checked out (queries, held cursors)."""
+        return self.pool.borrowed > 0 or self.read_pool.borrowed > 0
+
+    def close(self):
+        with self._lock:
+            self.pool.close()
+            if self.read_pool is not self.pool:
+                self.read_pool.close()
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            self._schema = None
+            self._agent = None
+
+
+_definitions = None
+_loaded: "OrderedDict[str, DatabaseTarget]" = OrderedDict()
+_registry_lock = threading.Lock()
+
+
+def _get_definitions() -> dict:
+    global _definitions
+    if _definitions is None:
+        _definitions = _load_definitions()
+    return _definitions
+
+
+def list_databases() -> list[dict]:
+    """Configured database names, their type and whether they are currently loaded."""
+    with _registry_lock:
+        return [
+            {"name": name, "type": (settings.get("type") or "sqlite").lower(), "loaded": name in _loaded}
+            for name, settings in _get_definitions().items()
+        ]
+
+
+def get_target(name: str | None = None) -> DatabaseTarget:
+    """
+    Return the loaded target `name` (DEFAULT_DATABASE when None), loading it
+    if needed. Targets beyond MAX_LOADED_DATABASES (least recently used first)
+    or idle for DATABASE_IDLE_SECONDS are unloaded.
+    """
+    name = name or DEFAULT_DATABASE
+    with _registry_lock:
+        definitions = _get_definitions()
+        if name not in definitions:
+            raise UnknownDatabaseError(f"Unknown database: {name}")
+        target = _loaded.get(name)
+        if target is None:
+            target = DatabaseTarget(name, definitions[name])
+            _loaded[name] = target
+            logger.info(f"Registered database '{name}' ({target.type})")
+        _loaded.move_to_end(name)
+        target.last_used = time.monotonic()
+        _unload_idle(keep=name)
+        return target
+
+
+def _unload_idle(keep: str):
+    now = time.monotonic()
+    # OrderedDict iterates least recently used first
+    for name, target in list(_loaded.items()):
+        if name == keep or target.busy():
+            continue  # a busy target is unloaded by a later call, once its connections are back
+        if len(_loaded) > MAX_LOADED_DATABASES or now - target.last_used > DATABASE_IDLE_SECONDS:
+            del _loaded[name]
+            target.close()
+            logger.info(f"Unloaded idle database '{name}'")
+
+
+def unload_all():
+    with _registry_lock:
+        for target in _loaded.values():
+            target.close()
+        _loaded.clear()
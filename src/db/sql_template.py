@@ -0,0 +1,230 @@
+import re
+
+# SQL tokens: string literals, quoted identifiers, words, numbers, comments, anything else.
+# Tokenising (rather than searching) keeps digits inside identifiers like `canvas_course_01` intact.
+_SQL_TOKEN_RE = re.compile(
+    r"""(?P<string>'(?:[^']|'')*')"""
+    r"""|(?P<ident>"(?:[^"]|"")*"|`[^`]*`)"""
+    r"""|(?P<word>[A-Za-z_][\w$]*)"""
+    r"""|(?P<number>\d+(?:\.\d+)?)"""
+    r"""|(?P<comment>--[^\n]*)"""
+    r"""|(?P<other>.)""",
+    re.S,
+)
+
+# Values we can reliably spot in a natural-language question.
+_QUESTION_VALUE_RE = re.compile(
+    r"""(?P<date>\b\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?\b)"""
+    r"""|'(?P<squote>[^']+)'|"(?P<dquote>[^"]+)\""""
+    r"""|(?P<num>(?<![\w.])\d+(?:\.\d+)?(?![\w.]))"""
+)
+
+_SLOT_PATTERNS = {
+    "date": r"(\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?)",
+    "str": r"""['"](.+?)['"]""",
+    "num": r"(\d+(?:\.\d+)?)",
+    "word": r"(\S+?)",
+}
+
+
+def _question_values(question: str) -> list[dict]:
+    """Detectable literal values in a question, in order of appearance."""
+    values = []
+    for m in _QUESTION_VALUE_RE.finditer(question):
+        kind = m.lastgroup
+        if kind in ("squote", "dquote"):
+            kind = "str"
+        values.append({"kind": kind, "text": m.group(m.lastgroup), "start": m.start(), "end": m.end()})
+    return values
+
+
+def _sql_literals(sql: str) -> list[dict]:
+    """String and number literals in a SQL statement, in order of appearance."""
+    literals = []
+    for m in _SQL_TOKEN_RE.finditer(sql):
+        if m.lastgroup == "string":
+            literals.append({"kind": "string", "text": m.group()[1:-1].replace("''", "'"),
+                             "start": m.start(), "end": m.end()})
+        elif m.lastgroup == "number":
+            literals.append({"kind": "number", "text": m.group(), "start": m.start(), "end": m.end()})
+    return literals
+
+
+def _same_value(a: str, b: str) -> bool:
+    try:
+        return float(a) == float(b)
+    except ValueError:
+        return a.strip().lower() == b.strip().lower()
+
+
+def mask_question(question: str) -> str:
+    """Replace detectable literals with kind placeholders, e.g. 'client 12' -> 'client <num>'."""
+    return _QUESTION_VALUE_RE.sub(lambda m: "<str>" if m.lastgroup in ("squote", "dquote") else f"<{m.lastgroup}>",
+                                  question)
+
+
+def same_literals(question: str, other: str) -> bool:
+    """True if both questions carry the same detectable literal values, in the same order."""
+    a, b = _question_values(question), _question_values(other)
+    return len(a) == len(b) and all(_same_value(x["text"], y["text"]) for x, y in zip(a, b))
+
+
+def templatize(question: str, sql: str) -> dict | None:
+    """
+    Turn a verified (question, SQL) pair into a parameterised template.
+
+    SQL literals whose value also appears in the question become `?` slots;
+    the rest (e.g. `is_client = 1`) stay fixed. LIKE wildcards around a
+    string value are kept as a prefix/suffix of the slot. Returns None when
+    no literal can be aligned with the question, or when one is ambiguous: its
+    value appears more than once in the question ("show 12 orders for client 12"),
+    so a new question's values could not be told apart.
+    """
+    q_values = _question_values(question)
+    slots = []          # one per slotted question value: kind + span in the question
+    sql_slots = []      # per `?` in the SQL: slot index, python type and LIKE affixes
+    replacements = []   # (start, end) spans of SQL literals to replace with `?`
+
+    for lit in _sql_literals(sql):
+        text = lit["text"]
+        core = text.strip("%") if lit["kind"] == "string" else text
+        if not core:
+            continue
+        prefix = text[:len(text) - len(text.lstrip("%"))] if lit["kind"] == "string" else ""
+        suffix = text[len(text.rstrip("%")):] if lit["kind"] == "string" else ""
+
+        slot_index = next((i for i, s in enumerate(slots) if _same_value(s["text"], core)), None)
+        if slot_index is None:
+            matches = [v for v in q_values if _same_value(v["text"], core)]
+            if not matches and lit["kind"] == "string":
+                # Bare word in the question, e.g. "active orders" -> status = 'active'
+                matches = [
+                    {"kind": "word", "text": word.group(), "start": word.start(), "end": word.end()}
+                    for word in re.finditer(rf"(?<!\w){re.escape(core)}(?!\w)", question, flags=re.I)
+                    if not any(v["start"] <= word.start() < v["end"] for v in q_values)
+                ]
+            if len(matches) > 1:
+                return None
+            if not matches:
+                continue
+            match = matches[0]
+            slots.append(match)
+            slot_index = len(slots) - 1
+
+        sql_slots.append({"slot": slot_index, "type": "number" if lit["kind"] == "number" else "string",
+                          "prefix": prefix, "suffix": suffix})
+        replacements.append((lit["start"], lit["end"]))
+
+    if not slots:
+        return None
+
+    sql_template = sql
+    for start, end in reversed(replacements):
+        sql_template = sql_template[:start] + "?" + sql_template[end:]
+
+    # Question as literal segments and slot references, in question order
+    segments, pos = [], 0
+    for i, slot in sorted(enumerate(slots), key=lambda item: item[1]["start"]):
+        segments.append(question[pos:slot["start"]])
+        segments.append({"slot": i})
+        pos = slot["end"]
+    segments.append(question[pos:])
+
+    return {
+        "sql": sql_template,
+        "question": segments,
+        "slots": [s["kind"] for s in slots],
+        "sql_slots": sql_slots,
+        # For positional binding: kind of every detectable value, and its slot (or None)
+        "values": [
+            {"kind": v["kind"], "slot": next((i for i, s in enumerate(slots) if s["start"] == v["start"]), None)}
+            for v in q_values
+        ],
+    }
+
+
+def _segment_pattern(text: str) -> str:
+    """Regex for a literal question segment, tolerant to whitespace and case."""
+    words = text.split()
+    if not words:
+        return r"\s*"
+    lead = r"\s*" if text[:1].isspace() else ""
+    trail = r"\s*" if text[-1:].isspace() else ""
+    return lead + r"\s+".join(re.escape(w) for w in words) + trail
+
+
+def _extract_slot_values(template: dict, question: str) -> list[str] | None:
+    """Find the slot values in a new question, by template regex first, then by position."""
+    # Trailing punctuation is optional on both sides ("...client 12?" vs "...client 47")
+    segments = list(template["question"])
+    if segments and isinstance(segments[-1], str):
+        segments[-1] = segments[-1].rstrip().rstrip("?.!")
+    pattern = "".join(
+        _SLOT_PATTERNS[template["slots"][seg["slot"]]] if isinstance(seg, dict) else _segment_pattern(seg)
+        for seg in segments
+    )
+    match = re.fullmatch(pattern, question.strip().rstrip("?.!").rstrip(), flags=re.I)
+    if match:
+        order = [seg["slot"] for seg in template["question"] if isinstance(seg, dict)]
+        found = dict(zip(order, match.groups()))
+        return [found[i] for i in range(len(template["slots"]))]
+
+    if "word" in template["slots"]:
+        return None
+    values = _question_values(question)
+    if [v["kind"] for v in values] != [v["kind"] for v in template["values"]]:
+        return None
+    found = {}
+    for value, expected in zip(values, template["values"]):
+        if expected["slot"] is not None:
+            found[expected["slot"]] = value["text"]
+    return [found[i] for i in range(len(template["slots"]))]
+
+
+def bind(template: dict, question: str) -> list | None:
+    """Return SQL parameters for `template` extracted from `question`, or None if it doesn't fit."""
+    values = _extract_slot_values(template, question)
+    if values is None:
+        return None
+
+    params = []
+    for sql_slot in template["sql_slots"]:
+        value = values[sql_slot["slot"]]
+        if sql_slot["type"] == "number":
+            try:
+                params.append(int(value) if re.fullmatch(r"\d+", value) else float(value))
+            except ValueError:
+                return None
+        else:
+            params.append(f"{sql_slot['prefix']}{value}{sql_slot['suffix']}")
+    return params
+
+
+def sql_tokens(sql: str) -> list[dict]:
+    """Tokens of a statement without whitespace and comments: {"kind", "text", "start", "end"}."""
+    return [
+        {"kind": m.lastgroup, "text": m.group(), "start": m.start(), "end": m.end()}
+        for m in _SQL_TOKEN_RE.finditer(sql)
+        if m.lastgroup != "comment" and not m.group().isspace()
+    ]
+
+
+def sql_literal(value) -> str:
+    """SQL literal text for a parameter value (display, logging and DDL only)."""
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def render_sql(sql: str, params: list | None) -> str:
+    """Inline parameters into a `?` template for display and logging (never for execution)."""
+    if not params:
+        return sql
+    values = iter(params)
+    out = []
+    for m in _SQL_TOKEN_RE.finditer(sql):
+        if m.group() == "?" and m.lastgroup == "other":
+            out.append(sql_literal(next(values)))
+        else:
+            out.append(m.group())
+    return "".join(out)
@@ -0,0 +1,714 @@
+"""
+Materialized summary tables mined from frequent verified queries.
+
+An offline job groups the SQL logged in query_history by shape (literals
+replaced by slots). Verified aggregate queries asked at least
+SUMMARY_MIN_QUERIES times are materialized in the target database as
+summary_<hash> tables, registered in _summary_tables. A top-level
+`column = value` filter becomes a key column of the summary, so one table
+answers the query for every value; all other literals must match exactly.
+
+execute_sql_query and /query call rewrite_query, which answers a matching
+statement from its summary while the summary was refreshed within
+SUMMARY_MAX_STALENESS seconds and after the last write the service ran on that
+database. `refresh` rebuilds only the summaries whose base tables changed (row
+count, max(row_modified), max(rowid)) or that predate such a write.
+
+Usage:
+  python -m src.db.summaries build   [--database NAME] [--min-queries N] [--dry-run]
+  python -m src.db.summaries refresh [--database NAME] [--force] [--watch SECONDS]
+  python -m src.db.summaries report  [--database NAME]
+"""
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+
+from src.utils.env_loader import load_env
+from src.utils.shared_cache import SharedTTLCache
+from src.db.sql_template import sql_tokens, sql_literal
+from src.db.profiling import table_columns, change_marker
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+SUMMARY_MIN_QUERIES = int(config.get("SUMMARY_MIN_QUERIES", 3))
+SUMMARY_MAX_STALENESS = float(config.get("SUMMARY_MAX_STALENESS", 900))
+SUMMARY_REWRITE = config.get("SUMMARY_REWRITE", "true") == "true"
+SUMMARY_RELOAD_SECONDS = float(config.get("SUMMARY_RELOAD_SECONDS", 60))
+SUMMARY_CHECK_KEYS = int(config.get("SUMMARY_CHECK_KEYS", 3))
+
+REGISTRY_TABLE = "_summary_tables"
+SUMMARY_PREFIX = "summary_"
+# database -> time of the last write this service ran on it (shared by the workers); a
+# summary refreshed before that is not used. Older writes no longer matter: by then every
+# summary refreshed before them is past SUMMARY_MAX_STALENESS anyway.
+_writes = SharedTTLCache("summary_writes", 256, SUMMARY_MAX_STALENESS)
+_AGGREGATES = {"count", "sum", "avg", "min", "max", "total", "group_concat"}
+_CLAUSES = ("from", "where", "group", "having", "order", "limit")
+_UNSUPPORTED = {"union", "intersect", "except", "over", "window", "into"}
+
+
+def is_summary_table(name: str) -> bool:
+    """
+    True for the registry and the generated summary tables. They are left out of the
+    schema text, profiles and routing, so the LLM never queries a summary directly.
+    """
+    return name == REGISTRY_TABLE or name.startswith(SUMMARY_PREFIX)
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def _name(tok: dict) -> str:
+    """Lower-cased identifier text without quotes."""
+    text = tok["text"]
+    if tok["kind"] == "ident":
+        text = text[1:-1]
+    return text.lower()
+
+
+def _norm(tokens: list[dict]) -> str:
+    return " ".join("?" if "slot" in t else _name(t) if t["kind"] in ("word", "ident") else t["text"] for t in tokens)
+
+
+def _split(tokens: list[dict], separator) -> list[list[dict]]:
+    """Split on depth-0 tokens for which separator(token) is true."""
+    parts, current, depth = [], [], 0
+    for tok in tokens:
+        if tok["text"] == "(":
+            depth += 1
+        elif tok["text"] == ")":
+            depth -= 1
+        if depth == 0 and separator(tok):
+            parts.append(current)
+            current = []
+        else:
+            current.append(tok)
+    parts.append(current)
+    return parts
+
+
+def _conjuncts(tokens: list[dict]) -> list[list[dict]] | None:
+    """Top-level AND terms of a WHERE clause (BETWEEN ... AND kept together); None if it has a top-level OR."""
+    terms, current, depth, in_between = [], [], 0, False
+    for tok in tokens:
+        word = tok["text"].lower() if tok["kind"] == "word" else None
+        if tok["text"] == "(":
+            depth += 1
+        elif tok["text"] == ")":
+            depth -= 1
+        if depth == 0 and word == "or":
+            return None
+        if depth == 0 and word == "between":
+            in_between = True
+        elif depth == 0 and word == "and":
+            if in_between:
+                in_between = False
+            else:
+                terms.append(current)
+                current = []
+                continue
+        current.append(tok)
+    terms.append(current)
+    return terms
+
+
+def _key_column(term: list[dict]) -> tuple[list[dict], dict] | None:
+    """(column tokens, slot token) for a `column = value` or `table.column = value` term."""
+    if len(term) == 3 and term[1]["text"] == "=" and "slot" in term[2] and term[0]["kind"] in ("word", "ident"):
+        return term[:1], term[2]
+    if (len(term) == 5 and term[1]["text"] == "." and term[3]["text"] == "=" and "slot" in term[4]
+            and term[0]["kind"] in ("word", "ident") and term[2]["kind"] in ("word", "ident")):
+        return term[:3], term[4]
+    return None
+
+
+def _plain(value):
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def analyze(sql: str, params=None) -> dict | None:
+    """
+    Break a single-level aggregate SELECT into what a summary table needs, or
+    return None when the statement is not one (subqueries, UNION, SELECT *,
+    DISTINCT, window functions and statements without aggregation are skipped).
+
+    Literals and `?` placeholders are slots. Slots in top-level `column = value`
+    WHERE terms of a GROUP BY query are keys: the summary groups by those columns
+    too, and a rewritten query filters on them. All other slots are fixed and part
+    of `match_key`, so only statements with the same shape and fixed values match.
+    """
+    tokens = sql_tokens(sql)
+    while tokens and tokens[-1]["text"] == ";":
+        tokens.pop()
+    if len(tokens) < 4 or tokens[0]["text"].lower() != "select" or tokens[1]["text"].lower() in ("distinct", "all"):
+        return None
+
+    params = list(params or ())
+    clauses, slots, depth, used = {}, [], 0, 0
+    for i, tok in enumerate(tokens):
+        text, word = tok["text"], tok["text"].lower() if tok["kind"] == "word" else None
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif text == ";" or word in _UNSUPPORTED or (word == "select" and i > 0):
+            return None
+        elif text == "*" and tokens[i - 1]["text"] != "(":
+            if tokens[i - 1]["text"] in (",", ".") or tokens[i - 1]["text"].lower() == "select":
+                return None
+
+        if tok["kind"] in ("string", "number") or (text == "?" and tok["kind"] == "other"):
+            if text == "?":
+                if used >= len(params):
+                    return None
+                value = params[used]
+                used += 1
+            elif tok["kind"] == "string":
+                value = text[1:-1].replace("''", "'")
+            else:
+                value = float(text) if "." in text else int(text)
+            tok["slot"] = len(slots)
+            tok["value"] = value
+            slots.append(_plain(value))
+
+        if depth == 0 and word in _CLAUSES:
+            if word in ("group", "order") and (i + 1 >= len(tokens) or tokens[i + 1]["text"].lower() != "by"):
+                continue
+            if word in clauses:
+                return None
+            clauses[word] = i
+    if depth != 0 or used != len(params) or "from" not in clauses:
+        return None
+    positions = [clauses[c] for c in _CLAUSES if c in clauses]
+    if positions != sorted(positions):
+        return None
+
+    def bounds(clause):
+        if clause not in clauses:
+            return None
+        start = clauses[clause]
+        later = [p for p in positions if p > start]
+        return start, later[0] if later else len(tokens)
+
+    def render(parts: list[dict]) -> str:
+        """Original text of a token run, with `?` placeholders inlined as literals."""
+        out, pos = [], parts[0]["start"]
+        for tok in parts:
+            out.append(sql[pos:tok["start"]])
+            out.append(sql_literal(tok["value"]) if tok["text"] == "?" else tok["text"])
+            pos = tok["end"]
+        return "".join(out)
+
+    items = _split(tokens[1:clauses["from"]], lambda t: t["text"] == ",")
+    outputs = []
+    for item in items:
+        if not item:
+            return None
+        alias = None
+        if len(item) >= 3 and item[-2]["text"].lower() == "as":
+            alias, item = _name(item[-1]), item[:-2]
+        elif (len(item) >= 2 and item[-1]["kind"] in ("word", "ident")
+              and (item[-2]["text"] == ")" or item[-2]["kind"] in ("word", "ident", "number", "string"))):
+            alias, item = _name(item[-1]), item[:-1]
+        outputs.append({"expr": _norm(item), "alias": alias})
+
+    select_tokens = tokens[1:clauses["from"]]
+    grouped = "group" in clauses
+    aggregated = grouped or any(
+        t["kind"] == "word" and t["text"].lower() in _AGGREGATES and j + 1 < len(select_tokens)
+        and select_tokens[j + 1]["text"] == "("
+        for j, t in enumerate(select_tokens)
+    )
+    if not aggregated:
+        return None
+
+    # WHERE: `column = value` terms become summary keys (only with GROUP BY: a scalar
+    # aggregate over no rows still returns one row, which a key lookup could not)
+    key_columns, key_slots, kept_terms = [], [], []
+    where = bounds("where")
+    if where:
+        terms = _conjuncts(tokens[where[0] + 1:where[1]]) if grouped else None
+        for term in terms if terms is not None else [tokens[where[0] + 1:where[1]]]:
+            key = _key_column(term) if terms is not None else None
+            if key:
+                key_columns.append(render(key[0]))
+                key_slots.append(key[1]["slot"])
+            else:
+                kept_terms.append(term)
+
+    from_end = where[0] if where else (bounds("from")[1])
+    # every table of the FROM list: after FROM, JOIN or a top-level comma (`FROM a, b`)
+    tables, depth = [], 0
+    for j in range(clauses["from"], from_end):
+        text = tokens[j]["text"]
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        if depth == 0 and (text.lower() in ("from", "join") or text == ","):
+            if j + 1 >= from_end or tokens[j + 1]["kind"] not in ("word", "ident"):
+                return None
+            tables.append(tokens[j + 1]["text"].strip('`"'))
+
+    # key columns go after the original outputs, so GROUP BY / ORDER BY ordinals keep their meaning
+    definition = ["SELECT", render(select_tokens)]
+    if key_columns:
+        definition.append(", " + ", ".join(f"{col} AS _k{n + 1}" for n, col in enumerate(key_columns)))
+    definition.append(render(tokens[clauses["from"]:from_end]))
+    if kept_terms:
+        definition.append("WHERE " + " AND ".join(render(term) for term in kept_terms))
+    group_by = []
+    if grouped:
+        group = bounds("group")
+        group_by.append(render(tokens[group[0] + 2:group[1]]))
+    group_by += key_columns
+    if group_by:
+        definition.append("GROUP BY " + ", ".join(group_by))
+    if "having" in clauses:
+        having = bounds("having")
+        definition.append(render(tokens[having[0]:having[1]]))
+
+    order = []
+    if "order" in clauses:
+        start, end = bounds("order")
+        for item in _split(tokens[start + 2:end], lambda t: t["text"] == ","):
+            direction = []
+            while item and item[-1]["kind"] == "word" and item[-1]["text"].lower() in ("asc", "desc", "nulls", "first", "last"):
+                direction.insert(0, item.pop()["text"])
+            if not item:
+                return None
+            order.append({
+                "expr": _norm(item),
+                "name": _name(item[0]) if len(item) == 1 and item[0]["kind"] in ("word", "ident") else None,
+                "ordinal": item[0]["text"] if len(item) == 1 and item[0]["kind"] == "number" else None,
+                "direction": " ".join(direction),
+            })
+    limit = bounds("limit")
+
+    # the statement with its key values as `?` parameters, to check a summary against other keys
+    template, template_params, key_positions, pos = [], [], [], 0
+    for tok in tokens:
+        template.append(sql[pos:tok["start"]])
+        pos = tok["end"]
+        if tok.get("slot") in key_slots:
+            key_positions.append(len(template_params))
+            template_params.append(tok["value"])
+            template.append("?")
+        elif tok["text"] == "?" and "slot" in tok:
+            template_params.append(tok["value"])
+            template.append("?")
+        else:
+            template.append(tok["text"])
+
+    fixed = [value for n, value in enumerate(slots) if n not in key_slots]
+    shape = _norm(tokens)
+    return {
+        "sql": sql,
+        "params": params,
+        "shape": shape,
+        "match_key": hashlib.sha1(json.dumps([shape, fixed], default=str).encode("utf-8")).hexdigest(),
+        "keys": [slots[n] for n in key_slots],
+        "key_columns": key_columns,
+        "tables": tables,
+        "outputs": outputs,
+        "order": order,
+        "limit": render(tokens[limit[0]:limit[1]]) if limit else "",
+        "definition": " ".join(definition),
+        "template": "".join(template),
+        "template_params": template_params,
+        "key_positions": key_positions,
+    }
+
+
+def _quote(name: str, is_mariadb: bool) -> str:
+    return f"`{name}`" if is_mariadb else f'"{name}"'
+
+
+def _rewrite_sql(parsed: dict, table: str, columns: list[str], is_mariadb: bool) -> str | None:
+    """SELECT against summary `table` returning the original query's columns, order and limit."""
+    if len(columns) != len(parsed["outputs"]) or len({c.lower() for c in columns}) != len(columns):
+        return None
+    quoted = [_quote(c, is_mariadb) for c in columns]
+    sql = f"SELECT {', '.join(quoted)} FROM {table}"
+    if parsed["keys"]:
+        sql += " WHERE " + " AND ".join(f"_k{n + 1} = ?" for n in range(len(parsed["keys"])))
+
+    order_by = []
+    for item in parsed["order"]:
+        exprs = [o["expr"] for o in parsed["outputs"]]
+        names = [c.lower() for c in columns]
+        if item["expr"] in exprs:
+            target = quoted[exprs.index(item["expr"])]
+        elif item["name"] in names:
+            target = quoted[names.index(item["name"])]
+        elif item["ordinal"]:
+            target = item["ordinal"]
+        else:
+            return None
+        order_by.append(f"{target} {item['direction']}".strip())
+    if order_by:
+        sql += " ORDER BY " + ", ".join(order_by)
+    if parsed["limit"]:
+        sql += " " + parsed["limit"]
+    return sql
+
+
+# ---------------------------------------------------------------------------
+# Building and refreshing
+# ---------------------------------------------------------------------------
+
+def _ph(target) -> str:
+    return "%s" if target.is_mariadb else "?"
+
+
+def ensure_registry(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {REGISTRY_TABLE} (
+            name VARCHAR(64) PRIMARY KEY,
+            match_key VARCHAR(64) NOT NULL,
+            shape TEXT,
+            definition_sql TEXT NOT NULL,
+            rewrite_sql TEXT NOT NULL,
+            key_columns TEXT,
+            base_tables TEXT,
+            markers TEXT,
+            query_count INTEGER,
+            base_ms REAL,
+            summary_ms REAL,
+            built_at REAL,
+            refreshed_at REAL
+        )
+    """)
+
+
+def _history(database: str) -> list[tuple[str, str]]:
+    """(generated_sql, status) of every non-rejected query logged against `database`."""
+    from src.db.feedback import get_feedback_connection, FEEDBACK_DB_TYPE
+    from src.db.registry import DEFAULT_DATABASE
+
+    conn = get_feedback_connection()
+    cur = conn.cursor()
+    column, ph = ("`database`", "%s") if FEEDBACK_DB_TYPE == "mariadb" else ("database", "?")
+    cur.execute(
+        f"SELECT generated_sql, status FROM query_history "
+        f"WHERE generated_sql IS NOT NULL AND COALESCE(status, 'new') <> 'rejected' "
+        f"AND COALESCE({column}, {ph}) = {ph}",
+        (DEFAULT_DATABASE, database),
+    )
+    rows = [(row[0], row[1]) for row in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+def mine_candidates(database: str, min_queries: int = SUMMARY_MIN_QUERIES) -> list[dict]:
+    """Clusters of same-shape aggregate queries with a verified member, most frequent first."""
+    clusters = {}
+    for sql, status in _history(database):
+        parsed = analyze(sql)
+        if not parsed:
+            continue
+        cluster = clusters.setdefault(parsed["match_key"], {"parsed": parsed, "count": 0, "verified": 0})
+        cluster["count"] += 1
+        if status == "verified":
+            if not cluster["verified"]:
+                cluster["parsed"] = parsed
+            cluster["verified"] += 1
+    candidates = [c for c in clusters.values() if c["verified"] and c["count"] >= min_queries]
+    return sorted(candidates, key=lambda c: -c["count"])
+
+
+def _materialize(conn, target, name: str, definition: str, key_count: int):
+    """(Re)build summary `name` from `definition` and swap it in atomically."""
+    cur = conn.cursor()
+    staging = f"{name}__new"
+    cur.execute(f"DROP TABLE IF EXISTS {staging}")
+    cur.execute(f"CREATE TABLE {staging} AS {definition}")
+    if key_count:
+        keys = ", ".join(f"_k{n + 1}" for n in range(key_count))
+        # SQLite index names are database-wide and survive the rename
+        cur.execute(f"CREATE INDEX {name}_k{int(time.time() * 1000)} ON {staging} ({keys})")
+    if target.is_mariadb:
+        cur.execute(f"SHOW TABLES LIKE '{name}'")
+        if cur.fetchall():
+            cur.execute(f"RENAME TABLE {name} TO {name}__old, {staging} TO {name}")
+            cur.execute(f"DROP TABLE {name}__old")
+        else:
+            cur.execute(f"RENAME TABLE {staging} TO {name}")
+    else:
+        conn.commit()
+        cur.execute("BEGIN")
+        cur.execute(f"DROP TABLE IF EXISTS {name}")
+        cur.execute(f"ALTER TABLE {staging} RENAME TO {name}")
+    conn.commit()
+    cur.close()
+
+
+def _markers(cur, target, tables: list[str]) -> dict:
+    return {t: change_marker(cur, target.type, t, table_columns(cur, target.type, t)) for t in tables}
+
+
+def _timed(cur, sql: str, params, runs: int = 3) -> tuple[float, list]:
+    """Best-of-`runs` wall time in ms, and the rows."""
+    best, rows = None, []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        cur.execute(sql, params or ())
+        rows = cur.fetchall()
+        elapsed = (time.perf_counter() - t0) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, rows
+
+
+def _canonical(rows) -> list:
+    """Order-insensitive, float-tolerant form of a result for comparison."""
+    return sorted(repr(tuple(round(v, 6) if isinstance(v, float) else v for v in row)) for row in rows)
+
+
+def _reproduces_other_keys(cur, parsed: dict, name: str, rewrite: str) -> bool:
+    """
+    Whether the rewrite also matches the original query for up to SUMMARY_CHECK_KEYS
+    other key values found in the summary, not just the one the query was asked with.
+    """
+    if not parsed["keys"]:
+        return True
+    key_list = ", ".join(f"_k{n + 1}" for n in range(len(parsed["keys"])))
+    cur.execute(f"SELECT DISTINCT {key_list} FROM {name} LIMIT {SUMMARY_CHECK_KEYS + 1}")
+    others = [list(row) for row in cur.fetchall() if list(row) != parsed["keys"]][:SUMMARY_CHECK_KEYS]
+    for keys in others:
+        params = list(parsed["template_params"])
+        for position, value in zip(parsed["key_positions"], keys):
+            params[position] = value
+        cur.execute(parsed["template"], params)
+        base_rows = cur.fetchall()
+        cur.execute(rewrite, keys)
+        if _canonical(base_rows) != _canonical(cur.fetchall()):
+            return False
+    return True
+
+
+def build_summary(target, cluster: dict) -> dict | None:
+    """
+    Materialize one candidate, check that the rewrite returns the same rows as the
+    original query (for its own key and a few others), time both and register it. Returns the registry entry or None.
+    """
+    parsed = cluster["parsed"]
+    name = f"{SUMMARY_PREFIX}{parsed['match_key'][:12]}"
+    with target.pool.connection() as conn:
+        cur = conn.cursor()
+        ensure_registry(cur)
+        markers = _markers(cur, target, parsed["tables"])
+        _materialize(conn, target, name, parsed["definition"], len(parsed["keys"]))
+
+        cur.execute(f"SELECT * FROM {name} LIMIT 0")
+        columns = [d[0] for d in cur.description]
+        columns = columns[:len(columns) - len(parsed["keys"])]
+        cur.fetchall()
+        rewrite = _rewrite_sql(parsed, name, columns, target.is_mariadb)
+        if rewrite:
+            base_ms, base_rows = _timed(cur, parsed["sql"], parsed["params"])
+            summary_ms, summary_rows = _timed(cur, rewrite, parsed["keys"])
+            if (_canonical(base_rows) != _canonical(summary_rows)
+                    or not _reproduces_other_keys(cur, parsed, name, rewrite)):
+                logger.warning(f"Summary {name} does not reproduce its query; dropped")
+                rewrite = None
+        if not rewrite:
+            cur.execute(f"DROP TABLE IF EXISTS {name}")
+            conn.commit()
+            return None
+
+        now = time.time()
+        ph = _ph(target)
+        entry = {
+            "name": name, "match_key": parsed["match_key"], "shape": parsed["shape"],
+            "definition_sql": parsed["definition"], "rewrite_sql": rewrite,
+            "key_columns": json.dumps(parsed["key_columns"]), "base_tables": json.dumps(parsed["tables"]),
+            "markers": json.dumps(markers), "query_count": cluster["count"],
+            "base_ms": base_ms, "summary_ms": summary_ms, "built_at": now, "refreshed_at": now,
+        }
+        cur.execute(f"DELETE FROM {REGISTRY_TABLE} WHERE name = {ph}", (name,))
+        cur.execute(
+            f"INSERT INTO {REGISTRY_TABLE} ({', '.join(entry)}) VALUES ({', '.join([ph] * len(entry))})",
+            tuple(entry.values()),
+        )
+        conn.commit()
+        cur.close()
+    logger.info(f"Built {name}: {base_ms:.2f} ms -> {summary_ms:.2f} ms ({cluster['count']} queries)")
+    return entry
+
+
+def build_summaries(database: str | None = None, min_queries: int = SUMMARY_MIN_QUERIES,
+                    dry_run: bool = False) -> list[dict]:
+    from src.db.registry import get_target
+
+    target = get_target(database)
+    built = []
+    for cluster in mine_candidates(target.name, min_queries):
+        parsed = cluster["parsed"]
+        if dry_run:
+            print(f"{cluster['count']:>6}  {parsed['definition']}")
+            continue
+        try:
+            entry = build_summary(target, cluster)
+        except Exception as e:
+            logger.warning(f"Could not build summary for {parsed['sql']!r}: {e}")
+            continue
+        if entry:
+            built.append(entry)
+    _forget(target.name)
+    return built
+
+
+def _registry_rows(cur) -> list[dict]:
+    try:
+        cur.execute(f"SELECT * FROM {REGISTRY_TABLE}")
+    except Exception:
+        return []
+    columns = [d[0] for d in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def refresh_summaries(database: str | None = None, force: bool = False) -> dict:
+    """
+    Rebuild summaries whose base tables changed since the last build, or that were
+    refreshed before a write this service ran (or all with `force`); unchanged ones
+    are only marked fresh. Returns {"rebuilt": n, "fresh": n}.
+    """
+    from src.db.registry import get_target
+
+    target = get_target(database)
+    counts = {"rebuilt": 0, "fresh": 0}
+    ph = _ph(target)
+    written_at = _writes.get(target.name, 0.0)
+    with target.pool.connection() as conn:
+        cur = conn.cursor()
+        for entry in _registry_rows(cur):
+            markers = _markers(cur, target, json.loads(entry["base_tables"] or "[]"))
+            now = time.time()
+            if (force or markers != json.loads(entry["markers"] or "{}")
+                    or float(entry["refreshed_at"] or 0) <= written_at):
+                _materialize(conn, target, entry["name"], entry["definition_sql"],
+                             len(json.loads(entry["key_columns"] or "[]")))
+                cur.execute(
+                    f"UPDATE {REGISTRY_TABLE} SET markers = {ph}, built_at = {ph}, refreshed_at = {ph} WHERE name = {ph}",
+                    (json.dumps(markers), now, now, entry["name"]),
+                )
+                counts["rebuilt"] += 1
+            else:
+                cur.execute(f"UPDATE {REGISTRY_TABLE} SET refreshed_at = {ph} WHERE name = {ph}", (now, entry["name"]))
+                counts["fresh"] += 1
+            conn.commit()
+        cur.close()
+    _forget(target.name)
+    logger.info(f"Summaries of '{target.name}': {counts['rebuilt']} rebuilt, {counts['fresh']} unchanged")
+    return counts
+
+
+def report(database: str | None = None):
+    from src.db.registry import get_target
+
+    target = get_target(database)
+    with target.pool.connection() as conn:
+        cur = conn.cursor()
+        rows = _registry_rows(cur)
+        cur.close()
+    print(f"{'summary':<22} {'queries':>7} {'base ms':>9} {'summary ms':>10} {'speedup':>8} {'age s':>7}")
+    for row in rows:
+        speedup = row["base_ms"] / row["summary_ms"] if row["summary_ms"] else float("inf")
+        print(f"{row['name']:<22} {row['query_count']:>7} {row['base_ms']:>9.2f} {row['summary_ms']:>10.2f} "
+              f"{speedup:>7.1f}x {time.time() - row['refreshed_at']:>7.0f}")
+
+
+# ---------------------------------------------------------------------------
+# Rewrite layer
+# ---------------------------------------------------------------------------
+
+_entries_by_database: dict = {}
+_entries_lock = threading.Lock()
+
+
+def _forget(database: str):
+    with _entries_lock:
+        _entries_by_database.pop(database, None)
+
+
+def _entries(target) -> dict:
+    """match_key -> registry entry for `target`, re-read every SUMMARY_RELOAD_SECONDS."""
+    with _entries_lock:
+        cached = _entries_by_database.get(target.name)
+        if cached and time.monotonic() - cached[0] < SUMMARY_RELOAD_SECONDS:
+            return cached[1]
+    entries = {}
+    try:
+        with target.pool.connection() as conn:
+            cur = conn.cursor()
+            entries = {row["match_key"]: row for row in _registry_rows(cur)}
+            cur.close()
+    except Exception as e:
+        logger.warning(f"Could not read summary registry of '{target.name}': {e}")
+    with _entries_lock:
+        _entries_by_database[target.name] = (time.monotonic(), entries)
+    return entries
+
+
+def mark_written(target):
+    """Stop answering from `target`'s summaries until their next refresh (after a write to it)."""
+    _writes.set(target.name, time.time())
+
+
+def rewrite_query(target, sql: str, params=None) -> tuple[str, list] | None:
+    """
+    (summary SQL, params) answering `sql` on `target` from a summary table that was
+    refreshed within SUMMARY_MAX_STALENESS seconds and after the last write through
+    mark_written, or None to run `sql` as is.
+    """
+    if not SUMMARY_REWRITE:
+        return None
+    entries = _entries(target)
+    if not entries:
+        return None
+    parsed = analyze(sql, params)
+    if not parsed:
+        return None
+    entry = entries.get(parsed["match_key"])
+    if not entry:
+        return None
+    refreshed_at = float(entry["refreshed_at"] or 0)
+    if time.time() - refreshed_at > SUMMARY_MAX_STALENESS or refreshed_at <= _writes.get(target.name, 0.0):
+        return None
+    logger.info(f"Answering query from {entry['name']}")
+    return entry["rewrite_sql"], parsed["keys"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and refresh summary tables from frequent verified queries")
+    parser.add_argument("command", choices=["build", "refresh", "report"])
+    parser.add_argument("--database", help="name from DATABASES (default database when omitted)")
+    parser.add_argument("--min-queries", type=int, default=SUMMARY_MIN_QUERIES)
+    parser.add_argument("--dry-run", action="store_true", help="build: only print the candidate summaries")
+    parser.add_argument("--force", action="store_true", help="refresh: rebuild even unchanged summaries")
+    parser.add_argument("--watch", type=float, help="refresh: repeat every WATCH seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.command == "build":
+        build_summaries(args.database, args.min_queries, args.dry_run)
+        if not args.dry_run:
+            report(args.database)
+    elif args.command == "refresh":
+        while True:
+            refresh_summaries(args.database, args.force)
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    else:
+        report(args.database)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,10 +7,35 @@ from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmb
 logger = logging.getLogger(__name__)
 config = load_env()
 
+_llm = None
+_fast_llm = None
+
+
 def get_llm():
+    """
+    Return the process-wide LLM client (shared by all databases), created on first use.
+    """
+    global _llm
+    if _llm is None:
+        _llm = _create_llm()
+    return _llm
+
+
+def get_fast_llm():
+    """
+    Return the client for FAST_LLM_MODEL (a smaller model of the same provider, used
+    by the router for simple questions), or None when it is not configured.
+    """
+    global _fast_llm
+    if _fast_llm is None and config.get("FAST_LLM_MODEL"):
+        _fast_llm = _create_llm(config["FAST_LLM_MODEL"])
+    return _fast_llm
+
+
+def _create_llm(model: str | None = None):
     """
     Factory function to return an LLM instance based on LLM_PROVIDER.
-    Supports 'gemini' (default) and 'ollama'.
+    Supports 'gemini' (default) and 'ollama'. `model` overrides the configured model.
     Uses lazy imports for optional providers to avoid hard dependencies.
     """
     provider = config.get("LLM_PROVIDER", "gemini").lower()
@@ -18,7 +43,7 @@ def get_llm():
     if provider == "gemini":
         # Default to gemini-flash-latest which is in the user's available list
         # and likely maps to the stable 1.5 flash model with quota
-        model_name = config.get("GEMINI_MODEL", "gemini-flash-latest")
+        model_name = model or config.get("GEMINI_MODEL", "gemini-flash-latest")
         logger.info(f"Using Gemini LLM: {model_name}")
         return ChatGoogleGenerativeAI(model=model_name, temperature=0)
 
@@ -30,7 +55,7 @@ def get_llm():
             raise ImportError("Please install 'langchain-ollama' to use Ollama provider.")
 
         base_url = config.get("OLLAMA_BASE_URL", "http://localhost:11434")
-        model = config.get("OLLAMA_MODEL", "mistral")
+        model = model or config.get("OLLAMA_MODEL", "mistral")
         logger.info(f"Using Ollama LLM: {model} at {base_url}")
         return ChatOllama(
             base_url=base_url,
@@ -41,13 +66,54 @@ def get_llm():
     else:
         raise ValueError(f"Unsupported LLM_PROVIDER: {provider}")
 
+def get_llm_identity(fast: bool = False) -> str:
+    """provider:model of the LLM returned by get_llm, or get_fast_llm with `fast` (part of prompt cache keys)."""
+    provider = config.get("LLM_PROVIDER", "gemini").lower()
+    if fast and config.get("FAST_LLM_MODEL"):
+        return f"{provider}:{config['FAST_LLM_MODEL']}"
+    if provider == "ollama":
+        return f"ollama:{config.get('OLLAMA_MODEL', 'mistral')}"
+    return f"{provider}:{config.get('GEMINI_MODEL', 'gemini-flash-latest')}"
+
+
+def get_embedding_provider():
+    """Return the embedding provider; EMBEDDING_PROVIDER overrides LLM_PROVIDER."""
+    return (config.get("EMBEDDING_PROVIDER") or config.get("LLM_PROVIDER", "gemini")).lower()
+
+
+def get_collection_name(base: str) -> str:
+    """
+    Return the vector collection name for the active embedding space.
+    Local embeddings live in their own namespace (suffixed with the dimension)
+    so they never mix with Gemini/Ollama vectors in the same collection.
+    """
+    if get_embedding_provider() == "local":
+        dim = int(config.get("LOCAL_EMBEDDING_DIM", 512))
+        return f"{base}__local{dim}"
+    return base
+
+
+_local_embeddings = None
+
+
 def get_embeddings():
     """
-    Factory function to return an Embeddings instance based on LLM_PROVIDER.
+    Factory function to return an Embeddings instance based on EMBEDDING_PROVIDER
+    (defaults to LLM_PROVIDER). Supports 'gemini', 'ollama' and 'local'.
     """
-    provider = config.get("LLM_PROVIDER", "gemini").lower()
+    global _local_embeddings
+    provider = get_embedding_provider()
 
-    if provider == "gemini":
+    if provider == "local":
+        if _local_embeddings is None:
+            from src.llm.local_embeddings import LocalHashEmbeddings
+
+            dim = int(config.get("LOCAL_EMBEDDING_DIM", 512))
+            logger.info(f"Using local hashed embeddings (dim={dim})")
+            _local_embeddings = LocalHashEmbeddings(dim=dim)
+        return _local_embeddings
+
+    elif provider == "gemini":
         model_name = config.get("GEMINI_EMBEDDING_MODEL", "models/text-embedding-004")
         logger.info(f"Using Gemini Embeddings: {model_name}")
         return GoogleGenerativeAIEmbeddings(model=model_name)
@@ -68,4 +134,40 @@ def get_embeddings():
         )
 
     else:
-        raise ValueError(f"Unsupported LLM_PROVIDER: {provider}")
+        raise ValueError(f"Unsupported EMBEDDING_PROVIDER: {provider}")
+
+
+def get_embedding_space() -> str:
+    """Identifies the active embedding model; vectors from different spaces never mix."""
+    provider = get_embedding_provider()
+    if provider == "local":
+        return f"local{config.get('LOCAL_EMBEDDING_DIM', 512)}"
+    if provider == "ollama":
+        return f"ollama:{config.get('OLLAMA_EMBEDDING_MODEL', 'nomic-embed-text')}"
+    return f"{provider}:{config.get('GEMINI_EMBEDDING_MODEL', 'models/text-embedding-004')}"
+
+
+def embed_queries(texts: list[str]) -> list[list[float]]:
+    """
+    Embed several query strings in one call (one round trip for remote providers).
+    Vectors match embed_query's: Gemini is asked for its query-side task type.
+    Vectors are kept in the shared cache, so only texts no worker has embedded yet are sent.
+    """
+    from src.utils.shared_cache import get_shared_cache, make_key
+
+    shared = get_shared_cache()
+    namespace = f"embed:{get_embedding_space()}"
+    keys = [make_key(text) for text in texts]
+    vectors = [shared.get(namespace, key) for key in keys]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        embedder = get_embeddings()
+        batch = [texts[i] for i in missing]
+        if isinstance(embedder, GoogleGenerativeAIEmbeddings):
+            computed = embedder.embed_documents(batch, task_type="RETRIEVAL_QUERY")
+        else:
+            computed = embedder.embed_documents(batch)
+        for i, vector in zip(missing, computed):
+            vectors[i] = list(vector)
+            shared.set(namespace, keys[i], vectors[i])
+    return vectors
@@ -0,0 +1,78 @@
+import re
+import math
+import zlib
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:_[a-z0-9]+)*")
+
+
+@lru_cache(maxsize=262144)
+def _bucket(feature: str, dim: int) -> tuple[int, float]:
+    """Map a feature to a (column, sign) pair with a process-stable hash."""
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, (1.0 if h & 0x80000000 else -1.0)
+
+
+def _features(text: str, ngram_min: int, ngram_max: int) -> Counter:
+    """
+    Extract hashed features from a text:
+    - whole words and identifiers (e.g. tenant_workloads)
+    - identifier parts (tenant, workloads)
+    - word bigrams
+    - character n-grams of each word, padded with boundary markers
+    """
+    feats = Counter()
+    words = _WORD_RE.findall(text.lower())
+    for i, word in enumerate(words):
+        feats["w:" + word] += 1
+        if "_" in word:
+            for part in word.split("_"):
+                feats["w:" + part] += 1
+        if i:
+            feats["b:" + words[i - 1] + " " + word] += 1
+        padded = f"<{word}>"
+        for n in range(ngram_min, ngram_max + 1):
+            for j in range(len(padded) - n + 1):
+                feats["c:" + padded[j:j + n]] += 1
+    return feats
+
+
+class LocalHashEmbeddings(Embeddings):
+    """
+    In-process embeddings using signed feature hashing of words, bigrams and
+    character n-grams with sublinear TF weighting, projected into a fixed
+    dimension and L2-normalised. Needs no network or model download.
+    """
+
+    def __init__(self, dim: int = 512, ngram_min: int = 3, ngram_max: int = 5):
+        self.dim = dim
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        """Embed many texts into a (len(texts), dim) float32 matrix."""
+        rows, cols, vals = [], [], []
+        for i, text in enumerate(texts):
+            for feature, count in _features(text, self.ngram_min, self.ngram_max).items():
+                col, sign = _bucket(feature, self.dim)
+                rows.append(i)
+                cols.append(col)
+                vals.append(sign * (1.0 + math.log(count)))
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if rows:
+            np.add.at(matrix, (np.asarray(rows), np.asarray(cols)), np.asarray(vals, dtype=np.float32))
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_batch(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_batch([text])[0].tolist()
@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import threading
+
+from src.utils.env_loader import load_env
+from src.utils.shared_cache import SharedCache, make_key
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+PROMPT_CACHE = config.get("PROMPT_CACHE", "true") == "true"
+PROMPT_CACHE_PATH = config.get("PROMPT_CACHE_PATH", "./prompt_cache.sqlite")
+PROMPT_CACHE_MAX_MB = float(config.get("PROMPT_CACHE_MAX_MB", 64))
+PROMPT_CACHE_TTL = float(config.get("PROMPT_CACHE_TTL", 7 * 24 * 3600))
+
+_META = "prompt-meta"
+
+
+class PromptCache:
+    """
+    Exact prompt -> reply cache for the (temperature 0) SQL generation call, in its
+    own SQLite file so it survives restarts and has its own size budget. Replies are
+    keyed by (provider, model, full prompt text) and kept per database; when the
+    schema or the prompt template of a database changes, its entries are dropped.
+    A reply whose query is rated as rejected is dropped by its key (see `key`).
+    """
+
+    def __init__(self, path: str | None = PROMPT_CACHE_PATH, max_mb: float = PROMPT_CACHE_MAX_MB,
+                 ttl: float = PROMPT_CACHE_TTL):
+        self.store = SharedCache(path, max_bytes=int(max_mb * 1024 * 1024), default_ttl=ttl)
+        self._synced = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _namespace(database: str | None) -> str:
+        return f"prompt:{database or ''}"
+
+    @staticmethod
+    def key(prompt: str, fast: bool = False) -> str:
+        """The entry key of `prompt` for the main (or `fast`) model, as logged with the query."""
+        from src.llm.factory import get_llm_identity
+
+        return make_key(get_llm_identity(fast), prompt)
+
+    def sync(self, database: str | None, schema: str, template: str):
+        """Drop the database's replies if its schema text or prompt template changed since they were stored."""
+        generation = hashlib.sha256(f"{template}\0{schema}".encode("utf-8")).hexdigest()
+        with self._lock:
+            if self._synced.get(database) == generation:
+                return
+            stored = self.store.get(_META, database or "")
+            if stored is not None and stored != generation:
+                self.store.clear(self._namespace(database))
+                logger.info(f"Schema or prompt template of '{database}' changed; cleared its prompt cache")
+            if stored != generation:
+                self.store.set(_META, database or "", generation, ttl=10 * 365 * 24 * 3600)
+            self._synced[database] = generation
+
+    def get(self, database: str | None, prompt: str, fast: bool = False) -> str | None:
+        """The cached reply of the main model, or of the fast model with `fast`."""
+        return self.store.get(self._namespace(database), self.key(prompt, fast))
+
+    def set(self, database: str | None, prompt: str, reply: str, fast: bool = False):
+        self.store.set(self._namespace(database), self.key(prompt, fast), reply)
+
+    def discard(self, database: str | None, key: str):
+        """Drop the reply stored under `key` (so the prompt goes to the model next time)."""
+        self.store.delete(self._namespace(database), key)
+
+
+_prompt_cache = None
+
+
+def get_prompt_cache() -> PromptCache:
+    """Process-wide prompt cache (a no-op one when PROMPT_CACHE=false)."""
+    global _prompt_cache
+    if _prompt_cache is None:
+        _prompt_cache = PromptCache(PROMPT_CACHE_PATH if PROMPT_CACHE else None)
+    return _prompt_cache
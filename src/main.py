@@ -1,11 +1,18 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
+import time
 import logging
-from src.db.connection import get_db_schema_description
-from src.agents.sql_agent import get_sql_agent, execute_sql_query
-from src.db.feedback import init_feedback_db, log_query, update_rating
+from src.db.registry import get_target, list_databases, UnknownDatabaseError
+from src.db.feedback import init_feedback_db, log_query, update_rating, get_logged_query
+from src.db.cursors import open_result, fetch_page, InvalidTokenError
+from src.db.read_engine import ReadOnlyQueryError
+from src.db.sql_template import render_sql
+from src.db.cache_indexer import start_indexer
+from src.utils.warmup import start_warmup, progress
+from src.utils.admission import (get_admission, get_request_admission, admit_request, admitter, deadline_from,
+                                 Overloaded, DeadlineExceeded, DEADLINE_HEADER)
 
 # Configure logging
 logging.basicConfig(
@@ -17,9 +24,9 @@ app = FastAPI(title="AI SQL Agent (Gemini + LangChain + FastAPI)")
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Load schema once at startup
+# Load the default database's schema at startup; other databases load on first use
 try:
-    schema_description = get_db_schema_description()
+    get_target().schema_description()
 except Exception as e:
     logging.error(f"Could not load DB schema: {e}")
     raise HTTPException(status_code=500, detail=str(e))
@@ -28,8 +35,11 @@ except Exception as e:
 # Initialize feedback DB
 init_feedback_db()
 
-# Initialize SQL agent with the (possibly empty) schema description
-generate_sql = get_sql_agent(schema_description)
+# Index verified queries into the semantic cache in the background
+start_indexer()
+
+# Warm pools, embeddings and vector collections in the background (see GET /ready)
+start_warmup()
 
 class FeedbackRequest(BaseModel):
     query_id: str
@@ -38,36 +48,121 @@ class FeedbackRequest(BaseModel):
 class QueryRequest(BaseModel):
     question: str
     execute: bool = True
+    database: str | None = None  # name from DATABASES; the default database when omitted
+    page_size: int | None = None  # rows per page (PAGE_SIZE when omitted)
+    bypass_cache: bool = False  # regenerate instead of replaying a cached LLM reply
 
 @app.get("/")
 async def read_index():
     return FileResponse("static/index.html")
 
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 while warm-up runs, 200 once it finished (or failed, or is disabled)."""
+    status = progress()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+def metrics():
+    """Admission control: in-flight LLM calls and /query requests, queue depths and shed counts."""
+    return {"admission": get_admission().stats(), "requests": get_request_admission().stats()}
+
+@app.get("/databases")
+def get_databases():
+    return {"databases": list_databases()}
+
+async def admitted(request: QueryRequest, timeout: str | None = Header(default=None, alias=DEADLINE_HEADER)):
+    """
+    Entry admission for /query, awaited on the event loop so queued requests hold no
+    threadpool thread. Yields the client's deadline (from DEADLINE_HEADER; queued
+    work past it is dropped) and the entry slot's release, which the LLM admitter
+    calls before generation waits for an LLM slot.
+    """
+    deadline = deadline_from(timeout)
+    try:
+        release = await admit_request(request.execute, deadline)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=f"Server busy: {e}",
+                            headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    try:
+        yield deadline, release
+    finally:
+        release()
+
 @app.post("/query")
-def query_db(request: QueryRequest):
+def query_db(request: QueryRequest, admission: tuple = Depends(admitted)):
+    deadline, release_entry = admission
+    try:
+        target = get_target(request.database)
+    except UnknownDatabaseError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
     try:
         print("Question:", request.question)
-        sql = generate_sql(request.question)
+        generate_sql = target.agent()
+        started = time.perf_counter()
+        sql = generate_sql(request.question, bypass_cache=request.bypass_cache,
+                           admit=admitter(request.execute, deadline, release_entry))
+        latency_ms = (time.perf_counter() - started) * 1000
         print("🧠 Generated SQL:\n", sql)
 
+        if sql.get("tier") == "local":
+            # no SQL, but logged (and rateable by its query_id) so the router's report
+            # shows the local tier's latency and accuracy
+            query_id = log_query(request.question, None, target.name, "local", latency_ms)
+            return {
+                "database": target.name,
+                "sql": None,
+                "answer": sql["error"],
+                "intent": sql.get("intent"),
+                "result": None,
+                "query_id": query_id,
+                "tier": "local"
+            }
+
         if "error" in sql:
                     raise HTTPException(status_code=400, detail=sql["error"])
 
         if not request.execute:
             return {"sql": sql}
 
+        if deadline is not None and time.time() >= deadline:
+            raise DeadlineExceeded("Request deadline passed before execution")
+
+        # Cached templates come back as `?` SQL plus bound params;
+        # log and display the rendered statement, execute the prepared one
+        params = sql.get("params")
+        display_sql = render_sql(sql['sql'], params)
 
         # Log the query
-        query_id = log_query(request.question, sql['sql'])
+        query_id = log_query(request.question, display_sql, target.name, sql.get("tier"), latency_ms,
+                             sql.get("prompt_key"), sql['sql'], params)
 
-        result = execute_sql_query(sql['sql'])
+        # First page; a next_token is returned when more rows follow
+        page = open_result(query_id, target, sql['sql'], params, request.page_size)
         return {
-            "sql": sql['sql'],
-            "result": result,
+            "database": target.name,
+            "sql": display_sql,
+            "params": params,
+            "result": page["result"],
+            "next_token": page["next_token"],
             "query_id": query_id,
-            "cached": sql.get("cached", False)
+            "cached": sql.get("cached", False),
+            "llm_cached": sql.get("llm_cached", False),
+            "tier": sql.get("tier")
         }
 
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=f"Server busy: {e}",
+                            headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ReadOnlyQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = str(e)
         if "429" in error_msg or "ResourceExhausted" in error_msg:
@@ -77,6 +172,24 @@ def query_db(request: QueryRequest):
              )
         raise HTTPException(status_code=500, detail=error_msg)
 
+@app.get("/query/{query_id}/page")
+def query_page(query_id: str, token: str, page_size: int | None = None):
+    def load_query(qid):
+        logged = get_logged_query(qid)
+        if not logged:
+            raise HTTPException(status_code=404, detail=f"Unknown query: {qid}")
+        return logged
+
+    try:
+        page = fetch_page(query_id, token, page_size, load_query)
+    except InvalidTokenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"query_id": query_id, **page}
+
 @app.post("/feedback")
 def submit_feedback(request: FeedbackRequest):
     try:
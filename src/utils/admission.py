@@ -0,0 +1,322 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from contextlib import contextmanager
+
+from src.utils.env_loader import load_env
+
+config = load_env()
+
+ADMISSION = config.get("ADMISSION", "true") == "true"
+ADMISSION_MAX_IN_FLIGHT = int(config.get("ADMISSION_MAX_IN_FLIGHT", 8))
+ADMISSION_MAX_REQUESTS = int(config.get("ADMISSION_MAX_REQUESTS", 8))
+ADMISSION_MAX_QUEUE = int(config.get("ADMISSION_MAX_QUEUE", 24))
+ADMISSION_MAX_WAIT = float(config.get("ADMISSION_MAX_WAIT", 10))
+
+# Request header carrying the client's remaining time budget in seconds
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Lower runs first: dry runs (execute=false) before full requests, fast-tier before main-tier generation
+PRIORITY_DRY_RUN_FAST, PRIORITY_DRY_RUN, PRIORITY_FAST, PRIORITY_MAIN = 0, 1, 2, 3
+
+
+class Overloaded(Exception):
+    """No slot within the queue limits; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The client's deadline passed before its work could start."""
+
+
+class _Waiter:
+    """A queued caller: a thread waiting on `event`, or a task awaiting `future` on `loop`."""
+    __slots__ = ("priority", "seq", "event", "loop", "future", "granted", "shed", "done")
+
+    def __init__(self, priority: int, seq: int, loop=None):
+        self.priority, self.seq = priority, seq
+        self.loop = loop
+        self.future = loop.create_future() if loop else None
+        self.event = None if loop else threading.Event()
+        self.granted = self.shed = self.done = False
+
+    def wake(self):
+        """Settle the waiter (granted or shed) and wake its thread or task (caller holds the lock)."""
+        self.done = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionController:
+    """
+    Bounds how much work of one kind runs at once (LLM calls, or /query requests at
+    entry). Callers beyond `max_in_flight` wait in a priority queue (lowest priority value first, then arrival order) for at most
+    `max_wait` seconds or until their deadline. When `max_queue` callers already wait,
+    a new caller either displaces the lowest-priority waiter or is shed at once, so
+    overload turns into fast 503s instead of a growing backlog. Threads wait with
+    acquire(); coroutines with acquire_async(), which holds no thread while queued.
+
+    The controller is per process; with several workers each enforces its own limit.
+    """
+
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, max_queue: int = ADMISSION_MAX_QUEUE,
+                 max_wait: float = ADMISSION_MAX_WAIT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._queue = []  # heap of _Waiter; shed / timed-out ones are skipped lazily
+        self._queued = 0
+        self._in_flight = 0
+        self._seq = itertools.count()
+        self._service_s = 1.0  # moving average of slot hold time, for Retry-After
+        self._stats = {"admitted": 0, "queued_total": 0, "shed_queue_full": 0, "shed_displaced": 0,
+                       "shed_timeout": 0, "shed_deadline": 0}
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained (at least 1)."""
+        backlog = (self._queued + self._in_flight) / max(1, self.max_in_flight)
+        return max(1, round(backlog * self._service_s))
+
+    def _grant_next(self):
+        """Hand a freed slot to the best live waiter (caller holds the lock)."""
+        while self._queue and self._in_flight < self.max_in_flight:
+            waiter = heapq.heappop(self._queue)
+            if waiter.done:
+                continue
+            self._queued -= 1
+            self._in_flight += 1
+            self._stats["admitted"] += 1
+            waiter.granted = True
+            waiter.wake()
+
+    def _shed_worst(self, priority: int) -> bool:
+        """Drop the lowest-priority waiter if it ranks below `priority` (caller holds the lock)."""
+        live = [w for w in self._queue if not w.done]
+        if not live:
+            return False
+        worst = max(live)
+        if worst.priority <= priority:
+            return False
+        worst.shed = True
+        self._queued -= 1
+        self._stats["shed_displaced"] += 1
+        worst.wake()
+        return True
+
+    def acquire(self, priority: int = PRIORITY_MAIN, deadline: float | None = None, wait: bool = True):
+        """
+        Take a slot, waiting in the queue if needed. Raises Overloaded when the queue
+        is full or the wait exceeds max_wait, DeadlineExceeded when `deadline` (epoch
+        seconds) passes first. With wait=False, raises Overloaded (uncounted) instead
+        of queueing.
+        """
+        waiter = self._enter(priority, deadline, wait)
+        if waiter is not None:
+            waiter.event.wait(self._timeout(deadline))
+            self._settle(waiter, deadline)
+
+    async def acquire_async(self, priority: int = PRIORITY_MAIN, deadline: float | None = None):
+        """acquire() for the event loop: queued callers wait without holding a thread."""
+        waiter = self._enter(priority, deadline, True, asyncio.get_running_loop())
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait({waiter.future}, timeout=self._timeout(deadline))
+        except BaseException:
+            # cancelled (e.g. the client went away): give back a slot granted meanwhile
+            with self._lock:
+                granted = waiter.granted
+                if not waiter.done:
+                    waiter.done = True
+                    self._queued -= 1
+            if granted:
+                self.release()
+            raise
+        self._settle(waiter, deadline)
+
+    def _timeout(self, deadline: float | None) -> float:
+        timeout = self.max_wait
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.time())
+        return max(0.0, timeout)
+
+    def _enter(self, priority: int, deadline: float | None, wait: bool, loop=None) -> _Waiter | None:
+        """Take a free slot (returns None) or queue a waiter for one."""
+        with self._lock:
+            if deadline is not None and time.time() >= deadline:
+                self._stats["shed_deadline"] += 1
+                raise DeadlineExceeded("Request deadline passed before admission")
+            if self._in_flight < self.max_in_flight and not self._queued:
+                self._in_flight += 1
+                self._stats["admitted"] += 1
+                return None
+            if not wait:
+                raise Overloaded("No free slot", self.retry_after())
+            if self._queued >= self.max_queue and not self._shed_worst(priority):
+                self._stats["shed_queue_full"] += 1
+                raise Overloaded("Too many requests waiting", self.retry_after())
+            waiter = _Waiter(priority, next(self._seq), loop)
+            heapq.heappush(self._queue, waiter)
+            self._queued += 1
+            self._stats["queued_total"] += 1
+            return waiter
+
+    def _settle(self, waiter: _Waiter, deadline: float | None):
+        """After the wait: return if the slot was granted, else leave the queue and raise."""
+        with self._lock:
+            if waiter.granted:
+                return
+            if waiter.shed:
+                raise Overloaded("Displaced by a higher-priority request", self.retry_after())
+            # timed out: leave the queue (the heap entry is skipped once popped)
+            waiter.done = True
+            self._queued -= 1
+            if deadline is not None and time.time() >= deadline:
+                self._stats["shed_deadline"] += 1
+                raise DeadlineExceeded("Request deadline passed while queued")
+            self._stats["shed_timeout"] += 1
+            raise Overloaded("Timed out waiting for a free slot", self.retry_after())
+
+    def release(self, held_s: float | None = None):
+        with self._lock:
+            self._in_flight -= 1
+            if held_s is not None:
+                self._service_s = 0.8 * self._service_s + 0.2 * held_s
+            self._grant_next()
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_MAIN, deadline: float | None = None, wait: bool = True):
+        self.acquire(priority, deadline, wait)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": ADMISSION,
+                "in_flight": self._in_flight,
+                "queue_depth": self._queued,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "max_wait_s": self.max_wait,
+                "avg_service_s": round(self._service_s, 3),
+                **self._stats,
+            }
+
+
+_admission = None
+_request_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    """Process-wide controller for LLM calls."""
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = AdmissionController()
+        return _admission
+
+
+def get_request_admission() -> AdmissionController:
+    """Process-wide controller for /query requests, taken at entry (see admit_request)."""
+    global _request_admission
+    with _admission_lock:
+        if _request_admission is None:
+            _request_admission = AdmissionController(max_in_flight=ADMISSION_MAX_REQUESTS)
+        return _request_admission
+
+
+async def admit_request(execute: bool, deadline: float | None):
+    """
+    Take an entry slot for one /query request on the event loop, before the request
+    occupies a threadpool thread, so at most ADMISSION_MAX_REQUESTS requests embed,
+    retrieve and look up the caches at once. Dry runs (execute=false) queue first.
+    Returns the callable that gives the slot back; it may be called more than once,
+    and admitter calls it when the request moves on to wait for an LLM slot.
+    Raises Overloaded / DeadlineExceeded.
+    """
+    if not ADMISSION:
+        if deadline is not None and time.time() >= deadline:
+            raise DeadlineExceeded("Request deadline passed")
+        return lambda: None
+    controller = get_request_admission()
+    await controller.acquire_async(PRIORITY_MAIN if execute else PRIORITY_DRY_RUN, deadline)
+    started = time.perf_counter()
+    held = [True]
+    lock = threading.Lock()
+
+    def release():
+        with lock:
+            if not held[0]:
+                return
+            held[0] = False
+        controller.release(time.perf_counter() - started)
+
+    return release
+
+
+def deadline_from(timeout: str | None) -> float | None:
+    """Absolute deadline (epoch seconds) from a DEADLINE_HEADER value; None when missing or invalid."""
+    try:
+        seconds = float(timeout)
+    except (TypeError, ValueError):
+        return None
+    return time.time() + seconds if seconds > 0 else None
+
+
+def admitter(execute: bool, deadline: float | None, release_entry=None):
+    """
+    The `admit(tier, wait=True)` callback process_question runs its LLM calls under:
+    a slot from the process-wide controller, prioritised by `execute` and the tier.
+    `release_entry` (from admit_request) gives the request's entry slot back before
+    it waits for the LLM slot, or once a wait=False call got one, so slow generations
+    never keep cache hits and dry runs out at entry. A no-op when ADMISSION=false
+    (the deadline is still honoured).
+    """
+    release_entry = release_entry or (lambda: None)
+
+    @contextmanager
+    def llm_slot(priority: int, wait: bool):
+        if wait:
+            release_entry()
+        with get_admission().slot(priority, deadline, wait):
+            release_entry()
+            yield
+
+    def admit(tier: str, wait: bool = True):
+        if not ADMISSION:
+            return _deadline_only(deadline)
+        fast = tier == "fast"
+        if execute:
+            priority = PRIORITY_FAST if fast else PRIORITY_MAIN
+        else:
+            priority = PRIORITY_DRY_RUN_FAST if fast else PRIORITY_DRY_RUN
+        return llm_slot(priority, wait)
+
+    return admit
+
+
+@contextmanager
+def _deadline_only(deadline: float | None):
+    if deadline is not None and time.time() >= deadline:
+        raise DeadlineExceeded("Request deadline passed")
+    yield
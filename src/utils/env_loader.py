@@ -15,6 +15,81 @@ def load_env():
         "LLM_PROVIDER": os.getenv("LLM_PROVIDER", "gemini").lower(),
         "OLLAMA_BASE_URL": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
         "OLLAMA_MODEL": os.getenv("OLLAMA_MODEL", "mistral"),
-        "OLLAMA_EMBEDDING_MODEL": os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+        "OLLAMA_EMBEDDING_MODEL": os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text"),
+        "EMBEDDING_PROVIDER": os.getenv("EMBEDDING_PROVIDER", os.getenv("LLM_PROVIDER", "gemini")).lower(),
+        "LOCAL_EMBEDDING_DIM": os.getenv("LOCAL_EMBEDDING_DIM", "512"),
+        "VECTOR_BACKEND": os.getenv("VECTOR_BACKEND", "chroma").lower(),
+        "SEMANTIC_CACHE_MAX_SIZE": os.getenv("SEMANTIC_CACHE_MAX_SIZE", "1000"),
+        "SEMANTIC_CACHE_EVICTION": os.getenv("SEMANTIC_CACHE_EVICTION", "lfu").lower(),
+        "SEMANTIC_CACHE_MERGE_DISTANCE": os.getenv("SEMANTIC_CACHE_MERGE_DISTANCE", "0.05"),
+        "SEMANTIC_CACHE_HIGH_WATER": os.getenv("SEMANTIC_CACHE_HIGH_WATER", "1.1"),
+        "SEMANTIC_CACHE_HIT_HALF_LIFE": os.getenv("SEMANTIC_CACHE_HIT_HALF_LIFE", "604800"),
+        "SEMANTIC_CACHE_ADMISSION_WINDOW": os.getenv("SEMANTIC_CACHE_ADMISSION_WINDOW", "86400"),
+        "CACHE_HIT_FLUSH_INTERVAL": os.getenv("CACHE_HIT_FLUSH_INTERVAL", "30"),
+        "HYBRID_FAST_PATH": os.getenv("HYBRID_FAST_PATH", "true").lower(),
+        "LEXICAL_MIN_SCORE": os.getenv("LEXICAL_MIN_SCORE", "3.0"),
+        "LEXICAL_DECISIVE_RATIO": os.getenv("LEXICAL_DECISIVE_RATIO", "2.0"),
+        "RRF_K": os.getenv("RRF_K", "60"),
+        "DATABASES": os.getenv("DATABASES"),
+        "DEFAULT_DATABASE": os.getenv("DEFAULT_DATABASE", "default"),
+        "MAX_LOADED_DATABASES": os.getenv("MAX_LOADED_DATABASES", "8"),
+        "DATABASE_IDLE_SECONDS": os.getenv("DATABASE_IDLE_SECONDS", "1800"),
+        "DB_POOL_SIZE": os.getenv("DB_POOL_SIZE", "5"),
+        "RESULT_CACHE_SIZE": os.getenv("RESULT_CACHE_SIZE", "256"),
+        "RESULT_CACHE_TTL": os.getenv("RESULT_CACHE_TTL", "60"),
+        "PAGE_SIZE": os.getenv("PAGE_SIZE", "200"),
+        "MAX_PAGE_SIZE": os.getenv("MAX_PAGE_SIZE", "5000"),
+        "CURSOR_IDLE_SECONDS": os.getenv("CURSOR_IDLE_SECONDS", "300"),
+        "MAX_OPEN_CURSORS": os.getenv("MAX_OPEN_CURSORS", "32"),
+        "PAGINATION_SECRET": os.getenv("PAGINATION_SECRET"),
+        "PROFILE_SAMPLE_ROWS": os.getenv("PROFILE_SAMPLE_ROWS", "20000"),
+        "PROFILE_TOP_K": os.getenv("PROFILE_TOP_K", "5"),
+        "PROFILE_LOW_CARDINALITY": os.getenv("PROFILE_LOW_CARDINALITY", "20"),
+        "PROFILE_CACHE_PATH": os.getenv("PROFILE_CACHE_PATH", "./profile_cache"),
+        "PIPELINE_WORKERS": os.getenv("PIPELINE_WORKERS", "8"),
+        "SPECULATIVE_LLM": os.getenv("SPECULATIVE_LLM", "false").lower(),
+        "SPECULATIVE_WORKERS": os.getenv("SPECULATIVE_WORKERS", "2"),
+        "SHARED_CACHE": os.getenv("SHARED_CACHE", "true").lower(),
+        "SHARED_CACHE_PATH": os.getenv("SHARED_CACHE_PATH", "./shared_cache.sqlite"),
+        "SHARED_CACHE_MAX_MB": os.getenv("SHARED_CACHE_MAX_MB", "256"),
+        "SHARED_CACHE_TTL": os.getenv("SHARED_CACHE_TTL", "3600"),
+        "SUMMARY_MIN_QUERIES": os.getenv("SUMMARY_MIN_QUERIES", "3"),
+        "SUMMARY_MAX_STALENESS": os.getenv("SUMMARY_MAX_STALENESS", "900"),
+        "SUMMARY_REWRITE": os.getenv("SUMMARY_REWRITE", "true").lower(),
+        "SUMMARY_CHECK_KEYS": os.getenv("SUMMARY_CHECK_KEYS", "3"),
+        "SUMMARY_RELOAD_SECONDS": os.getenv("SUMMARY_RELOAD_SECONDS", "60"),
+        "WARMUP": os.getenv("WARMUP", "true").lower(),
+        "WARMUP_DATABASES": os.getenv("WARMUP_DATABASES", ""),
+        "WARMUP_TOP_QUESTIONS": os.getenv("WARMUP_TOP_QUESTIONS", "100"),
+        "WARMUP_EXECUTE": os.getenv("WARMUP_EXECUTE", "false").lower(),
+        "WARMUP_EXECUTE_TOP": os.getenv("WARMUP_EXECUTE_TOP", "20"),
+        "PROMPT_CACHE": os.getenv("PROMPT_CACHE", "true").lower(),
+        "PROMPT_CACHE_PATH": os.getenv("PROMPT_CACHE_PATH", "./prompt_cache.sqlite"),
+        "PROMPT_CACHE_MAX_MB": os.getenv("PROMPT_CACHE_MAX_MB", "64"),
+        "PROMPT_CACHE_TTL": os.getenv("PROMPT_CACHE_TTL", "604800"),
+        "FAST_LLM_MODEL": os.getenv("FAST_LLM_MODEL"),
+        "ROUTER": os.getenv("ROUTER", "true").lower(),
+        "ROUTER_LOCAL_MIN_SIMILARITY": os.getenv("ROUTER_LOCAL_MIN_SIMILARITY", "0.55"),
+        "ROUTER_LOCAL_MARGIN": os.getenv("ROUTER_LOCAL_MARGIN", "0.1"),
+        "ROUTER_FAST_MAX_TABLES": os.getenv("ROUTER_FAST_MAX_TABLES", "1"),
+        "CACHE_INDEXER": os.getenv("CACHE_INDEXER", "true").lower(),
+        "CACHE_INDEX_BATCH": os.getenv("CACHE_INDEX_BATCH", "64"),
+        "CACHE_INDEX_INTERVAL": os.getenv("CACHE_INDEX_INTERVAL", "10"),
+        "CACHE_INDEX_MAX_ATTEMPTS": os.getenv("CACHE_INDEX_MAX_ATTEMPTS", "8"),
+        "CACHE_INDEX_BACKOFF": os.getenv("CACHE_INDEX_BACKOFF", "2"),
+        "CACHE_INDEX_MAX_BACKOFF": os.getenv("CACHE_INDEX_MAX_BACKOFF", "900"),
+        "VECTOR_DISTANCE": os.getenv("VECTOR_DISTANCE", "cosine").lower(),
+        "HNSW_M": os.getenv("HNSW_M", "16"),
+        "HNSW_CONSTRUCTION_EF": os.getenv("HNSW_CONSTRUCTION_EF", "200"),
+        "HNSW_SEARCH_EF": os.getenv("HNSW_SEARCH_EF", "100"),
+        "ADMISSION": os.getenv("ADMISSION", "true").lower(),
+        "ADMISSION_MAX_IN_FLIGHT": os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"),
+        "ADMISSION_MAX_REQUESTS": os.getenv("ADMISSION_MAX_REQUESTS", "8"),
+        "ADMISSION_MAX_QUEUE": os.getenv("ADMISSION_MAX_QUEUE", "24"),
+        "ADMISSION_MAX_WAIT": os.getenv("ADMISSION_MAX_WAIT", "10"),
+        "READ_ENGINE": os.getenv("READ_ENGINE", "true").lower(),
+        "READ_MMAP_MB": os.getenv("READ_MMAP_MB", "256"),
+        "READ_CACHE_MB": os.getenv("READ_CACHE_MB", "16"),
+        "READ_STATEMENT_CACHE": os.getenv("READ_STATEMENT_CACHE", "256")
     }
     return config
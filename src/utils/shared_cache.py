@@ -0,0 +1,270 @@
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from src.utils.env_loader import load_env
+from src.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+SHARED_CACHE_ENABLED = config.get("SHARED_CACHE", "true") == "true"
+SHARED_CACHE_PATH = config.get("SHARED_CACHE_PATH", "./shared_cache.sqlite")
+SHARED_CACHE_MAX_BYTES = int(float(config.get("SHARED_CACHE_MAX_MB", 256)) * 1024 * 1024)
+SHARED_CACHE_TTL = float(config.get("SHARED_CACHE_TTL", 3600))
+
+_LOCK_SECONDS = 30.0   # a get_or_compute owner that died releases its key after this
+_POLL_SECONDS = 0.02
+_TOUCH_SECONDS = 5.0   # last_access is refreshed at most this often, so most reads stay read-only
+_EVICT_EVERY = 64      # writes between size checks
+_MISSING = object()
+
+
+def make_key(*parts) -> str:
+    """Stable key for tuples of strings/numbers (e.g. (sql, params))."""
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+class SharedCache:
+    """
+    Key-value cache in a WAL-mode SQLite file, shared by every worker process on
+    the host. Entries live in namespaces, expire after a TTL and are evicted least
+    recently used first once the file holds more than `max_bytes` of values.
+    get_or_compute lets one worker compute a missing key while the others wait.
+
+    Cache errors never reach callers: reads miss and writes are skipped.
+    """
+
+    def __init__(self, path: str | None = SHARED_CACHE_PATH, max_bytes: int = SHARED_CACHE_MAX_BYTES,
+                 default_ttl: float = SHARED_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread and process (uvicorn workers may be forked)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_access ON cache_entries (last_access)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_locks (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, namespace: str, key: str, default=None):
+        if not self.enabled:
+            return default
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT value, expires_at, last_access FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            now = time.time()
+            if row is None or row[1] < now:
+                return default
+            if now - row[2] > _TOUCH_SECONDS:
+                conn.execute("UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                             (now, namespace, key))
+            return pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError) as e:
+            logger.warning(f"Shared cache read failed ({namespace}): {e}")
+            return default
+
+    def set(self, namespace: str, key: str, value, ttl: float | None = None):
+        if not self.enabled:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            now = time.time()
+            self._conn().execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, blob, len(blob), now + ttl, now),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self.evict()
+        except (sqlite3.Error, pickle.PicklingError, TypeError) as e:
+            logger.warning(f"Shared cache write failed ({namespace}): {e}")
+
+    def delete(self, namespace: str, key: str):
+        if not self.enabled:
+            return
+        try:
+            self._conn().execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache delete failed ({namespace}): {e}")
+
+    def clear(self, namespace: str | None = None):
+        """Drop one namespace (every worker sees it at once), or everything."""
+        if not self.enabled:
+            return
+        try:
+            if namespace is None:
+                self._conn().execute("DELETE FROM cache_entries")
+            else:
+                self._conn().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache clear failed ({namespace}): {e}")
+
+    def _try_lock(self, conn, namespace: str, key: str, owner: str) -> bool:
+        now = time.time()
+        # single statement: insert, or take over a lock whose owner timed out
+        cur = conn.execute(
+            "INSERT INTO cache_locks (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE cache_locks.expires_at < ?",
+            (namespace, key, owner, now + _LOCK_SECONDS, now),
+        )
+        return cur.rowcount == 1
+
+    def get_or_compute(self, namespace: str, key: str, compute, ttl: float | None = None):
+        """
+        Return the cached value, or compute and store it. Concurrent callers for
+        the same key (in any worker) wait for the first one instead of computing
+        it again; after _LOCK_SECONDS they stop waiting and compute themselves.
+        """
+        value = self.get(namespace, key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if not self.enabled:
+            return compute()
+
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        deadline = time.monotonic() + _LOCK_SECONDS
+        locked = False
+        try:
+            conn = self._conn()
+            while not (locked := self._try_lock(conn, namespace, key, owner)):
+                time.sleep(_POLL_SECONDS)
+                value = self.get(namespace, key, _MISSING)
+                if value is not _MISSING:
+                    return value
+                if time.monotonic() > deadline:
+                    break
+            # the previous owner may have finished between our get and the lock
+            value = self.get(namespace, key, _MISSING)
+            if value is not _MISSING:
+                return value
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache lock failed ({namespace}): {e}")
+
+        try:
+            value = compute()
+            self.set(namespace, key, value, ttl)
+            return value
+        finally:
+            if locked:
+                try:
+                    conn.execute("DELETE FROM cache_locks WHERE namespace = ? AND key = ? AND owner = ?",
+                                 (namespace, key, owner))
+                except sqlite3.Error:
+                    pass
+
+    def evict(self) -> int:
+        """Delete expired entries, then the least recently used until values fit in 90% of max_bytes."""
+        if not self.enabled:
+            return 0
+        try:
+            conn = self._conn()
+            removed = conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),)).rowcount
+            total = conn.execute("SELECT TOTAL(size) FROM cache_entries").fetchone()[0]
+            if total > self.max_bytes:
+                removed += conn.execute("""
+                    DELETE FROM cache_entries WHERE rowid IN (
+                        SELECT rid FROM (
+                            SELECT rowid AS rid, SUM(size) OVER (ORDER BY last_access DESC, rowid DESC) AS kept
+                            FROM cache_entries
+                        ) WHERE kept > ?
+                    )
+                """, (int(self.max_bytes * 0.9),)).rowcount
+            if removed:
+                logger.info(f"Evicted {removed} shared cache entries")
+            return removed
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache eviction failed: {e}")
+            return 0
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """The process's handle on the host-wide cache (a no-op cache when SHARED_CACHE=false)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SharedCache(SHARED_CACHE_PATH if SHARED_CACHE_ENABLED else None)
+        return _shared
+
+
+class SharedTTLCache:
+    """
+    TTLCache-compatible view of one shared-cache namespace, for per-database
+    result caches. Keys may be any tuple make_key accepts. Falls back to an
+    in-process TTLCache when the shared cache is disabled; with it enabled there
+    is no in-process copy, so clear() (e.g. after a write) reaches every worker.
+    """
+
+    def __init__(self, namespace: str, maxsize: int = 256, ttl: float = 60.0):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.shared = get_shared_cache()
+        self.local = None if self.shared.enabled else TTLCache(maxsize, ttl)
+
+    def get(self, key, default=None):
+        if self.local is not None:
+            return self.local.get(key, default)
+        return self.shared.get(self.namespace, make_key(key), default)
+
+    def set(self, key, value):
+        if self.local is not None:
+            return self.local.set(key, value)
+        if self.ttl > 0:
+            self.shared.set(self.namespace, make_key(key), value, self.ttl)
+
+    def pop(self, key, default=None):
+        if self.local is not None:
+            return self.local.pop(key, default)
+        value = self.shared.get(self.namespace, make_key(key), default)
+        self.shared.delete(self.namespace, make_key(key))
+        return value
+
+    def clear(self):
+        if self.local is not None:
+            return self.local.clear()
+        self.shared.clear(self.namespace)
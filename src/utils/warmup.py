@@ -0,0 +1,188 @@
+import time
+import logging
+import threading
+
+from src.utils.env_loader import load_env
+
+logger = logging.getLogger(__name__)
+config = load_env()
+
+WARMUP = config.get("WARMUP", "true") == "true"
+WARMUP_DATABASES = [d.strip() for d in (config.get("WARMUP_DATABASES") or "").split(",") if d.strip()]
+WARMUP_TOP_QUESTIONS = int(config.get("WARMUP_TOP_QUESTIONS", 100))
+WARMUP_EXECUTE = config.get("WARMUP_EXECUTE", "false") == "true"
+WARMUP_EXECUTE_TOP = int(config.get("WARMUP_EXECUTE_TOP", 20))
+_EMBED_BATCH = 64
+
+STEPS = ("connections", "questions", "embeddings", "collections", "retrieval", "results")
+
+_progress = {"state": "disabled" if not WARMUP else "pending", "started_at": None, "finished_at": None,
+             "error": None, "steps": {step: {"status": "pending", "done": 0, "total": 0} for step in STEPS}}
+_progress_lock = threading.Lock()
+_thread = None
+
+
+def _update(step: str, **fields):
+    with _progress_lock:
+        _progress["steps"][step].update(fields)
+
+
+def _advance(step: str, n: int = 1):
+    with _progress_lock:
+        _progress["steps"][step]["done"] += n
+
+
+def progress() -> dict:
+    """Snapshot of warm-up progress for the readiness endpoint."""
+    with _progress_lock:
+        snapshot = {**_progress, "steps": {k: dict(v) for k, v in _progress["steps"].items()}}
+    snapshot["ready"] = snapshot["state"] in ("done", "failed", "disabled")
+    return snapshot
+
+
+def _history(top_n: int) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """
+    (questions, hot_sql) from query_history: verified questions plus the top_n most
+    frequent ones as (question, database), and the most frequent verified SQL as
+    (sql, database).
+    """
+    from src.db.feedback import get_feedback_connection, FEEDBACK_DB_TYPE
+
+    db_col = "`database`" if FEEDBACK_DB_TYPE == "mariadb" else "database"
+    conn = get_feedback_connection()
+    cur = conn.cursor()
+    cur.execute(f"SELECT DISTINCT natural_language_query, {db_col} FROM query_history WHERE status = 'verified'")
+    questions = [(row[0], row[1]) for row in cur.fetchall()]
+    cur.execute(
+        f"SELECT natural_language_query, {db_col}, COUNT(*) AS n FROM query_history "
+        f"GROUP BY natural_language_query, {db_col} ORDER BY n DESC LIMIT {int(top_n)}"
+    )
+    questions += [(row[0], row[1]) for row in cur.fetchall()]
+    cur.execute(
+        f"SELECT generated_sql, {db_col}, COUNT(*) AS n FROM query_history "
+        f"WHERE status = 'verified' AND generated_sql IS NOT NULL "
+        f"GROUP BY generated_sql, {db_col} ORDER BY n DESC LIMIT {int(WARMUP_EXECUTE_TOP)}"
+    )
+    hot_sql = [(row[0], row[1]) for row in cur.fetchall()]
+    conn.close()
+    return list(dict.fromkeys(questions)), hot_sql
+
+
+def run_warmup():
+    """
+    Warm the caches a cold worker would otherwise fill on its first requests:
+    connection pools and schemas, question embeddings (kept in the shared cache),
+    the semantic-cache and chunk collections, retrieval results and, with
+    WARMUP_EXECUTE, the result cache for the hottest verified SQL.
+    """
+    from src.db.registry import get_target, list_databases, DEFAULT_DATABASE
+    from src.db.sql_template import mask_question
+    from src.llm.factory import embed_queries
+    from src.utils.shared_cache import get_shared_cache
+    from src.vector.store import get_vector_store
+    from src.vector.lexical import get_lexical_index
+    from src.vector.retriever import retrieve_context
+    from src.agents.sql_agent import execute_sql_query
+
+    configured = [d["name"] for d in list_databases()]
+    databases = [d for d in WARMUP_DATABASES if d in configured] or [DEFAULT_DATABASE]
+
+    # 1. connection pools and schema descriptions
+    _update("connections", status="running", total=len(databases))
+    targets = {}
+    for name in databases:
+        target = get_target(name)
+        opened = target.pool.prefill()
+        if target.read_pool is not target.pool:
+            opened += target.read_pool.prefill()
+        target.schema_description()
+        targets[name] = target
+        logger.info(f"Warm-up: opened {opened} connections for '{name}'")
+        _advance("connections")
+    _update("connections", status="done")
+
+    # 2. questions worth warming
+    _update("questions", status="running")
+    questions, hot_sql = _history(WARMUP_TOP_QUESTIONS)
+    questions = [(q, db or DEFAULT_DATABASE) for q, db in questions if q and (db or DEFAULT_DATABASE) in targets]
+    _update("questions", status="done", total=len(questions), done=len(questions))
+
+    # 3. embeddings of the raw and masked questions, batched
+    texts = list(dict.fromkeys(t for q, _ in questions for t in (q, mask_question(q))))
+    if get_shared_cache().enabled:
+        _update("embeddings", status="running", total=len(texts))
+        for start in range(0, len(texts), _EMBED_BATCH):
+            embed_queries(texts[start:start + _EMBED_BATCH])
+            _advance("embeddings", len(texts[start:start + _EMBED_BATCH]))
+        _update("embeddings", status="done")
+    else:
+        _update("embeddings", status="skipped", total=len(texts))
+
+    # 4. vector collections: one query each loads the index segments into memory
+    probe = embed_queries([questions[0][0] if questions else "warm up"])[0]
+    collections = [c for t in targets.values() for c in (t.cache_collection, t.rag_collection)]
+    _update("collections", status="running", total=len(collections))
+    for name in collections:
+        store = get_vector_store(name)
+        if store.count() > 0:
+            store.query([probe], k=1)
+        get_lexical_index(store.name)
+        _advance("collections")
+    _update("collections", status="done")
+
+    # 5. retrieval results for the same questions (shared cache)
+    if get_shared_cache().enabled:
+        _update("retrieval", status="running", total=len(questions))
+        for question, database in questions:
+            retrieve_context(question, collection=targets[database].rag_collection)
+            _advance("retrieval")
+        _update("retrieval", status="done")
+    else:
+        _update("retrieval", status="skipped", total=len(questions))
+
+    # 6. result cache for the hottest verified SQL (optional: it runs real queries)
+    selects = [(sql, db or DEFAULT_DATABASE) for sql, db in hot_sql
+               if sql.lstrip().lower().startswith("select") and (db or DEFAULT_DATABASE) in targets]
+    if WARMUP_EXECUTE:
+        _update("results", status="running", total=len(selects))
+        for sql, database in selects:
+            try:
+                execute_sql_query(sql, database=database)
+            except Exception as e:
+                logger.warning(f"Warm-up query failed on '{database}': {e}")
+            _advance("results")
+        _update("results", status="done")
+    else:
+        _update("results", status="skipped", total=len(selects))
+
+
+def _run():
+    with _progress_lock:
+        _progress.update(state="running", started_at=time.time())
+    t0 = time.perf_counter()
+    try:
+        run_warmup()
+        state, error = "done", None
+        logger.info(f"Warm-up finished in {time.perf_counter() - t0:.1f}s")
+    except Exception as e:
+        state, error = "failed", str(e)
+        logger.error(f"Warm-up failed: {e}")
+    with _progress_lock:
+        _progress.update(state=state, error=error, finished_at=time.time())
+        if state == "failed":
+            for step in _progress["steps"].values():
+                if step["status"] in ("pending", "running"):
+                    step["status"] = "aborted"
+
+
+def start_warmup() -> bool:
+    """Start warm-up in a background thread (once per process); False when disabled or already started."""
+    global _thread
+    if not WARMUP:
+        return False
+    with _progress_lock:
+        if _thread is not None:
+            return False
+        _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+    _thread.start()
+    return True
@@ -1,12 +1,199 @@
 from chromadb import PersistentClient
 from chromadb.config import Settings
+from filelock import FileLock
 import os
+import logging
+import threading
+
+from src.vector.store import VectorStore, VectorHit, VECTOR_DISTANCE, HNSW_M, HNSW_CONSTRUCTION_EF, HNSW_SEARCH_EF
+
+logger = logging.getLogger(__name__)
+
+_BACKUP_SUFFIX = "__premigration"
+_COPY_BATCH = 1000
+_checked = set()  # collections whose index settings were verified by this process
+_checked_lock = threading.Lock()
+
+
+def _db_path() -> str:
+    return os.getenv("CHROMA_DB_PATH", "./chroma_db")
 
 
 def get_chroma_client():
     """Return a Chromadb client.
     Uses a persistent directory defined by CHROMA_DB_PATH env variable or defaults to './chroma_db'.
     """
-    db_path = os.getenv("CHROMA_DB_PATH", "./chroma_db")
-    client = PersistentClient(path=db_path, settings=Settings(allow_reset=True))
+    client = PersistentClient(path=_db_path(), settings=Settings(allow_reset=True))
     return client
+
+
+def _settings_lock() -> FileLock:
+    """
+    Cross-process lock (`<CHROMA_DB_PATH>.lock`) held while a collection's settings are
+    checked and migrated, so workers sharing the directory never migrate one concurrently.
+    """
+    return FileLock(os.path.normpath(_db_path()) + ".lock")
+
+
+def _chroma_where(where: dict | None) -> dict | None:
+    """Chroma needs an explicit $and for filters on more than one key."""
+    if not where or len(where) == 1:
+        return where or None
+    return {"$and": [{key: value} for key, value in where.items()]}
+
+
+def _wanted_hnsw() -> dict:
+    return {"space": VECTOR_DISTANCE, "M": HNSW_M, "construction_ef": HNSW_CONSTRUCTION_EF,
+            "search_ef": HNSW_SEARCH_EF}
+
+
+def _hnsw_metadata() -> dict:
+    """Index settings as collection metadata (understood by every chromadb release)."""
+    return {f"hnsw:{key}": value for key, value in _wanted_hnsw().items()}
+
+
+def current_hnsw(collection) -> dict:
+    """Index settings of an existing collection (chromadb >= 1.0 configuration, else its metadata)."""
+    configuration = getattr(collection, "configuration", None)
+    hnsw = configuration.get("hnsw") if isinstance(configuration, dict) else None
+    if hnsw:
+        return {"space": hnsw["space"], "M": hnsw["max_neighbors"], "construction_ef": hnsw["ef_construction"],
+                "search_ef": hnsw["ef_search"]}
+    meta = getattr(collection, "metadata", None) or {}
+    # chromadb's defaults for collections created without settings
+    return {"space": meta.get("hnsw:space", "l2"), "M": meta.get("hnsw:M", 16),
+            "construction_ef": meta.get("hnsw:construction_ef", 100), "search_ef": meta.get("hnsw:search_ef", 10)}
+
+
+def _copy_collection(source, target) -> int:
+    """Copy every entry, with its stored embedding, from `source` into `target`."""
+    copied, offset = 0, 0
+    while True:
+        batch = source.get(include=["embeddings", "documents", "metadatas"], limit=_COPY_BATCH, offset=offset)
+        if not batch["ids"]:
+            return copied
+        target.upsert(ids=batch["ids"], embeddings=batch["embeddings"], documents=batch["documents"],
+                      metadatas=[m or None for m in batch["metadatas"]])
+        copied += len(batch["ids"])
+        offset += _COPY_BATCH
+
+
+def _migrate(client, name: str, collection=None):
+    """
+    Rebuild collection `name` with the configured index settings. The old collection
+    is renamed to `<name>__premigration` first and dropped once everything was
+    copied, so an interrupted migration resumes on the next open.
+    """
+    backup_name = name + _BACKUP_SUFFIX
+    if collection is not None:
+        collection.modify(name=backup_name)
+    backup = client.get_collection(backup_name)
+    target = client.get_or_create_collection(name=name, metadata=_hnsw_metadata())
+    copied = _copy_collection(backup, target)
+    client.delete_collection(backup_name)
+    logger.info(f"Migrated Chroma collection '{name}' ({copied} vectors) to {_wanted_hnsw()}")
+    return target
+
+
+def _exists(client, name: str) -> bool:
+    try:
+        client.get_collection(name)
+        return True
+    except Exception as e:
+        # ValueError before chromadb 1.0, NotFoundError after
+        if "does not exist" in str(e).lower() or "not found" in str(e).lower():
+            return False
+        raise
+
+
+def open_collection(client, name: str):
+    """
+    Return collection `name`, created with the configured distance and HNSW settings.
+    An existing collection built with another distance, M or construction ef is
+    migrated; a different search ef is changed in place where chromadb allows it.
+    Other processes wait on the settings lock meanwhile, then find the collection migrated.
+    """
+    with _checked_lock:
+        if name in _checked:
+            return client.get_or_create_collection(name=name, metadata=_hnsw_metadata())
+        with _settings_lock():
+            if _exists(client, name + _BACKUP_SUFFIX):
+                logger.warning(f"Resuming interrupted migration of Chroma collection '{name}'")
+                collection = _migrate(client, name)
+            else:
+                collection = client.get_or_create_collection(name=name, metadata=_hnsw_metadata())
+
+            current, wanted = current_hnsw(collection), _wanted_hnsw()
+            if any(current[key] != wanted[key] for key in ("space", "M", "construction_ef")):
+                logger.warning(f"Chroma collection '{name}' was built with {current}; migrating")
+                collection = _migrate(client, name, collection)
+            elif current["search_ef"] != wanted["search_ef"]:
+                try:
+                    collection.modify(configuration={"hnsw": {"ef_search": wanted["search_ef"]}})
+                except TypeError:
+                    # chromadb < 1.0 cannot change index settings in place
+                    collection = _migrate(client, name, collection)
+        _checked.add(name)
+        return collection
+
+
+class ChromaVectorStore(VectorStore):
+    """
+    VectorStore over a Chromadb collection (or anything exposing the same collection API).
+    Collections are opened with the VECTOR_DISTANCE / HNSW_* settings (see open_collection).
+    """
+
+    def __init__(self, name: str, collection=None):
+        super().__init__(name)
+        self.collection = collection if collection is not None else open_collection(get_chroma_client(), name)
+        # chroma reports squared L2; for unit vectors that is twice the cosine distance
+        self._distance_scale = 0.5 if current_hnsw(self.collection)["space"] == "l2" else 1.0
+
+    def _where(self, where: dict | None):
+        return _chroma_where(where)
+
+    def upsert(self, ids, vectors, documents=None, metadatas=None):
+        if not ids:
+            return
+        self.collection.upsert(ids=list(ids), embeddings=list(vectors), documents=documents, metadatas=metadatas)
+
+    def query(self, vectors, k=4, where=None):
+        if not vectors:
+            return []
+        results = self.collection.query(
+            query_embeddings=list(vectors),
+            n_results=k,
+            where=self._where(where),
+            include=["documents", "metadatas", "distances"],
+        )
+        hits = []
+        for i, ids in enumerate(results["ids"]):
+            hits.append([
+                VectorHit(
+                    id=id_,
+                    document=results["documents"][i][j] if results.get("documents") else None,
+                    metadata=(results["metadatas"][i][j] or {}) if results.get("metadatas") else {},
+                    distance=results["distances"][i][j] * self._distance_scale,
+                )
+                for j, id_ in enumerate(ids)
+            ])
+        return hits
+
+    def get(self, ids=None, where=None):
+        results = self.collection.get(ids=ids, where=self._where(where), include=["documents", "metadatas"])
+        return [
+            VectorHit(id=id_, document=results["documents"][i], metadata=results["metadatas"][i] or {})
+            for i, id_ in enumerate(results["ids"])
+        ]
+
+    def update_metadata(self, ids, metadatas):
+        if ids:
+            self.collection.update(ids=list(ids), metadatas=list(metadatas))
+
+    def delete(self, ids=None, where=None):
+        if (ids is None and not where) or (ids is not None and not ids):
+            return
+        self.collection.delete(ids=ids, where=self._where(where))
+
+    def count(self):
+        return self.collection.count()
@@ -6,56 +6,75 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-import uuid
+import hashlib
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from src.llm.factory import get_embeddings
-# Chromadb does not use PointStruct; embeddings will be stored directly
 
-from src.vector.chroma_con import get_chroma_client
-from src.db.connection import get_db_schema_description, fetch_sample_rows
+from src.vector.store import get_vector_store
+from src.vector.lexical import build_lexical_index
+from src.vector.retriever import invalidate_context
+from src.db.profiling import profile_tables
+from src.db.registry import get_target
 
-def ingest():
-    # Initialize Chromadb client and collection
-    client = get_chroma_client()
-    collection = client.get_or_create_collection(name="pmc_chunks")
+def ingest(database: str | None = None):
+    """Embed schema and column profiles of `database` (the default one when None) into its chunk collection."""
+    target = get_target(database)
 
-    # Gather schema and sample data
-    schema_text = get_db_schema_description()
-    sample_text = fetch_sample_rows()
+    # Initialize the vector store (backend selected by VECTOR_BACKEND)
+    store = get_vector_store(target.rag_collection)
 
-    documents = [
-        "SCHEMA:\n" + schema_text,
-        "SAMPLES:\n" + sample_text,
-    ]
+    # Gather schema and column statistics (only changed tables are re-profiled)
+    schema_text = target.schema_description()
+    with target.pool.connection() as conn:
+        profiles = profile_tables(conn, target.type, cache_name=target.name)
+
+    # (metadata, text): the schema, then one document per table profile
+    documents = [({"source": "schema"}, "SCHEMA:\n" + schema_text)]
+    documents += [({"source": "profile", "table": table}, profile) for table, profile in profiles.items()]
 
     # Split documents into chunks
     splitter = RecursiveCharacterTextSplitter(chunk_size=700, chunk_overlap=100)
     chunks = []
-    for doc in documents:
-        chunks.extend(splitter.split_text(doc))
+    chunk_meta = []
+    for meta, doc in documents:
+        for chunk in splitter.split_text(doc):
+            if chunk not in chunks:
+                chunks.append(chunk)
+                chunk_meta.append(meta)
 
     embedder = get_embeddings()
 
-    # Prepare data for Chromadb
-    ids = []
-    embeddings = []
-    metadatas = []
-    docs = []
-    for chunk in chunks:
-        ids.append(str(uuid.uuid4()))
-        embeddings.append(embedder.embed_query(chunk))
-        metadatas.append({"content": chunk})
-        docs.append(chunk)
-
-    # Add to collection
-    collection.add(
+    # Content-addressed ids: re-running ingest upserts instead of duplicating chunks
+    ids = [hashlib.sha1(chunk.encode("utf-8")).hexdigest() for chunk in chunks]
+    # Embed all chunks in one batch
+    embeddings = embedder.embed_documents(chunks)
+    metadatas = [{"content": chunk, **meta} for chunk, meta in zip(chunks, chunk_meta)]
+
+    # Drop superseded chunks: the old schema text and every earlier profile of each table.
+    # What is left after that belongs to no current table (dropped tables, or earlier
+    # ingest formats such as the uuid-keyed SAMPLES: chunks), so it goes too.
+    store.delete(where={"source": "schema"})
+    for table in profiles:
+        store.delete(where={"table": table})
+    leftover = [hit.id for hit in store.get()]
+    if leftover:
+        store.delete(ids=leftover)
+        print(f"Deleted {len(leftover)} chunks of dropped tables or earlier ingest formats")
+
+    # Batched upsert into the store
+    store.upsert(
         ids=ids,
-        embeddings=embeddings,
+        vectors=embeddings,
         metadatas=metadatas,
-        documents=docs
+        documents=list(chunks)
     )
 
-    print("Database → Chromadb ingestion completed successfully!")
+    # BM25 index over the live chunks just written (never what store.get() may still hold)
+    build_lexical_index(store.name, ids, chunks)
+    invalidate_context(target.rag_collection)
+
+    print(f"Database '{target.name}' → vector store ingestion completed successfully!")
 
 if __name__ == "__main__":
-    ingest()
+    # optional argument: name of a database from DATABASES
+    ingest(sys.argv[1] if len(sys.argv) > 1 else None)
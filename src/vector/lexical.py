@@ -0,0 +1,118 @@
+import os
+import re
+import json
+import math
+import logging
+import threading
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:_[a-z0-9]+)*")
+
+
+def _stem(token: str) -> str:
+    """Very light plural folding so 'workunits' matches 'workunit'."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase words; identifiers like tenant_workloads also yield their parts."""
+    tokens = []
+    for word in _WORD_RE.findall(text.lower()):
+        tokens.append(_stem(word))
+        if "_" in word:
+            tokens.extend(_stem(part) for part in word.split("_") if part)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a small corpus, with an inverted index of term -> [(doc, tf)]."""
+
+    def __init__(self, ids: list[str], documents: list[str], k1: float = 1.5, b: float = 0.75):
+        self.ids = ids
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.doc_len = []
+        for i, doc in enumerate(documents):
+            counts = Counter(tokenize(doc))
+            self.doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((i, tf))
+        self.avg_len = (sum(self.doc_len) / len(self.doc_len)) if self.doc_len else 0.0
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 4) -> list[tuple[str, float, str]]:
+        """Return up to k (id, score, document) tuples, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc] / (self.avg_len or 1.0))
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.ids[doc], score, self.documents[doc]) for doc, score in best]
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "documents": self.documents, "k1": self.k1, "b": self.b}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["ids"], data["documents"], k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+
+
+def _index_path(name: str) -> str:
+    return os.path.join(os.getenv("LEXICAL_INDEX_PATH", "./lexical_index"), f"{name}.json")
+
+
+def build_lexical_index(name: str, ids: list[str], documents: list[str]) -> BM25Index:
+    """Build and persist the BM25 index for collection `name`."""
+    index = BM25Index(ids, documents)
+    index.save(_index_path(name))
+    logger.info(f"Built BM25 index '{name}' over {len(ids)} chunks")
+    return index
+
+
+_indexes: dict[str, tuple[float, BM25Index]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(name: str) -> BM25Index | None:
+    """Return the persisted BM25 index for `name`, reloading it when the file changes."""
+    path = _index_path(name)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _indexes_lock:
+        cached = _indexes.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = BM25Index.load(path)
+        _indexes[name] = (mtime, index)
+        return index
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[str]:
+    """Fuse ranked id lists: score(id) = sum(1 / (k + rank)). Best first."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, start=1):
+            scores[id_] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
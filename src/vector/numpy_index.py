@@ -0,0 +1,283 @@
+import os
+import json
+import logging
+import threading
+
+import numpy as np
+
+from src.vector.store import VectorStore, VectorHit
+
+logger = logging.getLogger(__name__)
+
+
+def _matches(metadata: dict, where: dict | None) -> bool:
+    """Equality filter on metadata, e.g. {"table": "orders", "status": "verified"}."""
+    if not where:
+        return True
+    return all(metadata.get(key) == value for key, value in where.items())
+
+
+def _as_list(value):
+    """Chroma accepts a bare dict/str for single-item calls; normalise to a list."""
+    if value is None or isinstance(value, list):
+        return value
+    return [value]
+
+
+class NumpyCollection:
+    """
+    In-memory vector collection exposing the subset of the Chromadb collection
+    API used by this project (add/upsert/update/get/delete/query/count).
+
+    Vectors are L2-normalised and held in one contiguous float32 matrix, so a
+    batch of top-k cosine queries is a single matmul. The matrix is persisted
+    as `<name>.npy` (loaded memory-mapped) with a `<name>.meta.json` sidecar
+    holding ids, documents and metadatas. Distances are cosine distances
+    (0 = identical, 2 = opposite).
+    """
+
+    def __init__(self, name: str, directory: str):
+        self.name = name
+        self.directory = directory
+        self._vec_path = os.path.join(directory, f"{name}.npy")
+        self._meta_path = os.path.join(directory, f"{name}.meta.json")
+        self._lock = threading.RLock()
+        self._mtime = None
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._ids: list[str] = []
+        self._documents: list[str | None] = []
+        self._metadatas: list[dict] = []
+        self._index: dict[str, int] = {}
+        self._load()
+
+    # ---------- persistence ----------
+
+    def _load(self):
+        """(Re)load from disk if the files changed since the last load."""
+        try:
+            mtime = os.path.getmtime(self._meta_path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self._vectors = np.load(self._vec_path, mmap_mode="r")
+        self._ids = meta["ids"]
+        self._documents = meta["documents"]
+        self._metadatas = meta["metadatas"]
+        self._index = {id_: i for i, id_ in enumerate(self._ids)}
+        self._mtime = mtime
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # np.save appends ".npy" to names without it, so keep the suffix on the temp file
+        tmp_vec = self._vec_path[:-4] + ".tmp.npy"
+        tmp_meta = self._meta_path + ".tmp"
+        np.save(tmp_vec, np.ascontiguousarray(self._vectors, dtype=np.float32))
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "documents": self._documents, "metadatas": self._metadatas}, f)
+        # Vectors first: readers reload when the metadata file changes
+        os.replace(tmp_vec, self._vec_path)
+        os.replace(tmp_meta, self._meta_path)
+        self._mtime = os.path.getmtime(self._meta_path)
+
+    @staticmethod
+    def _normalise(embeddings) -> np.ndarray:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    # ---------- writes ----------
+
+    def upsert(self, ids, embeddings=None, metadatas=None, documents=None):
+        ids = _as_list(ids)
+        metadatas = _as_list(metadatas) or [{} for _ in ids]
+        documents = _as_list(documents) or [None for _ in ids]
+        with self._lock:
+            self._load()
+            vectors = np.array(self._vectors, dtype=np.float32)  # writable in-memory copy
+            new_rows = []
+            new_vectors = self._normalise(embeddings) if embeddings is not None else None
+            for i, id_ in enumerate(ids):
+                row = self._index.get(id_)
+                if row is None:
+                    if new_vectors is None:
+                        raise ValueError(f"Embedding required to add new id {id_}")
+                    self._index[id_] = len(self._ids)  # rows appended by this call are already counted
+                    self._ids.append(id_)
+                    self._documents.append(documents[i])
+                    self._metadatas.append(metadatas[i] or {})
+                    new_rows.append(new_vectors[i])
+                    continue
+                if new_vectors is not None:
+                    vectors[row] = new_vectors[i]
+                if documents[i] is not None:
+                    self._documents[row] = documents[i]
+                if metadatas[i]:
+                    self._metadatas[row] = {**self._metadatas[row], **metadatas[i]}
+            if new_rows:
+                added = np.vstack(new_rows)
+                vectors = added if vectors.size == 0 else np.vstack([vectors, added])
+            self._vectors = vectors
+            self._save()
+
+    def add(self, ids, embeddings=None, metadatas=None, documents=None):
+        self.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    def update(self, ids, embeddings=None, metadatas=None, documents=None):
+        ids = _as_list(ids)
+        with self._lock:
+            self._load()
+            known = [i for i, id_ in enumerate(ids) if id_ in self._index]
+            if not known:
+                return
+            pick = lambda values: [values[i] for i in known] if values is not None else None
+            self.upsert(
+                ids=pick(ids),
+                embeddings=pick(list(embeddings)) if embeddings is not None else None,
+                metadatas=pick(_as_list(metadatas)),
+                documents=pick(_as_list(documents)),
+            )
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            self._load()
+            if ids is None and not where:
+                return
+            # ids and where both narrow the selection, as in get() and chromadb
+            candidates = self._ids if ids is None else [id_ for id_ in _as_list(ids) if id_ in self._index]
+            drop = {id_ for id_ in candidates if not where or _matches(self._metadatas[self._index[id_]], where)}
+            if not drop:
+                return
+            keep = [i for i, id_ in enumerate(self._ids) if id_ not in drop]
+            self._vectors = np.array(self._vectors[keep], dtype=np.float32)
+            self._ids = [self._ids[i] for i in keep]
+            self._documents = [self._documents[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._index = {id_: i for i, id_ in enumerate(self._ids)}
+            self._save()
+
+    # ---------- reads ----------
+
+    def count(self) -> int:
+        self._load()
+        return len(self._ids)
+
+    def get(self, ids=None, where=None, include=("metadatas", "documents"), limit=None):
+        with self._lock:
+            self._load()
+            if ids is not None:
+                rows = [self._index[id_] for id_ in _as_list(ids) if id_ in self._index]
+            else:
+                rows = range(len(self._ids))
+            rows = [r for r in rows if _matches(self._metadatas[r], where)][:limit]
+            result = {"ids": [self._ids[r] for r in rows]}
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[r] for r in rows]
+            if "documents" in include:
+                result["documents"] = [self._documents[r] for r in rows]
+            if "embeddings" in include:
+                result["embeddings"] = np.asarray(self._vectors[rows]).tolist()
+            return result
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("metadatas", "documents", "distances")):
+        """Top-k cosine search for a batch of query vectors with one matmul."""
+        with self._lock:
+            self._load()
+            vectors, ids, documents, metadatas = self._vectors, self._ids, self._documents, self._metadatas
+
+        queries = self._normalise(query_embeddings)
+        result = {"ids": [], "distances": [], "metadatas": [], "documents": []}
+        if not ids:
+            for key in result:
+                result[key] = [[] for _ in range(len(queries))]
+            return result
+
+        sims = queries @ vectors.T  # (n_queries, n_vectors)
+        if where:
+            mask = np.array([_matches(meta, where) for meta in metadatas])
+            sims[:, ~mask] = -np.inf
+            k = min(n_results, int(mask.sum()))
+        else:
+            k = min(n_results, len(ids))
+
+        if k == 0:
+            top = np.zeros((len(queries), 0), dtype=np.int64)
+        elif k < len(ids):
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(len(ids)), (len(queries), 1))
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+        for rows, row_sims in zip(top, top_sims):
+            result["ids"].append([ids[r] for r in rows])
+            result["distances"].append([float(1.0 - s) for s in row_sims])
+            result["metadatas"].append([metadatas[r] for r in rows])
+            result["documents"].append([documents[r] for r in rows])
+        return {key: value for key, value in result.items() if key == "ids" or key in include}
+
+
+_collections: dict[str, NumpyCollection] = {}
+_collections_lock = threading.Lock()
+
+
+def get_numpy_collection(name: str) -> NumpyCollection:
+    """Return the process-wide NumpyCollection for `name` (loaded once, reused)."""
+    directory = os.getenv("NUMPY_INDEX_PATH", "./numpy_index")
+    with _collections_lock:
+        collection = _collections.get(name)
+        if collection is None:
+            collection = NumpyCollection(name, directory)
+            _collections[name] = collection
+            logger.info(f"Loaded NumPy vector collection '{name}' ({collection.count()} vectors)")
+        return collection
+
+
+class NumpyVectorStore(VectorStore):
+    """VectorStore over the process-wide NumpyCollection of the same name."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.collection = get_numpy_collection(name)
+
+    def upsert(self, ids, vectors, documents=None, metadatas=None):
+        if ids:
+            self.collection.upsert(ids=list(ids), embeddings=vectors, documents=documents, metadatas=metadatas)
+
+    def query(self, vectors, k=4, where=None):
+        if not len(vectors):
+            return []
+        results = self.collection.query(vectors, n_results=k, where=where)
+        return [
+            [
+                VectorHit(id=id_, document=results["documents"][i][j],
+                          metadata=results["metadatas"][i][j], distance=results["distances"][i][j])
+                for j, id_ in enumerate(ids)
+            ]
+            for i, ids in enumerate(results["ids"])
+        ]
+
+    def get(self, ids=None, where=None):
+        results = self.collection.get(ids=ids, where=where)
+        return [
+            VectorHit(id=id_, document=results["documents"][i], metadata=results["metadatas"][i])
+            for i, id_ in enumerate(results["ids"])
+        ]
+
+    def update_metadata(self, ids, metadatas):
+        if ids:
+            self.collection.update(ids=list(ids), metadatas=list(metadatas))
+
+    def delete(self, ids=None, where=None):
+        if ids or where:
+            self.collection.delete(ids=ids, where=where)
+
+    def count(self):
+        return self.collection.count()
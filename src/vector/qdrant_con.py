@@ -1,13 +1,243 @@
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, models
 import os
+import uuid
+import logging
+import threading
 from dotenv import load_dotenv
 
+from src.vector.store import VectorStore, VectorHit, VECTOR_DISTANCE, HNSW_M, HNSW_CONSTRUCTION_EF, HNSW_SEARCH_EF
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Payload keys reserved for the original string id and the document text
+_ID_KEY = "_id"
+_DOC_KEY = "_document"
+
+_DISTANCES = {"cosine": models.Distance.COSINE, "l2": models.Distance.EUCLID, "ip": models.Distance.DOT}
+_BACKUP_SUFFIX = "__premigration"
+_COPY_BATCH = 256
+
+_client = None
+_client_lock = threading.Lock()
+_checked = set()  # collections whose index settings were verified by this process
+_checked_lock = threading.Lock()
+
 
 def get_qdrant_client():
-    if os.getenv("QDRANT_URL"):
-        return QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
-    else:
-        # local docker
-        return QdrantClient(host="localhost", port=6333)
+    """
+    Return a process-wide Qdrant client:
+    - QDRANT_URL set: remote/cloud server
+    - QDRANT_PATH set: embedded local mode persisted on disk (":memory:" for an in-process, throwaway store)
+    - otherwise: local docker at localhost:6333
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if os.getenv("QDRANT_URL"):
+                _client = QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"))
+            elif os.getenv("QDRANT_PATH") == ":memory:":
+                _client = QdrantClient(location=":memory:")
+            elif os.getenv("QDRANT_PATH"):
+                _client = QdrantClient(path=os.getenv("QDRANT_PATH"))
+            else:
+                # local docker
+                _client = QdrantClient(host="localhost", port=6333)
+        return _client
+
+
+def _point_id(id_: str) -> str:
+    """Qdrant point ids must be UUIDs or integers; derive a stable UUID from our string id."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, id_))
+
+
+def _qdrant_filter(where: dict | None):
+    if not where:
+        return None
+    return models.Filter(must=[
+        models.FieldCondition(key=key, match=models.MatchValue(value=value))
+        for key, value in where.items()
+    ])
+
+
+def _cosine_distance(score: float) -> float:
+    """Cosine distance from a Qdrant score (similarity for cosine/dot, euclidean distance for l2; unit vectors)."""
+    if VECTOR_DISTANCE == "l2":
+        return score * score / 2.0
+    return 1.0 - score
+
+
+def _to_hit(point, distance=None) -> VectorHit:
+    payload = dict(point.payload or {})
+    id_ = payload.pop(_ID_KEY, str(point.id))
+    document = payload.pop(_DOC_KEY, None)
+    return VectorHit(id=id_, document=document, metadata=payload, distance=distance)
+
+
+def _copy_points(client, source: str, target: str) -> int:
+    copied, offset = 0, None
+    while True:
+        points, offset = client.scroll(source, limit=_COPY_BATCH, offset=offset, with_payload=True, with_vectors=True)
+        if points:
+            client.upsert(target, points=[models.PointStruct(id=p.id, vector=p.vector, payload=p.payload)
+                                          for p in points])
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+class QdrantVectorStore(VectorStore):
+    """
+    VectorStore over a Qdrant collection. The collection is created on first upsert
+    with the VECTOR_DISTANCE / HNSW_* settings and keyword payload indexes for the
+    keys in QDRANT_PAYLOAD_INDEXES (default "table,status") so filters stay native.
+    An existing collection with another distance is rebuilt on first open; other
+    HNSW settings are updated in place. Queries search with ef = HNSW_SEARCH_EF.
+    """
+
+    def __init__(self, name: str, client: QdrantClient | None = None):
+        super().__init__(name)
+        self.client = client or get_qdrant_client()
+        self._exists = None
+
+    def _collection_exists(self) -> bool:
+        if not self._exists:
+            self._exists = self.client.collection_exists(self.name)
+            if self._exists and self.name not in _checked:
+                with _checked_lock:
+                    if self.name not in _checked:
+                        self._check_settings()
+                        _checked.add(self.name)
+        return self._exists
+
+    def _check_settings(self):
+        """Bring an existing collection to the configured distance and HNSW settings."""
+        backup = self.name + _BACKUP_SUFFIX
+        if self.client.collection_exists(backup):
+            logger.warning(f"Resuming interrupted migration of Qdrant collection '{self.name}'")
+            self._rebuild(backup)
+            return
+        info = self.client.get_collection(self.name)
+        params = info.config.params.vectors
+        if params.distance != _DISTANCES[VECTOR_DISTANCE]:
+            logger.warning(f"Qdrant collection '{self.name}' uses {params.distance}; migrating to {VECTOR_DISTANCE}")
+            self.client.create_collection(backup, vectors_config=params)
+            _copy_points(self.client, self.name, backup)
+            self._rebuild(backup)
+            return
+        # embedded local mode searches exactly and keeps no HNSW graph
+        hnsw = info.config.hnsw_config
+        if not os.getenv("QDRANT_PATH") and (hnsw.m, hnsw.ef_construct) != (HNSW_M, HNSW_CONSTRUCTION_EF):
+            self.client.update_collection(
+                self.name, hnsw_config=models.HnswConfigDiff(m=HNSW_M, ef_construct=HNSW_CONSTRUCTION_EF)
+            )
+            logger.info(f"Updated HNSW settings of '{self.name}' (m={HNSW_M}, ef_construct={HNSW_CONSTRUCTION_EF})")
+
+    def _rebuild(self, backup: str):
+        """Recreate the collection with the configured settings from the copy in `backup`, then drop it."""
+        size = self.client.get_collection(backup).config.params.vectors.size
+        self.client.delete_collection(self.name)
+        self._exists = False
+        self.ensure(size)
+        copied = _copy_points(self.client, backup, self.name)
+        self.client.delete_collection(backup)
+        logger.info(f"Migrated Qdrant collection '{self.name}' ({copied} points)")
+
+    def ensure(self, dim: int | None = None):
+        if self._collection_exists() or dim is None:
+            return
+        self.client.create_collection(
+            collection_name=self.name,
+            vectors_config=models.VectorParams(size=dim, distance=_DISTANCES[VECTOR_DISTANCE]),
+            hnsw_config=models.HnswConfigDiff(m=HNSW_M, ef_construct=HNSW_CONSTRUCTION_EF),
+        )
+        # Embedded local mode (QDRANT_PATH) has no payload indexes; filtering still works there
+        index_keys = "" if os.getenv("QDRANT_PATH") else os.getenv("QDRANT_PAYLOAD_INDEXES", "table,status")
+        for key in filter(None, (k.strip() for k in index_keys.split(","))):
+            try:
+                self.client.create_payload_index(self.name, field_name=key,
+                                                 field_schema=models.PayloadSchemaType.KEYWORD)
+            except Exception as e:
+                logger.warning(f"Payload index '{key}' not created on {self.name}: {e}")
+        self._exists = True
+        logger.info(f"Created Qdrant collection '{self.name}' (dim={dim})")
+
+    def upsert(self, ids, vectors, documents=None, metadatas=None):
+        if not ids:
+            return
+        self.ensure(len(vectors[0]))
+        points = [
+            models.PointStruct(
+                id=_point_id(id_),
+                vector=list(vectors[i]),
+                payload={
+                    **((metadatas[i] if metadatas else None) or {}),
+                    _ID_KEY: id_,
+                    _DOC_KEY: documents[i] if documents else None,
+                },
+            )
+            for i, id_ in enumerate(ids)
+        ]
+        self.client.upsert(collection_name=self.name, points=points)
+
+    def query(self, vectors, k=4, where=None):
+        if not len(vectors):
+            return []
+        if not self._collection_exists():
+            return [[] for _ in vectors]
+        query_filter = _qdrant_filter(where)
+        # embedded local mode always searches exactly
+        search_params = None if os.getenv("QDRANT_PATH") else models.SearchParams(hnsw_ef=HNSW_SEARCH_EF)
+        responses = self.client.query_batch_points(
+            collection_name=self.name,
+            requests=[
+                models.QueryRequest(query=list(vector), limit=k, filter=query_filter, with_payload=True,
+                                    params=search_params)
+                for vector in vectors
+            ],
+        )
+        # Report cosine distance like the other backends
+        return [[_to_hit(p, distance=_cosine_distance(p.score)) for p in response.points] for response in responses]
+
+    def get(self, ids=None, where=None):
+        if not self._collection_exists():
+            return []
+        if ids is not None:
+            points = self.client.retrieve(self.name, ids=[_point_id(i) for i in ids], with_payload=True)
+            hits = [_to_hit(p) for p in points]
+            return [h for h in hits if all(h.metadata.get(k) == v for k, v in (where or {}).items())]
+
+        hits, offset = [], None
+        while True:
+            points, offset = self.client.scroll(
+                self.name, scroll_filter=_qdrant_filter(where), limit=256, offset=offset, with_payload=True
+            )
+            hits.extend(_to_hit(p) for p in points)
+            if offset is None:
+                return hits
+
+    def update_metadata(self, ids, metadatas):
+        if not ids or not self._collection_exists():
+            return
+        # one request for the whole batch
+        self.client.batch_update_points(self.name, update_operations=[
+            models.SetPayloadOperation(set_payload=models.SetPayload(payload=dict(metadata), points=[_point_id(id_)]))
+            for id_, metadata in zip(ids, metadatas)
+        ])
+
+    def delete(self, ids=None, where=None):
+        if (ids is None and not where) or (ids is not None and not ids) or not self._collection_exists():
+            return
+        if not where:
+            self.client.delete(self.name, points_selector=models.PointIdsList(points=[_point_id(i) for i in ids]))
+            return
+        query_filter = _qdrant_filter(where)
+        if ids is not None:
+            query_filter.must.append(models.HasIdCondition(has_id=[_point_id(i) for i in ids]))
+        self.client.delete(self.name, points_selector=models.FilterSelector(filter=query_filter))
+
+    def count(self):
+        if not self._collection_exists():
+            return 0
+        return self.client.count(self.name, exact=True).count
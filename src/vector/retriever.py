@@ -1,27 +1,73 @@
-from src.vector.chroma_con import get_chroma_client
-from src.llm.factory import get_embeddings
+import logging
 
-embed = get_embeddings()
+from src.utils.env_loader import load_env
+from src.vector.store import get_vector_store
+from src.vector.lexical import get_lexical_index, reciprocal_rank_fusion
+from src.llm.factory import embed_queries
+from src.utils.shared_cache import get_shared_cache, make_key
 
-def retrieve_context(query: str, limit: int = 4):
-    client = get_chroma_client()
-    collection = client.get_or_create_collection(name="pmc_chunks")
-    embedder = get_embeddings()
+logger = logging.getLogger(__name__)
+config = load_env()
 
-    # Step 1: embed query
-    vector = embedder.embed_query(query)
+HYBRID_FAST_PATH = config.get("HYBRID_FAST_PATH", "true").lower() == "true"
+LEXICAL_MIN_SCORE = float(config.get("LEXICAL_MIN_SCORE", 3.0))
+LEXICAL_DECISIVE_RATIO = float(config.get("LEXICAL_DECISIVE_RATIO", 2.0))
+RRF_K = int(config.get("RRF_K", 60))
 
-    # Step 2: call query_points correctly
-    # Query Chromadb collection
-    results = collection.query(
-        query_embeddings=[embedder.embed_query(query)],
-        n_results=limit,
-        include=["documents", "metadatas"]
+
+def _is_decisive(lexical_hits, limit: int) -> bool:
+    """
+    Keyword evidence is decisive when the best BM25 score clears LEXICAL_MIN_SCORE
+    and the result after the returned window is far behind (LEXICAL_DECISIVE_RATIO),
+    i.e. the question names tables/columns that only a few chunks contain.
+    """
+    if not lexical_hits or lexical_hits[0][1] < LEXICAL_MIN_SCORE:
+        return False
+    if len(lexical_hits) <= limit:
+        return True
+    return lexical_hits[0][1] >= LEXICAL_DECISIVE_RATIO * lexical_hits[limit][1]
+
+
+def retrieve_context(query: str, limit: int = 4, collection: str = "pmc_chunks", embed_query=None):
+    """
+    Hybrid retrieval over `collection` (pmc_chunks, or a database's own chunks):
+    BM25 keyword hits fused with vector hits by reciprocal rank fusion. When
+    HYBRID_FAST_PATH is on and the keyword match is decisive, the lexical hits
+    are returned without embedding the query. `embed_query` is an optional
+    callable returning the query's vector (e.g. one shared with the cache lookup).
+    Results are kept in the shared cache until the collection is re-ingested.
+    """
+    store = get_vector_store(collection)
+    return get_shared_cache().get_or_compute(
+        f"rag:{store.name}", make_key(query, limit),
+        lambda: _retrieve(store, query, limit, embed_query),
+    )
+
+
+def invalidate_context(collection: str = "pmc_chunks"):
+    """Forget cached retrieval results of `collection` (called after ingest)."""
+    get_shared_cache().clear(f"rag:{get_vector_store(collection).name}")
+
+
+def _retrieve(store, query: str, limit: int, embed_query=None) -> str:
+    lexical = get_lexical_index(store.name)
+
+    # Step 1: keyword search (no network)
+    lexical_hits = lexical.search(query, k=limit * 3) if lexical else []
+    if HYBRID_FAST_PATH and _is_decisive(lexical_hits, limit):
+        logger.info(f"Lexical fast path (top BM25 score {lexical_hits[0][1]:.2f})")
+        return "\n\n".join(doc for _, _, doc in lexical_hits[:limit])
+
+    # Step 2: embed query (once) and query the vector store
+    vector = embed_query() if embed_query else embed_queries([query])[0]
+    vector_hits = store.query([vector], k=limit * 3 if lexical_hits else limit)[0]
+
+    # Step 3: fuse both rankings
+    documents = {id_: doc for id_, _, doc in lexical_hits}
+    documents.update({hit.id: hit.document for hit in vector_hits if hit.document})
+    fused = reciprocal_rank_fusion(
+        [[id_ for id_, _, _ in lexical_hits], [hit.id for hit in vector_hits]], k=RRF_K
     )
-    # Extract content from results
-    chunks = []
-    for doc_list in results.get("documents", []):
-        if doc_list:
-            chunks.extend(doc_list)
+    chunks = [documents[id_] for id_ in fused if documents.get(id_)][:limit]
 
-    return "\n\n".join(chunks) if chunks else ""
\ No newline at end of file
+    return "\n\n".join(chunks) if chunks else ""
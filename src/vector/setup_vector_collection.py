@@ -1,11 +1,13 @@
-# Chromadb does not require VectorParams; we'll use its own collection API
-from src.vector.chroma_con import get_chroma_client
+from src.vector.store import get_vector_store
+from src.llm.factory import get_embeddings
+
 
 def create_collection():
-    client = get_chroma_client()
-    # Create or get collection; Chromadb creates if not exists
-    client.get_or_create_collection(name="pmc_chunks")
-    print("Chromadb collection ready!")
+    store = get_vector_store("pmc_chunks")
+    # Backends like Qdrant need the vector size up front; probe it from the embedder
+    dim = len(get_embeddings().embed_query("dimension probe"))
+    store.ensure(dim)
+    print(f"Vector collection '{store.name}' ready ({store.count()} vectors)!")
 
 if __name__ == "__main__":
     create_collection()
@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from src.utils.env_loader import load_env
+from src.llm.factory import get_collection_name
+
+config = load_env()
+
+# Index settings applied by the HNSW backends (chroma, qdrant) when collections are
+# created; existing collections built with other settings are migrated on first open.
+# VECTOR_DISTANCE is cosine, l2 or ip; hits always report cosine distance, converted
+# from l2 / ip for unit-length embeddings.
+VECTOR_DISTANCE = config.get("VECTOR_DISTANCE", "cosine").lower()
+HNSW_M = int(config.get("HNSW_M", 16))
+HNSW_CONSTRUCTION_EF = int(config.get("HNSW_CONSTRUCTION_EF", 200))
+HNSW_SEARCH_EF = int(config.get("HNSW_SEARCH_EF", 100))
+
+if VECTOR_DISTANCE not in ("cosine", "l2", "ip"):
+    raise ValueError(f"Unsupported VECTOR_DISTANCE: {VECTOR_DISTANCE}")
+
+
+@dataclass
+class VectorHit:
+    """One stored vector: id, document, metadata (payload) and, for queries, its cosine distance."""
+    id: str
+    document: str | None = None
+    metadata: dict = field(default_factory=dict)
+    distance: float | None = None
+
+
+class VectorStore(ABC):
+    """
+    Minimal vector-store interface used by the semantic cache, retrieval and
+    ingest. All methods are batch-oriented; `where` is an equality filter on
+    metadata, e.g. {"status": "verified"} or {"table": "workunits"}.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def ensure(self, dim: int | None = None):
+        """Create the underlying collection if the backend needs it up front."""
+
+    @abstractmethod
+    def upsert(self, ids: list[str], vectors: list[list[float]],
+               documents: list[str] | None = None, metadatas: list[dict] | None = None):
+        """Insert or replace vectors by id."""
+
+    @abstractmethod
+    def query(self, vectors: list[list[float]], k: int = 4, where: dict | None = None) -> list[list[VectorHit]]:
+        """Top-k nearest hits for each query vector, closest first."""
+
+    @abstractmethod
+    def get(self, ids: list[str] | None = None, where: dict | None = None) -> list[VectorHit]:
+        """Fetch stored entries by id and/or filter (all entries when both are None)."""
+
+    @abstractmethod
+    def update_metadata(self, ids: list[str], metadatas: list[dict]):
+        """Set the metadata of existing entries (pass the full dict) without touching their vectors."""
+
+    @abstractmethod
+    def delete(self, ids: list[str] | None = None, where: dict | None = None):
+        """
+        Delete the entries in `ids` that also match `where`, like get(ids, where); None leaves
+        that side unconstrained, but nothing is deleted when both are None (or ids is empty).
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored vectors."""
+
+
+def get_vector_store(name: str) -> VectorStore:
+    """
+    Return the vector store `name` (namespaced by embedding space) from the
+    backend selected by VECTOR_BACKEND: 'chroma' (default), 'qdrant' or 'numpy'.
+    """
+    backend = config.get("VECTOR_BACKEND", "chroma").lower()
+    full_name = get_collection_name(name)
+
+    if backend == "chroma":
+        from src.vector.chroma_con import ChromaVectorStore
+
+        return ChromaVectorStore(full_name)
+    elif backend == "qdrant":
+        from src.vector.qdrant_con import QdrantVectorStore
+
+        return QdrantVectorStore(full_name)
+    elif backend == "numpy":
+        from src.vector.numpy_index import NumpyVectorStore
+
+        return NumpyVectorStore(full_name)
+    else:
+        raise ValueError(f"Unsupported VECTOR_BACKEND: {backend}")
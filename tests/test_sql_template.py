@@ -0,0 +1,22 @@
+"""Templating verified (question, SQL) pairs and binding new questions to them."""
+from src.db.sql_template import templatize, bind, same_literals
+
+
+def test_bind_maps_each_value_to_its_slot():
+    template = templatize("show 5 orders for client 12", "SELECT * FROM orders WHERE client_id = 12 LIMIT 5")
+
+    assert template["sql"] == "SELECT * FROM orders WHERE client_id = ? LIMIT ?"
+    assert bind(template, "show 10 orders for client 3") == [3, 10]
+    assert bind(template, "Show 10 orders for client 3?") == [3, 10]
+
+
+def test_ambiguous_literal_is_not_templated():
+    # which 12 is the client and which the limit can't be told from the question
+    assert templatize("show 12 orders for client 12", "SELECT * FROM orders WHERE client_id = 12 LIMIT 12") is None
+    assert templatize("active users with active orders", "SELECT * FROM users WHERE status = 'active'") is None
+
+
+def test_same_literals():
+    assert same_literals("orders for client 12 since 2024-01-01", "Orders of client 12 after 2024-01-01?")
+    assert not same_literals("orders for client 12", "orders for client 13")
+    assert not same_literals("orders for client 12", "all orders")
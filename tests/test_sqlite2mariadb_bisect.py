@@ -0,0 +1,119 @@
+"""
+Bisecting poisoned insert batches in sqlite2mariadb, against a SQLite database standing in
+for MariaDB: the target table has a NOT NULL the source lacks, so NULL names are rejected.
+"""
+import json
+import sqlite3
+
+import pytest
+
+import sqlite2mariadb as s2m
+
+BAD_IDS = {5, 13, 14}
+
+
+class FakeCursor:
+    """The slice of a MariaDB cursor that copy_table_data uses, translated to SQLite."""
+
+    def __init__(self, conn):
+        self.cur = conn.cursor()
+
+    @staticmethod
+    def _sql(sql):
+        sql = sql.replace("%s", "?")
+        if " ON DUPLICATE KEY UPDATE " in sql:  # only the checkpoint upsert, keyed on table_name
+            sql = sql.split(" ON DUPLICATE KEY UPDATE ")[0].replace("INSERT INTO", "INSERT OR REPLACE INTO")
+        return sql
+
+    def execute(self, sql, params=()):
+        self.cur.execute(self._sql(sql), params)
+
+    def executemany(self, sql, rows):
+        self.cur.executemany(self._sql(sql), rows)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:", isolation_level=None)
+        self.conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL, data BLOB)")
+        self.conn.execute(
+            f"CREATE TABLE {s2m.CHECKPOINT_TABLE} "
+            "(table_name TEXT PRIMARY KEY, last_rowid, last_modified, rows_copied, completed)"
+        )
+        self.conn.execute("BEGIN")
+
+    def cursor(self):
+        return FakeCursor(self.conn)
+
+    def commit(self):
+        self.conn.execute("COMMIT")
+        self.conn.execute("BEGIN")
+
+    def rollback(self):
+        self.conn.execute("ROLLBACK")
+        self.conn.execute("BEGIN")
+
+    def ids(self):
+        return [r[0] for r in self.conn.execute("SELECT id FROM items ORDER BY id")]
+
+
+@pytest.fixture
+def source():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, data BLOB)")
+    conn.executemany(
+        "INSERT INTO items VALUES (?, ?, ?)",
+        [(i, None if i in BAD_IDS else f"item {i}", bytes([i])) for i in range(1, 21)],
+    )
+    yield conn
+    conn.close()
+
+
+def test_bisect_inserts_every_good_row(source):
+    target = FakeConnection()
+    rows = source.execute("SELECT id, name, data FROM items ORDER BY id").fetchall()
+    rejected = []
+
+    inserted = s2m.insert_bisect(target.cursor(), "INSERT INTO items (id, name, data) VALUES (%s, %s, %s)",
+                                 rows, lambda row, error: rejected.append(row[0]))
+
+    assert inserted == 20 - len(BAD_IDS)
+    assert sorted(rejected) == sorted(BAD_IDS)
+    assert target.ids() == [i for i in range(1, 21) if i not in BAD_IDS]
+
+
+def test_rejected_rows_go_to_the_reject_file(source, tmp_path):
+    target = FakeConnection()
+    path = tmp_path / "rejects.jsonl"
+    rejects = s2m.RejectLog(str(path))
+
+    copied = s2m.copy_table_data(source, target, "items", False, batch_size=8, verbose=False, rejects=rejects)
+    rejects.close()
+
+    assert copied == 20
+    assert target.ids() == [i for i in range(1, 21) if i not in BAD_IDS]
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [e["row"]["id"] for e in entries] == sorted(BAD_IDS)
+    for entry in entries:
+        assert entry["table"] == "items"
+        assert "NOT NULL" in entry["error"]
+        assert entry["row"]["name"] is None
+        assert entry["row"]["data"] == {"$hex": bytes([entry["row"]["id"]]).hex()}
+
+
+def test_max_errors_aborts_the_copy(source, tmp_path):
+    target = FakeConnection()
+    path = tmp_path / "rejects.jsonl"
+    rejects = s2m.RejectLog(str(path), max_errors=1)
+
+    with pytest.raises(s2m.MaxErrorsExceeded):
+        s2m.copy_table_data(source, target, "items", False, batch_size=8, verbose=False, rejects=rejects)
+    rejects.close()
+    target.rollback()  # what main() does before exiting
+
+    assert len(path.read_text().splitlines()) == 2
+    assert target.ids() == []
+    # workers copying other tables stop at their next batch
+    assert rejects.stop.is_set()
+    with pytest.raises(s2m.MaxErrorsExceeded):
+        s2m.copy_table_data(source, FakeConnection(), "items", False, verbose=False, rejects=rejects)
@@ -0,0 +1,143 @@
+"""
+The VectorStore contract, run against every backend: NumpyVectorStore, Chroma in a
+temporary directory and Qdrant in memory. Hits report cosine distance (0 = same
+direction, 1 = orthogonal, 2 = opposite) whatever distance the HNSW index uses.
+"""
+import math
+import uuid
+
+import pytest
+
+from src.vector import chroma_con, qdrant_con
+from src.vector.numpy_index import NumpyVectorStore
+
+s = 1 / math.sqrt(2)
+VECTORS = {
+    "east": [1.0, 0.0, 0.0],
+    "north": [0.0, 1.0, 0.0],
+    "west": [-1.0, 0.0, 0.0],
+    "north_east": [s, s, 0.0],
+}
+# cosine distance of each stored vector from "east"
+DISTANCES = {"east": 0.0, "north_east": 1 - s, "north": 1.0, "west": 2.0}
+METADATA = {
+    "east": {"table": "orders", "status": "verified", "hits": 1},
+    "north": {"table": "orders", "status": "pending", "hits": 2},
+    "west": {"table": "users", "status": "verified", "hits": 3},
+    "north_east": {"table": "users", "status": "pending", "hits": 4},
+}
+
+
+def _numpy_store(tmp_path, monkeypatch, space):
+    monkeypatch.setenv("NUMPY_INDEX_PATH", str(tmp_path))
+    return NumpyVectorStore(f"contract_{uuid.uuid4().hex}")
+
+
+def _chroma_store(tmp_path, monkeypatch, space):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path))
+    monkeypatch.setattr(chroma_con, "VECTOR_DISTANCE", space)
+    return chroma_con.ChromaVectorStore(f"contract_{uuid.uuid4().hex}")
+
+
+def _qdrant_store(tmp_path, monkeypatch, space):
+    monkeypatch.setenv("QDRANT_PATH", ":memory:")
+    monkeypatch.setattr(qdrant_con, "VECTOR_DISTANCE", space)
+    return qdrant_con.QdrantVectorStore(f"contract_{uuid.uuid4().hex}",
+                                        client=qdrant_con.QdrantClient(location=":memory:"))
+
+
+BACKENDS = [
+    pytest.param((_numpy_store, "cosine"), id="numpy"),
+    *(pytest.param((_chroma_store, space), id=f"chroma-{space}") for space in ("cosine", "l2", "ip")),
+    *(pytest.param((_qdrant_store, space), id=f"qdrant-{space}") for space in ("cosine", "l2", "ip")),
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, tmp_path, monkeypatch):
+    make, space = request.param
+    store = make(tmp_path, monkeypatch, space)
+    ids = list(VECTORS)
+    store.upsert(ids, [VECTORS[i] for i in ids], documents=[f"doc {i}" for i in ids],
+                 metadatas=[METADATA[i] for i in ids])
+    return store
+
+
+def by_id(hits):
+    return {hit.id: hit for hit in hits}
+
+
+def test_upsert_and_get(store):
+    assert store.count() == 4
+    hits = by_id(store.get(["east", "west", "missing"]))
+    assert set(hits) == {"east", "west"}
+    assert hits["east"].document == "doc east"
+    assert hits["east"].metadata == METADATA["east"]
+
+    store.upsert(["east"], [VECTORS["east"]], documents=["doc east v2"], metadatas=[{"table": "orders", "hits": 9}])
+    assert store.count() == 4
+    assert store.get(["east"])[0].document == "doc east v2"
+    assert store.get(["east"])[0].metadata["hits"] == 9
+
+
+def test_query_reports_cosine_distance_closest_first(store):
+    [hits] = store.query([VECTORS["east"]], k=4)
+    assert [hit.id for hit in hits] == ["east", "north_east", "north", "west"]
+    for hit in hits:
+        assert hit.distance == pytest.approx(DISTANCES[hit.id], abs=1e-5)
+        assert hit.document == f"doc {hit.id}"
+        assert hit.metadata == METADATA[hit.id]
+
+
+def test_query_batches_and_limits_k(store):
+    east, west = store.query([VECTORS["east"], VECTORS["west"]], k=2)
+    assert [hit.id for hit in east] == ["east", "north_east"]
+    assert [hit.id for hit in west] == ["west", "north"]
+    assert store.query([], k=2) == []
+
+
+def test_where_filters_get_query_and_delete(store):
+    assert set(by_id(store.get(where={"status": "verified"}))) == {"east", "west"}
+    assert set(by_id(store.get(where={"table": "users", "status": "pending"}))) == {"north_east"}
+
+    [hits] = store.query([VECTORS["east"]], k=4, where={"table": "users"})
+    assert [hit.id for hit in hits] == ["north_east", "west"]
+
+    store.delete(where={"table": "orders"})
+    assert set(by_id(store.get())) == {"west", "north_east"}
+
+
+def test_update_metadata_keeps_vectors(store):
+    store.update_metadata(["north"], [{**METADATA["north"], "status": "verified", "hits": 5}])
+    hit = store.get(["north"])[0]
+    assert hit.metadata == {"table": "orders", "status": "verified", "hits": 5}
+    assert hit.document == "doc north"
+    assert set(by_id(store.get(where={"status": "verified"}))) == {"east", "north", "west"}
+
+    [hits] = store.query([VECTORS["north"]], k=1)
+    assert hits[0].id == "north"
+    assert hits[0].distance == pytest.approx(0.0, abs=1e-5)
+
+
+def test_delete_by_id(store):
+    store.delete(["east", "missing"])
+    assert store.count() == 3
+    assert store.get(["east"]) == []
+    [hits] = store.query([VECTORS["east"]], k=1)
+    assert hits[0].id == "north_east"
+
+
+def test_delete_by_ids_and_where_takes_their_intersection(store):
+    store.delete(["east", "west", "missing"], where={"table": "orders"})
+    assert set(by_id(store.get())) == {"north", "west", "north_east"}
+
+    store.delete([])
+    store.delete()
+    assert store.count() == 3
+
+
+def test_update_metadata_batch(store):
+    store.update_metadata(["east", "west"], [{**METADATA["east"], "hits": 7}, {**METADATA["west"], "hits": 8}])
+    hits = by_id(store.get(["east", "west"]))
+    assert hits["east"].metadata["hits"] == 7
+    assert hits["west"].metadata["hits"] == 8